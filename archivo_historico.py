@@ -0,0 +1,289 @@
+"""
+Archivo histórico de ventas, créditos pagados y turnos
+Los meses cerrados se mueven de la base viva a `historico_AAAA.db` (un archivo por año,
+junto a pos_cremeria.db) para que las consultas del día a día trabajen sobre tablas chicas.
+
+- Se archiva todo lo anterior a los últimos N meses (config: archive.keep_months).
+- Nunca se archivan ventas con crédito sin pagar ni créditos pendientes.
+- Primero se copia al histórico y se confirma; después se borra de la base viva. Si el
+  proceso se corta a la mitad, volver a correrlo termina el trabajo sin perder filas.
+- `conectar_historico()` da una conexión donde `ventas`, `creditos_pendientes` y `turnos`
+  son vistas TEMP (UNION ALL de la base viva + históricos): las consultas de reportes
+  funcionan igual, sin cambiar el SQL. Esa conexión es solo de lectura para esas tablas.
+
+Uso:
+    python archivo_historico.py --dry-run        # cuántas filas se moverían
+    python archivo_historico.py                  # archivar
+    python archivo_historico.py --meses 6
+    python archivo_historico.py --estado
+"""
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+
+from migraciones import asegurar_esquema
+
+DB_PATH = "pos_cremeria.db"
+
+# SQLite permite 10 bases adjuntas por conexión
+MAX_HISTORICOS = 10
+
+# (tabla, columna de fecha, condición extra para poder archivar la fila)
+TABLAS_ARCHIVABLES = [
+    ('ventas', 'fecha',
+     "COALESCE(pagado, 1) = 1 AND id NOT IN ("
+     "SELECT venta_id FROM main.creditos_pendientes "
+     "WHERE COALESCE(pagado, 0) = 0 AND venta_id IS NOT NULL)"),
+    ('creditos_pendientes', 'fecha_venta', "COALESCE(pagado, 0) = 1"),
+    # El último turno se queda: obtener_siguiente_turno numera con MAX(turno)
+    ('turnos', 'timestamp', "id < (SELECT MAX(id) FROM main.turnos)"),
+]
+
+def ruta_historico(db_path, anio):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), f"historico_{anio}.db")
+
+def historicos_disponibles(db_path=DB_PATH):
+    """{año: ruta} de los archivos históricos existentes"""
+    patron = os.path.join(os.path.dirname(os.path.abspath(db_path)), "historico_*.db")
+    archivos = {}
+    for ruta in glob.glob(patron):
+        coincidencia = re.search(r'historico_(\d{4})\.db$', ruta)
+        if coincidencia:
+            archivos[int(coincidencia.group(1))] = ruta
+    return dict(sorted(archivos.items()))
+
+def calcular_corte(meses_conservar, hoy=None):
+    """Primer día del mes más antiguo que se queda en la base viva"""
+    hoy = hoy or date.today()
+    anio, mes = hoy.year, hoy.month - meses_conservar
+    while mes <= 0:
+        mes += 12
+        anio -= 1
+    return f"{anio:04d}-{mes:02d}-01"
+
+def fecha_corte(conn, tabla='ventas'):
+    """Fecha antes de la cual las filas de `tabla` pueden estar en el histórico (o None)"""
+    try:
+        return conn.execute(
+            "SELECT MAX(corte) FROM archivo_historico WHERE tabla = ?", (tabla,)
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+def _columnas(conn, tabla, esquema='main'):
+    return [fila[1] for fila in conn.execute(f'PRAGMA {esquema}.table_info("{tabla}")')]
+
+def _preparar_tabla_historica(conn, tabla):
+    """Crear la tabla en `hist` con la definición de la base viva y agregarle columnas nuevas"""
+    crear_sql = conn.execute(
+        "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (tabla,)
+    ).fetchone()[0]
+    crear_sql = re.sub(r'^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?(?:"[^"]+"|\w+)',
+                       f'CREATE TABLE IF NOT EXISTS hist."{tabla}"', crear_sql, count=1)
+    conn.execute(crear_sql)
+
+    existentes = set(_columnas(conn, tabla, 'hist'))
+    for fila in conn.execute(f'PRAGMA main.table_info("{tabla}")').fetchall():
+        if fila[1] not in existentes:
+            conn.execute(f'ALTER TABLE hist."{tabla}" ADD COLUMN "{fila[1]}" {fila[2]}')
+
+def _anios_pendientes(conn, tabla, columna, condicion, corte):
+    filas = conn.execute(f'''
+        SELECT substr({columna}, 1, 4) AS anio, COUNT(*), MIN({columna}), MAX({columna})
+        FROM main."{tabla}"
+        WHERE {columna} < ? AND {condicion}
+        GROUP BY anio
+        ORDER BY anio
+    ''', (corte,)).fetchall()
+    return [(int(anio), filas_anio, desde, hasta) for anio, filas_anio, desde, hasta in filas if anio and anio.isdigit()]
+
+def archivar(db_path=DB_PATH, meses_conservar=12, dry_run=False):
+    """Mover los meses cerrados a historico_AAAA.db; devuelve una lista de resultados por tabla/año"""
+    asegurar_esquema(db_path)
+    corte = calcular_corte(meses_conservar)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    resultados = []
+    try:
+        for tabla, columna, condicion in TABLAS_ARCHIVABLES:
+            for anio, filas, desde, hasta in _anios_pendientes(conn, tabla, columna, condicion, corte):
+                archivo = ruta_historico(db_path, anio)
+                resultado = {'tabla': tabla, 'anio': anio, 'filas': filas, 'desde': desde,
+                             'hasta': hasta, 'archivo': archivo}
+                resultados.append(resultado)
+                if dry_run:
+                    continue
+
+                inicio = time.perf_counter()
+                predicado = f"{columna} < ? AND substr({columna}, 1, 4) = ? AND {condicion}"
+                params = (corte, f"{anio:04d}")
+                columnas = ", ".join(f'"{c}"' for c in _columnas(conn, tabla))
+
+                conn.execute("ATTACH DATABASE ? AS hist", (archivo,))
+                try:
+                    # 1) Copiar y confirmar en el histórico (INSERT OR REPLACE: repetir es seguro)
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        _preparar_tabla_historica(conn, tabla)
+                        conn.execute(f'CREATE INDEX IF NOT EXISTS hist."idx_{tabla}_{columna}" ON "{tabla}" ({columna})')
+                        conn.execute(f'''
+                            INSERT OR REPLACE INTO hist."{tabla}" ({columnas})
+                            SELECT {columnas} FROM main."{tabla}" WHERE {predicado}
+                        ''', params)
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+
+                    # 2) Borrar de la base viva solo lo que ya quedó en el histórico
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        borradas = conn.execute(f'''
+                            DELETE FROM main."{tabla}"
+                            WHERE {predicado} AND id IN (SELECT id FROM hist."{tabla}")
+                        ''', params).rowcount
+                        if borradas != filas:
+                            raise RuntimeError(f"{tabla} {anio}: se copiaron {filas} filas pero se borrarían {borradas}")
+                        conn.execute('''
+                            INSERT INTO archivo_historico (fecha, tabla, anio, archivo, corte, filas, desde, hasta)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), tabla, anio,
+                              os.path.basename(archivo), corte, filas, desde, hasta))
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                finally:
+                    conn.execute("DETACH DATABASE hist")
+                resultado['duracion'] = time.perf_counter() - inicio
+    finally:
+        conn.close()
+    return resultados
+
+# === LECTURA CON HISTORIA ===
+
+def necesita_historico(desde, db_path=DB_PATH):
+    """True si un reporte que empieza en `desde` incluye meses ya archivados"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cortes = [fecha_corte(conn, tabla) for tabla, _, _ in TABLAS_ARCHIVABLES]
+    finally:
+        conn.close()
+    cortes = [c for c in cortes if c]
+    if not cortes:
+        return False
+    return desde is None or str(desde)[:10] < max(cortes)
+
+def conectar_historico(desde=None, db_path=DB_PATH):
+    """Conexión donde las tablas archivables incluyen los históricos desde el año de `desde`"""
+    conn = sqlite3.connect(db_path)
+    if not necesita_historico(desde, db_path):
+        return conn
+
+    anio_desde = int(str(desde)[:4]) if desde else 0
+    archivos = [(anio, ruta) for anio, ruta in historicos_disponibles(db_path).items() if anio >= anio_desde]
+    if len(archivos) > MAX_HISTORICOS:
+        print(f"Solo se adjuntan los {MAX_HISTORICOS} históricos más recientes de {len(archivos)}")
+        archivos = archivos[-MAX_HISTORICOS:]
+
+    for anio, ruta in archivos:
+        conn.execute("ATTACH DATABASE ? AS ?", (ruta, f"hist_{anio}"))
+
+    for tabla, _, _ in TABLAS_ARCHIVABLES:
+        columnas = _columnas(conn, tabla)
+        partes = [f'SELECT {", ".join(chr(34) + c + chr(34) for c in columnas)} FROM main."{tabla}"']
+        for anio, _ in archivos:
+            existentes = set(_columnas(conn, tabla, f"hist_{anio}"))
+            if not existentes:
+                continue
+            # Columnas agregadas después de archivar ese año se leen como NULL
+            seleccion = ", ".join(f'"{c}"' if c in existentes else f'NULL AS "{c}"' for c in columnas)
+            partes.append(f'SELECT {seleccion} FROM hist_{anio}."{tabla}"')
+        # La vista TEMP tiene el mismo nombre que la tabla: las consultas sin esquema la usan a ella
+        conn.execute(f'CREATE TEMP VIEW "{tabla}" AS ' + " UNION ALL ".join(partes))
+    return conn
+
+def leer_sql_con_historico(query, params=(), desde=None, tablas=(), ttl=None, db_path=DB_PATH):
+    """Como cache_manager.leer_sql, pero incluye los meses archivados si `desde` los alcanza"""
+    from cache_manager import get_query_cache, leer_sql
+    import pandas as pd
+
+    if not necesita_historico(desde, db_path):
+        return leer_sql(query, params=params, tablas=tablas, ttl=ttl, db_path=db_path)
+
+    params = tuple(params) if params else ()
+
+    def calcular():
+        conn = conectar_historico(desde, db_path)
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    return get_query_cache().obtener('leer_sql_historico', (db_path, query, params, str(desde)), {},
+                                     tuple(tablas), ttl, calcular)
+
+def estado(db_path=DB_PATH):
+    """Filas en la base viva y en cada histórico"""
+    conn = sqlite3.connect(db_path)
+    try:
+        filas = {tabla: {'viva': conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]}
+                 for tabla, _, _ in TABLAS_ARCHIVABLES}
+        cortes = {tabla: fecha_corte(conn, tabla) for tabla, _, _ in TABLAS_ARCHIVABLES}
+    finally:
+        conn.close()
+
+    for anio, ruta in historicos_disponibles(db_path).items():
+        conn = sqlite3.connect(ruta)
+        try:
+            for tabla, _, _ in TABLAS_ARCHIVABLES:
+                if _columnas(conn, tabla):
+                    filas[tabla][anio] = conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+        finally:
+            conn.close()
+    return filas, cortes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archivar meses cerrados en historico_AAAA.db")
+    parser.add_argument('--meses', type=int, default=None,
+                        help="Meses que se quedan en la base viva (por defecto archive.keep_months)")
+    parser.add_argument('--dry-run', action='store_true', help="Solo mostrar lo que se archivaría")
+    parser.add_argument('--estado', action='store_true', help="Mostrar filas en la base viva y en los históricos")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    args = parser.parse_args(argv)
+
+    if args.estado:
+        filas, cortes = estado(args.db)
+        for tabla, conteos in filas.items():
+            detalle = ", ".join(f"{anio}: {n}" for anio, n in conteos.items() if anio != 'viva')
+            print(f"📋 {tabla}: {conteos['viva']} en la base viva"
+                  + (f" · históricos {detalle}" if detalle else "")
+                  + (f" · archivado hasta {cortes[tabla]}" if cortes[tabla] else ""))
+        return 0
+
+    meses = args.meses
+    if meses is None:
+        import config
+        meses = config.get_archive_keep_months()
+
+    inicio = time.perf_counter()
+    resultados = archivar(args.db, meses, dry_run=args.dry_run)
+    if not resultados:
+        print(f"✅ Nada que archivar antes de {calcular_corte(meses)}")
+        return 0
+
+    for r in resultados:
+        print(f"{'🔎' if args.dry_run else '🗄️'} {r['tabla']} {r['anio']}: {r['filas']} filas "
+              f"({r['desde'][:10]} a {r['hasta'][:10]}) → {os.path.basename(r['archivo'])}")
+    if args.dry_run:
+        print("\nUsa sin --dry-run para archivar")
+    else:
+        print(f"\n✅ {sum(r['filas'] for r in resultados)} filas archivadas en {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
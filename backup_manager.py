@@ -0,0 +1,325 @@
+"""
+Respaldos en caliente de la base de datos
+Usa la API de backup de SQLite (`sqlite3.Connection.backup`): copia la base por bloques
+de páginas y suelta el bloqueo entre bloques, así que las cajas siguen vendiendo mientras
+se respalda. Si otra conexión escribe a mitad de la copia, SQLite la reinicia sola; el
+resultado siempre es una foto consistente (a diferencia de copiar el archivo).
+
+Cada respaldo se verifica con `PRAGMA integrity_check`, se comprime con gzip y se rota
+(se conservan los más recientes y uno por semana).
+
+Uso:
+    python backup_manager.py crear                 # respaldo inmediato
+    python backup_manager.py listar
+    python backup_manager.py verificar backups/pos_cremeria_20251103_181812.db.gz
+    python backup_manager.py restaurar backups/pos_cremeria_20251103_181812.db.gz
+    python backup_manager.py rotar
+"""
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+DB_PATH = "pos_cremeria.db"
+BACKUP_DIR = "backups"
+
+# Páginas copiadas por paso y pausa entre pasos (segundos)
+PAGINAS_POR_PASO = 256
+PAUSA_ENTRE_PASOS = 0.05
+
+_PATRON_ARCHIVO = re.compile(r"_(\d{8}_\d{6})(_\d+)?\.db(\.gz)?$")
+
+def _copiar_con_backup_api(origen, destino, paginas=PAGINAS_POR_PASO, pausa=PAUSA_ENTRE_PASOS, progreso=None):
+    """Copiar la base `origen` al archivo `destino` por pasos de `paginas` páginas"""
+    conn_origen = sqlite3.connect(origen, timeout=30)
+    conn_destino = sqlite3.connect(destino)
+    try:
+        conn_origen.backup(conn_destino, pages=paginas, progress=progreso, sleep=pausa)
+    finally:
+        conn_destino.close()
+        conn_origen.close()
+
+def verificar_integridad(db_path):
+    """Resultado de `PRAGMA integrity_check` ('ok' si la base está sana)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        filas = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return "; ".join(fila[0] for fila in filas)
+
+def _comprimir(origen, destino):
+    parcial = destino + ".part"
+    with open(origen, 'rb') as entrada, gzip.open(parcial, 'wb', compresslevel=6) as salida:
+        shutil.copyfileobj(entrada, salida, 1024 * 1024)
+    os.replace(parcial, destino)
+
+def _descomprimir(origen, destino):
+    with gzip.open(origen, 'rb') as entrada, open(destino, 'wb') as salida:
+        shutil.copyfileobj(entrada, salida, 1024 * 1024)
+
+def crear_backup(db_path=DB_PATH, destino_dir=BACKUP_DIR, comprimir=True, paginas=PAGINAS_POR_PASO,
+                 pausa=PAUSA_ENTRE_PASOS, progreso=None):
+    """Crear un respaldo verificado de la base de datos
+
+    Devuelve un dict con archivo, tamaños y duración. Si la verificación falla, el
+    respaldo se borra y se lanza RuntimeError.
+    """
+    os.makedirs(destino_dir, exist_ok=True)
+    inicio = time.perf_counter()
+
+    nombre = os.path.splitext(os.path.basename(db_path))[0]
+    base = os.path.join(destino_dir, f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    archivo_db, numero = base + ".db", 1
+    while any(os.path.exists(archivo_db + ext) for ext in ("", ".gz", ".tmp")):
+        numero += 1
+        archivo_db = f"{base}_{numero}.db"
+    temporal = archivo_db + ".tmp"
+
+    try:
+        _copiar_con_backup_api(db_path, temporal, paginas, pausa, progreso)
+
+        resultado = verificar_integridad(temporal)
+        if resultado != "ok":
+            raise RuntimeError(f"El respaldo no pasó integrity_check: {resultado}")
+
+        tamano_db = os.path.getsize(temporal)
+        if comprimir:
+            archivo = archivo_db + ".gz"
+            _comprimir(temporal, archivo)
+            os.remove(temporal)
+        else:
+            archivo = archivo_db
+            os.replace(temporal, archivo)
+    except Exception:
+        for ruta in (temporal, archivo_db + ".gz.part"):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        raise
+
+    return {
+        'archivo': archivo,
+        'tamano_db': tamano_db,
+        'tamano_archivo': os.path.getsize(archivo),
+        'duracion': time.perf_counter() - inicio,
+    }
+
+def _fecha_backup(archivo):
+    coincidencia = _PATRON_ARCHIVO.search(archivo)
+    if not coincidencia:
+        return None
+    return datetime.strptime(coincidencia.group(1), "%Y%m%d_%H%M%S")
+
+def listar_backups(destino_dir=BACKUP_DIR):
+    """Respaldos existentes, del más reciente al más antiguo: [(archivo, fecha, tamaño)]"""
+    if not os.path.isdir(destino_dir):
+        return []
+    backups = []
+    for nombre in os.listdir(destino_dir):
+        fecha = _fecha_backup(nombre)
+        if fecha is None:
+            continue
+        ruta = os.path.join(destino_dir, nombre)
+        backups.append((ruta, fecha, os.path.getsize(ruta)))
+    return sorted(backups, key=lambda b: b[1], reverse=True)
+
+def rotar_backups(destino_dir=BACKUP_DIR, conservar=14, semanales=8):
+    """Borrar respaldos viejos
+
+    Se conservan los `conservar` más recientes y, de los anteriores, el último de cada
+    semana durante `semanales` semanas. Devuelve la lista de archivos borrados.
+    """
+    backups = listar_backups(destino_dir)
+    semanas_vistas = set()
+    borrados = []
+    for posicion, (ruta, fecha, _) in enumerate(backups):
+        if posicion < conservar:
+            continue
+        semana = fecha.isocalendar()[:2]
+        if semana not in semanas_vistas and len(semanas_vistas) < semanales:
+            semanas_vistas.add(semana)
+            continue
+        os.remove(ruta)
+        borrados.append(ruta)
+    return borrados
+
+def _archivo_descomprimido(archivo, directorio):
+    """Ruta a una copia .db del respaldo (descomprimida si hace falta) y si es temporal"""
+    if not archivo.endswith(".gz"):
+        return archivo, False
+    descriptor, temporal = tempfile.mkstemp(suffix=".db", dir=directorio)
+    os.close(descriptor)
+    _descomprimir(archivo, temporal)
+    return temporal, True
+
+def verificar_backup(archivo):
+    """Descomprimir (en un temporal) y correr integrity_check sobre un respaldo"""
+    ruta, temporal = _archivo_descomprimido(archivo, os.path.dirname(archivo) or ".")
+    try:
+        return verificar_integridad(ruta)
+    finally:
+        if temporal:
+            os.remove(ruta)
+
+def restaurar_backup(archivo, db_path=DB_PATH):
+    """Restaurar un respaldo sobre la base en uso
+
+    También usa la API de backup (en sentido inverso y en un solo paso), así que las
+    conexiones abiertas ven el cambio de forma atómica y no hace falta detener la app.
+    Antes se crea un respaldo de la base actual por si hay que deshacer. Después se
+    aplican las migraciones pendientes (el respaldo puede tener un esquema anterior)
+    y se descarta el caché de consultas del proceso.
+    """
+    ruta, temporal = _archivo_descomprimido(archivo, os.path.dirname(os.path.abspath(db_path)))
+    try:
+        resultado = verificar_integridad(ruta)
+        if resultado != "ok":
+            raise RuntimeError(f"El respaldo está dañado: {resultado}")
+        conn = sqlite3.connect(ruta)
+        try:
+            tablas = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        finally:
+            conn.close()
+        if tablas == 0:
+            raise RuntimeError("El respaldo está vacío (sin tablas)")
+
+        previo = crear_backup(db_path) if os.path.exists(db_path) else None
+
+        conn_origen = sqlite3.connect(ruta)
+        conn_destino = sqlite3.connect(db_path, timeout=30)
+        try:
+            conn_origen.backup(conn_destino)
+        finally:
+            conn_destino.close()
+            conn_origen.close()
+
+        # El proceso lee productos por posición (COLUMNAS_PRODUCTOS): llevar la base
+        # restaurada a la versión actual del esquema antes de que la usen las páginas
+        from cache_manager import get_query_cache
+        from migraciones import ejecutar_migraciones, olvidar_esquema
+        ejecutar_migraciones(db_path)
+        olvidar_esquema(db_path)
+        get_query_cache().limpiar()
+        return previo
+    finally:
+        if temporal:
+            os.remove(ruta)
+
+
+class ProgramadorBackups:
+    """Hilo que crea un respaldo cada `intervalo_horas` y rota los viejos"""
+
+    def __init__(self, db_path=DB_PATH, destino_dir=BACKUP_DIR, intervalo_horas=4, conservar=14):
+        self.db_path = db_path
+        self.destino_dir = destino_dir
+        self.intervalo = intervalo_horas * 3600
+        self.conservar = conservar
+        self.ultimo_resultado = None
+        self.ultimo_error = None
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _segundos_para_el_siguiente(self):
+        # Se toma el respaldo más reciente del directorio para no repetir tras un reinicio
+        backups = listar_backups(self.destino_dir)
+        if not backups:
+            return 0
+        transcurrido = (datetime.now() - backups[0][1]).total_seconds()
+        return max(0, self.intervalo - transcurrido)
+
+    def ejecutar_ahora(self):
+        try:
+            self.ultimo_resultado = crear_backup(self.db_path, self.destino_dir)
+            self.ultimo_error = None
+            rotar_backups(self.destino_dir, self.conservar)
+            print(f"💾 Respaldo creado: {self.ultimo_resultado['archivo']} "
+                  f"({self.ultimo_resultado['duracion']:.1f}s)")
+        except Exception as e:
+            self.ultimo_error = str(e)
+            print(f"❌ Error al crear respaldo: {e}")
+
+    def _ciclo(self):
+        while not self._detener.wait(self._segundos_para_el_siguiente()):
+            self.ejecutar_ahora()
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="respaldos", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+
+# Instancia global del programador de respaldos
+_programador = None
+_programador_lock = threading.Lock()
+
+def get_programador_backups() -> ProgramadorBackups:
+    """Obtener (e iniciar) la instancia única del programador de respaldos
+
+    Con un intervalo de 0 horas en la configuración el programador no se inicia.
+    """
+    global _programador
+    if _programador is None:
+        with _programador_lock:
+            if _programador is None:
+                import config
+                _programador = ProgramadorBackups(
+                    db_path=config.get_db_path(),
+                    destino_dir=config.get_backup_dir(),
+                    intervalo_horas=config.get_backup_interval_hours(),
+                    conservar=config.get_backup_keep(),
+                )
+                if _programador.intervalo > 0:
+                    _programador.iniciar()
+    return _programador
+
+def _imprimir_progreso(estado, restantes, total):
+    copiadas = total - restantes
+    print(f"\r   {copiadas:,}/{total:,} páginas ({copiadas * 100 // max(total, 1)}%)", end="", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Respaldos en caliente de la base de datos")
+    parser.add_argument('comando', choices=['crear', 'listar', 'verificar', 'restaurar', 'rotar'])
+    parser.add_argument('archivo', nargs='?', help="Respaldo a verificar o restaurar")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    parser.add_argument('--dir', default=BACKUP_DIR, help="Directorio de respaldos")
+    parser.add_argument('--sin-comprimir', action='store_true', help="Guardar el .db sin gzip")
+    parser.add_argument('--conservar', type=int, default=14, help="Respaldos recientes a conservar al rotar")
+    args = parser.parse_args(argv)
+
+    if args.comando == 'crear':
+        print(f"💾 Respaldando {args.db}...")
+        resultado = crear_backup(args.db, args.dir, comprimir=not args.sin_comprimir, progreso=_imprimir_progreso)
+        print(f"\n✅ {resultado['archivo']}: {resultado['tamano_db'] / 1024:.0f} KB → "
+              f"{resultado['tamano_archivo'] / 1024:.0f} KB en {resultado['duracion']:.2f}s (integrity_check ok)")
+    elif args.comando == 'listar':
+        for ruta, fecha, tamano in listar_backups(args.dir):
+            print(f"{fecha:%Y-%m-%d %H:%M:%S}  {tamano / 1024:>10,.0f} KB  {ruta}")
+    elif args.comando == 'rotar':
+        borrados = rotar_backups(args.dir, args.conservar)
+        print(f"🗑️ {len(borrados)} respaldo(s) eliminados")
+    else:
+        if not args.archivo:
+            parser.error(f"'{args.comando}' necesita el archivo de respaldo")
+        if args.comando == 'verificar':
+            resultado = verificar_backup(args.archivo)
+            print(f"{'✅' if resultado == 'ok' else '❌'} integrity_check: {resultado}")
+            return 0 if resultado == 'ok' else 2
+        previo = restaurar_backup(args.archivo, args.db)
+        print(f"✅ {args.db} restaurada desde {args.archivo}")
+        if previo:
+            print(f"   Respaldo previo a la restauración: {previo['archivo']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
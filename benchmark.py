@@ -0,0 +1,358 @@
+"""
+Benchmark reproducible de las operaciones principales del punto de venta
+Corre sin navegador sobre una base sintética (generar_datos_sinteticos.py) o sobre una
+copia de una base existente, en un directorio temporal: la base real nunca se toca.
+
+Operaciones medidas:
+- escaneo_codigo: búsqueda de un producto por código (lo que pasa en cada escaneo)
+- cobro_ticket: cobrar_venta() de un ticket de varias líneas (su conexión, BEGIN IMMEDIATE,
+  descuento de stock condicional y commit), igual que la caja
+- stock_bajo_inventario / stock_bajo_pedidos: consultas de reabastecimiento (sin caché)
+- resumen_financiero / ventas_por_dia / listado_ventas: páginas de Finanzas sin interfaz
+- sync_*: push/pull de productos y ventas contra un Supabase simulado en memoria
+  (cuenta las peticiones de red que haría el sync real; --latencia-ms simula la red)
+
+Cada operación reporta p50/p95/mín/máx en ms y cuántas consultas/sentencias SQL hizo.
+El resultado es un JSON comparable entre corridas:
+
+    python benchmark.py --salida base.json
+    python benchmark.py --comparar base.json --tolerancia 0.2   # sale con 1 si algo empeoró
+    python benchmark.py --db respaldo.db --productos 0          # usar una copia de una base real
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+DIRECTORIO_REPO = os.path.dirname(os.path.abspath(__file__))
+NOMBRE_DB = "pos_cremeria.db"
+
+# === SUPABASE SIMULADO ===
+
+class _Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+class _ConsultaSimulada:
+    """Subconjunto de la API de supabase-py que usa sync_manager.py"""
+
+    def __init__(self, cliente, tabla):
+        self.cliente = cliente
+        self.tabla = tabla
+        self._filtros = []
+        self._limite = None
+        self._upsert = None
+
+    def select(self, columnas='*'):
+        return self
+
+    def eq(self, columna, valor):
+        self._filtros.append((columna, valor))
+        return self
+
+    def limit(self, cantidad):
+        self._limite = cantidad
+        return self
+
+    def upsert(self, datos, on_conflict='id'):
+        self._upsert = (datos, on_conflict)
+        return self
+
+    def execute(self):
+        self.cliente.peticiones += 1
+        if self.cliente.latencia:
+            time.sleep(self.cliente.latencia)
+        filas = self.cliente.tablas.setdefault(self.tabla, {})
+
+        if self._upsert is not None:
+            datos, clave = self._upsert
+            lista = datos if isinstance(datos, list) else [datos]
+            # El cliente real serializa el cuerpo de la petición
+            json.dumps(lista, default=str)
+            for fila in lista:
+                filas[fila.get(clave)] = dict(fila)
+            return _Respuesta(lista)
+
+        resultado = [dict(f) for f in filas.values() if all(f.get(c) == v for c, v in self._filtros)]
+        if self._limite is not None:
+            resultado = resultado[:self._limite]
+        return _Respuesta(resultado)
+
+class SupabaseSimulado:
+    """Tablas en memoria con contador de peticiones y latencia opcional por petición"""
+
+    def __init__(self, latencia_ms=0):
+        self.tablas = {}
+        self.peticiones = 0
+        self.latencia = latencia_ms / 1000
+
+    def table(self, nombre):
+        return _ConsultaSimulada(self, nombre)
+
+# === UTILIDADES ===
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicion = (len(ordenados) - 1) * p / 100
+    bajo = int(posicion)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (posicion - bajo)
+
+def _commit_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRECTORIO_REPO,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def _copiar_base(origen, destino):
+    """Copia consistente aunque la base esté en uso (API de respaldo de SQLite)"""
+    fuente = sqlite3.connect(origen)
+    copia = sqlite3.connect(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        copia.close()
+        fuente.close()
+
+# === OPERACIONES ===
+
+def _preparar_operaciones(args, rnd):
+    """Importar los módulos de la app (ya dentro del directorio de trabajo) y armar la lista de operaciones"""
+    import cache_manager
+    import finanzas
+    import inventario
+    import pedidos
+    import sync_manager
+    import ventas
+
+    cache = cache_manager.get_query_cache()
+    codigos = [fila[0] for fila in ventas.cursor.execute("SELECT codigo FROM productos ORDER BY codigo").fetchall()]
+    if not codigos:
+        raise RuntimeError("La base no tiene productos")
+
+    def escaneo_codigo():
+        producto = ventas.obtener_producto_por_codigo(rnd.choice(codigos))
+        return ventas.obtener_informacion_producto(producto)
+
+    def cobro_ticket():
+        carrito = []
+        for codigo in rnd.sample(codigos, min(args.lineas_ticket, len(codigos))):
+            info = ventas.obtener_informacion_producto(ventas.obtener_producto_por_codigo(codigo))
+            if info['tipo_venta'] == 'granel':
+                peso = round(rnd.uniform(0.2, 2.0), 3)
+                # Como en la caja, no se agrega al carrito lo que ya no tiene stock
+                if info['stock_kg'] < peso:
+                    continue
+                carrito.append({'codigo': codigo, 'nombre': info['nombre'], 'cantidad': 1, 'peso': peso,
+                                'precio_unitario': info['precio_por_kg'], 'tipo_venta': 'granel',
+                                'total': round(peso * info['precio_por_kg'], 2)})
+            elif info['stock'] >= 2:
+                carrito.append({'codigo': codigo, 'nombre': info['nombre'], 'cantidad': 2, 'peso': 0,
+                                'precio_unitario': info['precio_normal'], 'tipo_venta': 'unidad',
+                                'total': round(2 * info['precio_normal'], 2)})
+        total = round(sum(item['total'] for item in carrito), 2)
+        ventas.cobrar_venta(carrito, "Normal", "Efectivo", total, 0, 0, 0, total, usuario="benchmark",
+                            db_path=NOMBRE_DB)
+
+    # Supabase simulado: se siembra con los datos locales antes de medir los pulls
+    supabase = SupabaseSimulado(args.latencia_ms)
+    sync = sync_manager.SyncManager(NOMBRE_DB)
+    sync.supabase_db = SimpleNamespace(client=supabase)
+    sync.check_internet_connection = lambda: True
+    sync_manager.SUPABASE_AVAILABLE = True
+
+    def sembrar_supabase():
+        conn = sqlite3.connect(NOMBRE_DB)
+        conn.row_factory = sqlite3.Row
+        try:
+            for tabla, clave in (('productos', 'codigo'), ('ventas', 'id')):
+                supabase.tablas[tabla] = {fila[clave]: dict(fila) for fila in conn.execute(f"SELECT * FROM {tabla}")}
+        finally:
+            conn.close()
+
+    # (nombre, función, repeticiones, preparar antes de medir)
+    rapidas = args.repeticiones
+    lentas = args.repeticiones_sync
+    return supabase, [
+        ('escaneo_codigo', escaneo_codigo, rapidas * 10, None),
+        ('stock_bajo_inventario', inventario.obtener_productos_stock_bajo, rapidas, cache.limpiar),
+        ('stock_bajo_pedidos', pedidos.obtener_productos_bajo_stock, rapidas, cache.limpiar),
+        ('resumen_financiero', finanzas.mostrar_resumen_financiero_completo, rapidas, cache.limpiar),
+        ('ventas_por_dia', finanzas.mostrar_ventas_por_dia, rapidas, cache.limpiar),
+        ('listado_ventas', finanzas.mostrar_listado_ventas, rapidas, cache.limpiar),
+        ('cobro_ticket', cobro_ticket, rapidas * 5, None),
+        ('sync_push_productos', sync.sync_all_productos_to_supabase, lentas, None),
+        ('sync_push_ventas', sync.sync_all_ventas_to_supabase, lentas, None),
+        ('sync_pull_productos', sync.sync_all_productos_from_supabase, lentas, sembrar_supabase),
+        ('sync_pull_ventas', sync.sync_ventas_from_supabase, lentas, sembrar_supabase),
+    ]
+
+def medir_operacion(nombre, funcion, repeticiones, preparar, supabase, calentamiento=1):
+    """Tiempos (ms) y consultas SQL por repetición de una operación"""
+    from rendimiento import Perfilador
+
+    perfilador = Perfilador(umbral_lento_ms=float('inf'))
+    if preparar:
+        preparar()
+    for _ in range(calentamiento):
+        funcion()
+
+    tiempos, consultas, sentencias, peticiones = [], [], [], []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        peticiones_antes = supabase.peticiones
+        with perfilador.medir(nombre) as medicion:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(len(medicion['consultas']))
+        sentencias.append(len(medicion['sentencias']))
+        peticiones.append(supabase.peticiones - peticiones_antes)
+
+    return {
+        'n': repeticiones,
+        'p50_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(_percentil(tiempos, 95), 3),
+        'min_ms': round(min(tiempos), 3),
+        'max_ms': round(max(tiempos), 3),
+        'consultas': int(statistics.median(consultas)),
+        'sentencias': int(statistics.median(sentencias)),
+        'peticiones': int(statistics.median(peticiones)),
+    }
+
+def ejecutar(args):
+    """Preparar la base en un directorio temporal, medir y devolver el resultado como dict"""
+    # Nada de Supabase real; y las páginas de Finanzas corren sin servidor (modo "bare"): callar sus avisos
+    os.environ['USE_SUPABASE'] = 'false'
+    logging.disable(logging.WARNING)
+    from generar_datos_sinteticos import generar_base
+    from migraciones import ejecutar_migraciones
+
+    trabajo = tempfile.mkdtemp(prefix="benchmark_pos_")
+    ruta_db = os.path.join(trabajo, NOMBRE_DB)
+    directorio_original = os.getcwd()
+    try:
+        if args.db:
+            print(f"📋 Copiando {args.db}...")
+            _copiar_base(args.db, ruta_db)
+            ejecutar_migraciones(ruta_db)
+            conteos = None
+        else:
+            conteos = generar_base(ruta_db, args.productos, args.anios, args.tickets_dia,
+                                   semilla=args.semilla)
+
+        # Los módulos abren "pos_cremeria.db" relativo al directorio actual y algunos al importarse
+        os.chdir(trabajo)
+        from rendimiento import instalar_instrumentacion
+        instalar_instrumentacion()
+
+        rnd = random.Random(args.semilla)
+        supabase, operaciones = _preparar_operaciones(args, rnd)
+        seleccion = set(args.solo) if args.solo else None
+
+        resultados = {}
+        for nombre, funcion, repeticiones, preparar in operaciones:
+            if seleccion and nombre not in seleccion:
+                continue
+            print(f"⏱️ {nombre} ({repeticiones}x)...", end=" ", flush=True)
+            try:
+                resultados[nombre] = medir_operacion(nombre, funcion, repeticiones, preparar, supabase,
+                                                     calentamiento=0 if nombre.startswith('sync_') else 1)
+                r = resultados[nombre]
+                print(f"p50 {r['p50_ms']:.1f} ms · p95 {r['p95_ms']:.1f} ms · {r['consultas']} consultas"
+                      + (f" · {r['peticiones']} peticiones" if r['peticiones'] else ""))
+            except Exception as e:
+                resultados[nombre] = {'error': str(e)}
+                print(f"❌ {e}")
+
+        return {
+            'metadatos': {
+                'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'commit': _commit_git(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'plataforma': platform.platform(),
+                'base': os.path.abspath(os.path.join(directorio_original, args.db)) if args.db else 'sintetica',
+                'parametros': {
+                    'productos': args.productos, 'anios': args.anios, 'tickets_dia': args.tickets_dia,
+                    'semilla': args.semilla, 'repeticiones': args.repeticiones,
+                    'repeticiones_sync': args.repeticiones_sync, 'lineas_ticket': args.lineas_ticket,
+                    'latencia_ms': args.latencia_ms,
+                },
+                'filas': conteos,
+            },
+            'operaciones': resultados,
+        }
+    finally:
+        os.chdir(directorio_original)
+        if args.conservar:
+            print(f"📁 Directorio de trabajo conservado en {trabajo}")
+        else:
+            shutil.rmtree(trabajo, ignore_errors=True)
+
+def comparar(actual, base, tolerancia, minimo_ms=1.0):
+    """Operaciones cuyo p50 empeoró más que la tolerancia (ignorando diferencias menores a `minimo_ms`)"""
+    regresiones = []
+    print(f"\n{'Operación':<24}{'base p50':>12}{'actual p50':>12}{'cambio':>10}")
+    for nombre, medida in actual['operaciones'].items():
+        anterior = base.get('operaciones', {}).get(nombre)
+        if not anterior or 'p50_ms' not in anterior or 'p50_ms' not in medida:
+            continue
+        cambio = (medida['p50_ms'] - anterior['p50_ms']) / anterior['p50_ms'] if anterior['p50_ms'] else 0.0
+        empeoro = cambio > tolerancia and medida['p50_ms'] - anterior['p50_ms'] > minimo_ms
+        marca = " ⚠️" if empeoro else ""
+        print(f"{nombre:<24}{anterior['p50_ms']:>12.1f}{medida['p50_ms']:>12.1f}{cambio:>+10.0%}{marca}")
+        if empeoro:
+            regresiones.append(nombre)
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las operaciones principales del POS")
+    parser.add_argument('--db', help="Usar una copia de esta base en lugar de generar una sintética")
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--anios', type=float, default=1.0)
+    parser.add_argument('--tickets-dia', type=int, default=150)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--repeticiones-sync', type=int, default=1)
+    parser.add_argument('--lineas-ticket', type=int, default=5)
+    parser.add_argument('--latencia-ms', type=float, default=0, help="Latencia simulada por petición a Supabase")
+    parser.add_argument('--solo', nargs='+', metavar='OPERACION', help="Medir solo estas operaciones")
+    parser.add_argument('--salida', default="benchmark.json")
+    parser.add_argument('--comparar', metavar='BASE_JSON', help="Comparar contra un resultado anterior")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Empeoramiento permitido del p50 (0.2 = 20%%)")
+    parser.add_argument('--conservar', action='store_true', help="No borrar el directorio temporal")
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args)
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"✅ Resultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        regresiones = comparar(resultado, base, args.tolerancia)
+        if regresiones:
+            print(f"❌ Regresiones: {', '.join(regresiones)}")
+            return 1
+        print("✅ Sin regresiones")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
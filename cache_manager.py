@@ -0,0 +1,239 @@
+"""
+Caché de consultas para las páginas de Streamlit
+Memoriza resultados por (consulta, parámetros, versión de tablas) con TTL y expulsión LRU.
+
+Las versiones de tablas las mantienen triggers de SQLite en la tabla `cambios_tablas`,
+así que cualquier escritura (de esta app, de otra caja o de un script) invalida el caché
+sin que cada módulo tenga que acordarse de limpiarlo. Para no consultar esa tabla en cada
+lectura se usa `PRAGMA data_version`, que solo cambia cuando otra conexión hizo commit.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+DB_PATH = "pos_cremeria.db"
+
+# Tablas cuya versión se controla con triggers
+TABLAS_VERSIONADAS = [
+    'productos',
+    'ventas',
+    'creditos_pendientes',
+    'pedidos',
+    'pedidos_items',
+    'ordenes_compra',
+    'egresos_adicionales',
+    'ingresos_pasivos',
+    'usuarios_admin',
+    'turnos',
+    'movimientos_inventario',
+    'pronostico_demanda',
+]
+
+def instalar_control_versiones(conn, tablas: Iterable[str] = TABLAS_VERSIONADAS, commit=True):
+    """Crear la tabla `cambios_tablas` y los triggers que incrementan la versión de cada tabla"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cambios_tablas (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    existentes = {
+        fila[0] for fila in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+
+    for tabla in tablas:
+        if tabla not in existentes:
+            continue
+
+        cursor.execute("INSERT OR IGNORE INTO cambios_tablas (tabla, version) VALUES (?, 0)", (tabla,))
+        for operacion in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_version_{tabla}_{operacion.lower()}
+                AFTER {operacion} ON {tabla}
+                BEGIN
+                    UPDATE cambios_tablas SET version = version + 1 WHERE tabla = '{tabla}';
+                END
+            ''')
+
+    if commit:
+        conn.commit()
+
+
+class QueryCache:
+    """Caché LRU con TTL cuyas claves incluyen la versión de las tablas consultadas"""
+
+    def __init__(self, db_path=DB_PATH, max_entradas=256, ttl_default=300):
+        self.db_path = db_path
+        self.max_entradas = max_entradas
+        self.ttl_default = ttl_default
+
+        # clave -> (expira_en, tablas, valor)
+        self._entradas = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._conn = None
+        self._data_version = None
+        self._versiones: Dict[str, int] = {}
+        # Incrementos hechos en este proceso (por si los triggers aún no existen)
+        self._versiones_locales: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.expulsiones = 0
+
+    def _get_conn(self):
+        """Conexión dedicada para leer versiones (nunca escribe datos de negocio)"""
+        if self._conn is None:
+            # Los triggers de versión los instalan las migraciones
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+    def obtener_versiones(self) -> Dict[str, int]:
+        """Versiones actuales de las tablas, releyendo solo si otra conexión hizo commit"""
+        with self._lock:
+            conn = self._get_conn()
+            try:
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    self._versiones = dict(
+                        conn.execute("SELECT tabla, version FROM cambios_tablas").fetchall()
+                    )
+                    self._data_version = data_version
+            except sqlite3.Error as e:
+                print(f"Error al leer versiones de tablas: {e}")
+            return self._versiones
+
+    def _firma_tablas(self, tablas):
+        versiones = self.obtener_versiones()
+        return tuple(
+            (tabla, versiones.get(tabla, 0), self._versiones_locales.get(tabla, 0))
+            for tabla in tablas
+        )
+
+    def obtener(self, nombre, args, kwargs, tablas, ttl, calcular):
+        """Devolver el valor cacheado o calcularlo con `calcular()`"""
+        try:
+            clave = (nombre, args, tuple(sorted(kwargs.items())), self._firma_tablas(tablas))
+            hash(clave)
+        except TypeError:
+            # Argumentos no hashables (ej. DataFrames): no se cachea
+            return calcular()
+
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                expira, _, valor = entrada
+                if expira > ahora:
+                    self._entradas.move_to_end(clave)
+                    self.hits += 1
+                    return _copiar(valor)
+                del self._entradas[clave]
+            self.misses += 1
+
+        valor = calcular()
+
+        with self._lock:
+            self._entradas[clave] = (ahora + (ttl if ttl is not None else self.ttl_default), tuple(tablas), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+        return _copiar(valor)
+
+    def invalidar_tablas(self, *tablas):
+        """Descartar las entradas que dependen de las tablas indicadas"""
+        with self._lock:
+            for tabla in tablas:
+                self._versiones_locales[tabla] = self._versiones_locales.get(tabla, 0) + 1
+
+            afectadas = [
+                clave for clave, (_, tablas_entrada, _) in self._entradas.items()
+                if any(t in tablas_entrada for t in tablas)
+            ]
+            for clave in afectadas:
+                del self._entradas[clave]
+
+    def limpiar(self):
+        """Vaciar todo el caché"""
+        with self._lock:
+            self._entradas.clear()
+
+    def obtener_estadisticas(self) -> Dict[str, float]:
+        """Contadores de aciertos/fallos para diagnóstico"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entradas': len(self._entradas),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expulsiones': self.expulsiones,
+                'tasa_aciertos': round(self.hits / total * 100, 1) if total else 0.0,
+            }
+
+
+def _copiar(valor):
+    """Evitar que quien llama modifique el objeto guardado en caché"""
+    if isinstance(valor, (pd.DataFrame, pd.Series, list, dict)):
+        return valor.copy()
+    return valor
+
+# Instancia global del caché
+_query_cache = None
+
+def get_query_cache() -> QueryCache:
+    """Obtener instancia única del caché de consultas"""
+    global _query_cache
+    if _query_cache is None:
+        _query_cache = QueryCache()
+    return _query_cache
+
+def cache_consulta(tablas: Iterable[str], ttl: Optional[int] = None):
+    """Decorador para memorizar funciones de lectura según la versión de `tablas`
+
+    Ejemplo:
+        @cache_consulta(tablas=['productos'])
+        def obtener_productos(): ...
+    """
+    tablas = tuple(tablas)
+
+    def decorador(func):
+        nombre = f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def envoltura(*args, **kwargs):
+            return get_query_cache().obtener(
+                nombre, args, kwargs, tablas, ttl, lambda: func(*args, **kwargs)
+            )
+
+        # Acceso directo sin caché (útil para depurar)
+        envoltura.sin_cache = func
+        return envoltura
+
+    return decorador
+
+def leer_sql(query: str, params=(), tablas: Iterable[str] = (), ttl: Optional[int] = None,
+             db_path: str = DB_PATH) -> pd.DataFrame:
+    """Equivalente cacheado de `pd.read_sql_query` para consultas en línea"""
+    params = tuple(params) if params else ()
+
+    def calcular():
+        conn = sqlite3.connect(db_path)
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    return get_query_cache().obtener('leer_sql', (db_path, query, params), {}, tuple(tablas), ttl, calcular)
+
+def invalidar_tablas(*tablas):
+    """Atajo para invalidar el caché después de una escritura"""
+    get_query_cache().invalidar_tablas(*tablas)
@@ -0,0 +1,179 @@
+"""
+Bus de notificaciones de cambios en la base de datos
+Publica qué tablas cambiaron (según las versiones de `cambios_tablas` que mantienen
+los triggers de cache_manager) para que cada página sepa si tiene algo nuevo que mostrar.
+
+Un hilo revisa `PRAGMA data_version` cada pocos segundos; solo cuando otra conexión
+(otra caja, el admin o un script) hizo commit se leen las versiones y se avisa a los
+suscriptores. El caché de consultas se suscribe para descartar sus entradas viejas.
+"""
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set
+
+import streamlit as st
+
+from cache_manager import get_query_cache
+
+# Tablas que muestra cada página del menú principal
+TABLAS_POR_PAGINA = {
+    "Punto de Venta": ('productos', 'ventas', 'creditos_pendientes'),
+    "Gestión de Productos": ('productos',),
+    "Inventario": ('productos',),
+    "Pedidos y Reabastecimiento": ('productos', 'pedidos', 'pedidos_items'),
+    "Finanzas": ('ventas', 'productos', 'ordenes_compra', 'egresos_adicionales', 'ingresos_pasivos'),
+    "Turnos y Atención al Cliente": ('turnos',),
+    "Gestión de Usuarios": ('usuarios_admin',),
+}
+
+
+class NotificadorCambios:
+    """Pub/sub en proceso alimentado por las versiones de tablas"""
+
+    def __init__(self, intervalo=2.0):
+        self.intervalo = intervalo
+        self._versiones: Dict[str, int] = {}
+        self._suscriptores = {}
+        self._siguiente_id = 0
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def suscribir(self, callback: Callable[[Set[str]], None], tablas: Optional[Iterable[str]] = None) -> int:
+        """Registrar `callback(tablas_cambiadas)`; si se indican `tablas`, solo avisa de esas"""
+        with self._lock:
+            self._siguiente_id += 1
+            self._suscriptores[self._siguiente_id] = (set(tablas) if tablas else None, callback)
+            return self._siguiente_id
+
+    def desuscribir(self, suscripcion_id: int):
+        with self._lock:
+            self._suscriptores.pop(suscripcion_id, None)
+
+    def revisar(self) -> Set[str]:
+        """Comparar versiones actuales con las últimas conocidas y publicar las diferencias"""
+        versiones = dict(get_query_cache().obtener_versiones())
+
+        with self._lock:
+            primera_vez = not self._versiones
+            cambiadas = {
+                tabla for tabla, version in versiones.items()
+                if self._versiones.get(tabla) != version
+            }
+            self._versiones = versiones
+            suscriptores = list(self._suscriptores.values())
+
+        if primera_vez or not cambiadas:
+            return set()
+
+        for tablas, callback in suscriptores:
+            interesantes = cambiadas if tablas is None else cambiadas & tablas
+            if not interesantes:
+                continue
+            try:
+                callback(interesantes)
+            except Exception as e:
+                print(f"Error en suscriptor de cambios: {e}")
+
+        return cambiadas
+
+    def versiones_actuales(self) -> Dict[str, int]:
+        """Versiones de todas las tablas (revisa primero si hubo commits nuevos)"""
+        self.revisar()
+        with self._lock:
+            return dict(self._versiones)
+
+    def _ciclo(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.revisar()
+            except Exception as e:
+                print(f"Error al revisar cambios: {e}")
+
+    def iniciar(self):
+        """Arrancar el hilo de revisión (una sola vez por proceso)"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self.revisar()
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name="notificador-cambios", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+
+# Instancia global del notificador
+_notificador = None
+
+def get_notificador() -> NotificadorCambios:
+    """Obtener instancia única del notificador (arranca el hilo y suscribe el caché)"""
+    global _notificador
+    if _notificador is None:
+        _notificador = NotificadorCambios()
+        _notificador.suscribir(lambda tablas: get_query_cache().invalidar_tablas(*tablas))
+        _notificador.iniciar()
+    return _notificador
+
+
+def _firma_pagina(pagina, tablas=None):
+    tablas = tuple(tablas) if tablas else TABLAS_POR_PAGINA.get(pagina, ())
+    versiones = get_notificador().versiones_actuales()
+    return {tabla: versiones.get(tabla, 0) for tabla in tablas}
+
+def cambios_pendientes(pagina, tablas=None) -> Set[str]:
+    """Tablas de `pagina` que cambiaron desde su último render en esta sesión (no marca nada)"""
+    vistas = st.session_state.get(f"_versiones_vistas_{pagina}")
+    firma = _firma_pagina(pagina, tablas)
+    if vistas is None:
+        return set()
+    return {tabla for tabla, version in firma.items() if vistas.get(tabla) != version}
+
+def tablas_cambiadas(pagina, tablas=None) -> Set[str]:
+    """Tablas de `pagina` que cambiaron desde su último render, y marcarlas como vistas
+
+    En el primer render de la sesión devuelve todas las tablas de la página.
+    """
+    clave = f"_versiones_vistas_{pagina}"
+    vistas = st.session_state.get(clave)
+    firma = _firma_pagina(pagina, tablas)
+    st.session_state[clave] = firma
+    if vistas is None:
+        cambiadas = set(firma)
+    else:
+        cambiadas = {tabla for tabla, version in firma.items() if vistas.get(tabla) != version}
+    # Lo consultan las secciones de la página durante este render (ver datos_de_pagina)
+    st.session_state['_cambios_render'] = (pagina, set(firma), cambiadas)
+    return cambiadas
+
+def datos_de_pagina(clave, tablas, cargar, *args):
+    """Resultado de `cargar(*args)` guardado en la sesión entre reruns
+
+    Solo se vuelve a consultar si alguna de `tablas` cambió desde el render anterior de la
+    página (según tablas_cambiadas(), que main.py llama antes de mostrarla) o si cambian
+    los argumentos. Las tablas que la página no vigila se consultan siempre.
+    """
+    pagina, vigiladas, cambiadas = st.session_state.get('_cambios_render', (None, set(), set()))
+    clave = f"_datos_{pagina}_{clave}"
+    guardado = st.session_state.get(clave)
+    tablas = set(tablas)
+    if guardado is not None and guardado[0] == args and tablas <= vigiladas and not (tablas & cambiadas):
+        return guardado[1]
+    resultado = cargar(*args)
+    st.session_state[clave] = (args, resultado)
+    return resultado
+
+
+# st.fragment existe desde Streamlit 1.37; en versiones anteriores el aviso se
+# muestra solo en cada rerun normal
+_fragmento = st.fragment(run_every=5) if hasattr(st, 'fragment') else (lambda func: func)
+
+@_fragmento
+def mostrar_aviso_cambios(pagina):
+    """Avisar en la barra lateral cuando otra sesión modificó los datos de la página"""
+    cambios = cambios_pendientes(pagina)
+    if not cambios:
+        return
+
+    st.info(f"🔔 Hay cambios nuevos en: {', '.join(sorted(cambios))}")
+    if st.button("🔄 Actualizar vista", key=f"actualizar_cambios_{pagina}", width='stretch'):
+        st.rerun()
@@ -0,0 +1,177 @@
+"""
+Conciliación de stock
+Recalcula el stock esperado de todos los productos a partir de los documentos:
+
+    saldo inicial del kardex
+    + cantidades recibidas en pedidos (pedidos_items de pedidos RECIBIDO/COMPLETADO)
+    - unidades / kg vendidos (ventas)
+    + ajustes manuales registrados en el kardex (AJUSTE)
+
+Las correcciones (CORRECCION) no entran al cálculo: son el resultado de conciliar,
+no un documento de origen.
+
+Todo se calcula con consultas agregadas (una pasada por tabla), se muestra la
+diferencia contra el stock actual y, con --aplicar, se corrige en una sola transacción
+registrando cada corrección como movimiento CORRECCION del kardex.
+Reemplaza a los scripts de corrección manual por producto (corregir_stock.py, etc.).
+
+Uso:
+    python conciliar_stock.py                    # solo mostrar diferencias
+    python conciliar_stock.py --codigo 11111     # un producto
+    python conciliar_stock.py --aplicar          # corregir todas las diferencias
+    python conciliar_stock.py --csv diferencias.csv
+"""
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from archivo_historico import conectar_historico
+from kardex import TOLERANCIA, crear_tabla_movimientos, registrar_movimiento
+
+DB_PATH = "pos_cremeria.db"
+
+# Stock esperado por producto. Los documentos solo cuentan si son posteriores al saldo
+# inicial del producto (ventas y kardex guardan hora local; ordenes_compra, UTC).
+QUERY_CONCILIACION = '''
+    WITH apertura AS (
+        SELECT codigo,
+               MIN(fecha) AS fecha_apertura,
+               SUM(cantidad) AS saldo_inicial,
+               SUM(cantidad_kg) AS saldo_inicial_kg
+        FROM movimientos_inventario
+        WHERE tipo_movimiento = 'SALDO_INICIAL'
+        GROUP BY codigo
+    ),
+    ajustes AS (
+        SELECT codigo, SUM(cantidad) AS ajustes, SUM(cantidad_kg) AS ajustes_kg
+        FROM movimientos_inventario
+        WHERE tipo_movimiento = 'AJUSTE'
+        GROUP BY codigo
+    ),
+    recepciones AS (
+        SELECT pi.codigo_producto AS codigo, SUM(pi.cantidad_recibida) AS recibido
+        FROM pedidos_items pi
+        JOIN pedidos pe ON pe.id = pi.pedido_id
+        LEFT JOIN (
+            SELECT pedido_id, MIN(fecha_creacion) AS fecha_recepcion
+            FROM ordenes_compra
+            GROUP BY pedido_id
+        ) oc ON oc.pedido_id = pe.id
+        JOIN apertura a ON a.codigo = pi.codigo_producto
+        WHERE pe.estado IN ('RECIBIDO', 'COMPLETADO')
+          AND pi.cantidad_recibida > 0
+          AND datetime(COALESCE(oc.fecha_recepcion, pe.fecha_creacion), 'localtime') > a.fecha_apertura
+        GROUP BY pi.codigo_producto
+    ),
+    vendidos AS (
+        SELECT v.codigo,
+               SUM(CASE WHEN v.tipo_venta = 'granel' THEN 0 ELSE v.cantidad END) AS vendido,
+               SUM(CASE WHEN v.tipo_venta = 'granel' THEN v.peso_vendido ELSE 0 END) AS vendido_kg
+        FROM ventas v
+        JOIN apertura a ON a.codigo = v.codigo
+        WHERE v.fecha > a.fecha_apertura
+        GROUP BY v.codigo
+    )
+    SELECT p.codigo, p.nombre, p.tipo_venta,
+           COALESCE(p.stock, 0) AS stock_actual,
+           COALESCE(p.stock_kg, 0) AS stock_kg_actual,
+           COALESCE(a.saldo_inicial, 0) AS saldo_inicial,
+           COALESCE(a.saldo_inicial_kg, 0) AS saldo_inicial_kg,
+           CASE WHEN p.tipo_venta = 'granel' THEN 0 ELSE COALESCE(r.recibido, 0) END AS recibido,
+           CASE WHEN p.tipo_venta = 'granel' THEN COALESCE(r.recibido, 0) ELSE 0 END AS recibido_kg,
+           COALESCE(v.vendido, 0) AS vendido,
+           COALESCE(v.vendido_kg, 0) AS vendido_kg,
+           COALESCE(j.ajustes, 0) AS ajustes,
+           COALESCE(j.ajustes_kg, 0) AS ajustes_kg
+    FROM productos p
+    JOIN apertura a ON a.codigo = p.codigo
+    LEFT JOIN recepciones r ON r.codigo = p.codigo
+    LEFT JOIN vendidos v ON v.codigo = p.codigo
+    LEFT JOIN ajustes j ON j.codigo = p.codigo
+'''
+
+def calcular_conciliacion(conn, codigo=None) -> pd.DataFrame:
+    """Stock esperado vs actual de cada producto (solo lectura)"""
+    query = QUERY_CONCILIACION
+    params = ()
+    if codigo:
+        query += " WHERE p.codigo = ?"
+        params = (codigo,)
+
+    df = pd.read_sql_query(query, conn, params=params)
+
+    df['stock_esperado'] = df['saldo_inicial'] + df['recibido'] - df['vendido'] + df['ajustes']
+    df['stock_kg_esperado'] = (
+        df['saldo_inicial_kg'] + df['recibido_kg'] - df['vendido_kg'] + df['ajustes_kg']
+    ).round(3)
+
+    # Cada producto se concilia en la columna que usa su tipo de venta
+    es_granel = df['tipo_venta'] == 'granel'
+    df['diferencia'] = (df['stock_esperado'] - df['stock_actual']).where(~es_granel, 0)
+    df['diferencia_kg'] = (df['stock_kg_esperado'] - df['stock_kg_actual']).round(3).where(es_granel, 0)
+    return df
+
+def obtener_diferencias(conn, codigo=None) -> pd.DataFrame:
+    df = calcular_conciliacion(conn, codigo)
+    return df[(df['diferencia'] != 0) | (df['diferencia_kg'].abs() > TOLERANCIA)].reset_index(drop=True)
+
+def aplicar_correcciones(conn, diferencias: pd.DataFrame, usuario='conciliar_stock.py'):
+    """Registrar todas las correcciones en una sola transacción"""
+    cursor = conn.cursor()
+    try:
+        for fila in diferencias.itertuples(index=False):
+            registrar_movimiento(
+                cursor, fila.codigo, 'CORRECCION',
+                cantidad=int(fila.diferencia), cantidad_kg=float(fila.diferencia_kg),
+                referencia_tipo='conciliacion', usuario=usuario,
+                notas=f"Conciliación: esperado {fila.stock_kg_esperado:g} kg" if fila.tipo_venta == 'granel'
+                      else f"Conciliación: esperado {fila.stock_esperado:g} unidades"
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(diferencias)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conciliar stock contra ventas, pedidos y kardex")
+    parser.add_argument('--codigo', help="Conciliar solo este producto")
+    parser.add_argument('--aplicar', action='store_true', help="Corregir las diferencias encontradas")
+    parser.add_argument('--csv', help="Guardar las diferencias en un archivo CSV")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    # Las ventas archivadas también cuentan desde el saldo inicial
+    conn = conectar_historico(None, args.db)
+    try:
+        crear_tabla_movimientos(conn)
+        diferencias = obtener_diferencias(conn, args.codigo)
+        duracion = time.perf_counter() - inicio
+
+        if diferencias.empty:
+            print(f"✅ Todo el stock cuadra ({duracion:.2f}s)")
+            return 0
+
+        columnas = ['codigo', 'nombre', 'tipo_venta', 'stock_actual', 'stock_esperado', 'diferencia',
+                    'stock_kg_actual', 'stock_kg_esperado', 'diferencia_kg']
+        print(f"⚠️ {len(diferencias)} producto(s) con diferencias ({duracion:.2f}s):\n")
+        print(diferencias[columnas].to_string(index=False))
+
+        if args.csv:
+            diferencias.to_csv(args.csv, index=False)
+            print(f"\n💾 Diferencias guardadas en {args.csv}")
+
+        if args.aplicar:
+            corregidos = aplicar_correcciones(conn, diferencias)
+            print(f"\n✅ {corregidos} producto(s) corregidos (movimientos CORRECCION en el kardex)")
+            return 0
+        print("\nUsa --aplicar para corregir")
+        return 2
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -54,6 +54,104 @@ def get_admin_credentials():
             "password": os.getenv("ADMIN_PASSWORD", "admin123")
         }
 
+def get_backup_dir():
+    """Directorio donde se guardan los respaldos automáticos"""
+    try:
+        return st.secrets["backup"]["dir"]
+    except (KeyError, FileNotFoundError):
+        return os.getenv("BACKUP_DIR", "backups")
+
+def get_backup_interval_hours():
+    """Horas entre respaldos automáticos (0 = desactivados)"""
+    try:
+        return float(st.secrets["backup"]["interval_hours"])
+    except (KeyError, FileNotFoundError):
+        return float(os.getenv("BACKUP_INTERVAL_HOURS", "4"))
+
+def get_backup_keep():
+    """Número de respaldos recientes que se conservan al rotar"""
+    try:
+        return int(st.secrets["backup"]["keep"])
+    except (KeyError, FileNotFoundError):
+        return int(os.getenv("BACKUP_KEEP", "14"))
+
+def get_maintenance_interval_hours():
+    """Horas mínimas entre ciclos de mantenimiento de la base (0 = desactivado)"""
+    try:
+        return float(st.secrets["maintenance"]["interval_hours"])
+    except (KeyError, FileNotFoundError):
+        return float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "6"))
+
+def get_maintenance_idle_minutes():
+    """Minutos sin escrituras para considerar la base inactiva y dar mantenimiento"""
+    try:
+        return float(st.secrets["maintenance"]["idle_minutes"])
+    except (KeyError, FileNotFoundError):
+        return float(os.getenv("MAINTENANCE_IDLE_MINUTES", "10"))
+
+def get_stock_changes_retention_days():
+    """Días que se conservan en `cambios_stock` (monitor de stock); 0 = no purgar"""
+    try:
+        return int(st.secrets["stock_monitor"]["retention_days"])
+    except (KeyError, FileNotFoundError):
+        return int(os.getenv("STOCK_CHANGES_RETENTION_DAYS", "30"))
+
+def get_archive_keep_months():
+    """Meses de ventas/créditos/turnos que se quedan en la base viva al archivar"""
+    try:
+        return int(st.secrets["archive"]["keep_months"])
+    except (KeyError, FileNotFoundError):
+        return int(os.getenv("ARCHIVE_KEEP_MONTHS", "12"))
+
+def get_profiling_enabled():
+    """Medir las consultas de SQLite de cada rerun (página Rendimiento)"""
+    try:
+        return bool(st.secrets["profiling"]["enabled"])
+    except (KeyError, FileNotFoundError):
+        return os.getenv("PROFILING", "1") == "1"
+
+def get_profiling_slow_ms():
+    """Milisegundos a partir de los cuales un rerun se considera lento"""
+    try:
+        return float(st.secrets["profiling"]["slow_ms"])
+    except (KeyError, FileNotFoundError):
+        return float(os.getenv("PROFILING_SLOW_MS", "1500"))
+
+def get_profiling_traces():
+    """Guardar trazas de pyinstrument/cProfile de los reruns lentos (agrega sobrecarga)"""
+    try:
+        return bool(st.secrets["profiling"]["traces"])
+    except (KeyError, FileNotFoundError):
+        return os.getenv("PROFILING_TRACES", "0") == "1"
+
+def get_profiling_slow_query_ms():
+    """Milisegundos a partir de los cuales una consulta va al log de consultas lentas"""
+    try:
+        return float(st.secrets["profiling"]["slow_query_ms"])
+    except (KeyError, FileNotFoundError):
+        return float(os.getenv("PROFILING_SLOW_QUERY_MS", "200"))
+
+def get_profiling_n1_threshold():
+    """Repeticiones de la misma consulta en un rerun para marcarla como N+1"""
+    try:
+        return int(st.secrets["profiling"]["n1_threshold"])
+    except (KeyError, FileNotFoundError):
+        return int(os.getenv("PROFILING_N1_THRESHOLD", "10"))
+
+def get_sync_pull_minutes(tabla, defecto=10):
+    """Minutos entre descargas programadas de `tabla` desde Supabase (0 = no descargar)"""
+    try:
+        return float(st.secrets["sync"][f"pull_minutes_{tabla}"])
+    except (KeyError, FileNotFoundError):
+        return float(os.getenv(f"SYNC_PULL_MINUTES_{tabla.upper()}", str(defecto)))
+
+def get_reorder_cover_days():
+    """Días de venta que debe cubrir la cantidad sugerida en los pedidos"""
+    try:
+        return int(st.secrets["reorder"]["cover_days"])
+    except (KeyError, FileNotFoundError):
+        return int(os.getenv("REORDER_COVER_DAYS", "7"))
+
 # Verificar si estamos en modo desarrollo o producción
 def is_production():
     """Verificar si la app está en producción"""
@@ -1,4 +1,7 @@
+# Script de corrección puntual del producto 11111.
+# Para conciliar todo el inventario usa: python conciliar_stock.py [--aplicar]
 import sqlite3
+from kardex import registrar_movimiento
 
 conn = sqlite3.connect('pos_cremeria.db')
 cursor = conn.cursor()
@@ -14,8 +17,9 @@ print(f"Stock correcto debería ser: {stock_actual - 20} unidades")
 respuesta = input("\n¿Deseas corregir el stock? (si/no): ")
 
 if respuesta.lower() == 'si':
-    nuevo_stock = stock_actual - 20
-    cursor.execute("UPDATE productos SET stock = ? WHERE codigo = '11111'", (nuevo_stock,))
+    nuevo_stock, _ = registrar_movimiento(cursor, '11111', 'CORRECCION', cantidad=-20,
+                                          usuario='corregir_stock.py',
+                                          notas='Venta de 20 unidades no descontada del stock')
     conn.commit()
     print(f"\n✅ Stock actualizado a {nuevo_stock} unidades")
 else:
@@ -1,4 +1,7 @@
+# Script de corrección puntual del producto 11111.
+# Para conciliar todo el inventario usa: python conciliar_stock.py [--aplicar]
 import sqlite3
+from kardex import registrar_movimiento
 
 conn = sqlite3.connect('pos_cremeria.db')
 cursor = conn.cursor()
@@ -15,8 +18,10 @@ stock_correcto = stock_actual - ventas_sin_reflejar
 print(f'3 ventas de 20 unidades cada una = {ventas_sin_reflejar} unidades')
 print(f'Stock correcto debería ser: {stock_correcto} unidades')
 
-# Actualizar
-cursor.execute('UPDATE productos SET stock = ? WHERE codigo = "11111"', (stock_correcto,))
+# Actualizar (la corrección queda registrada en el kardex)
+registrar_movimiento(cursor, '11111', 'CORRECCION', cantidad=-ventas_sin_reflejar,
+                     usuario='corregir_yogurt_final.py',
+                     notas='3 ventas de 20 unidades no descontadas del stock')
 conn.commit()
 
 print(f'\n✅ Stock actualizado a {stock_correcto} unidades')
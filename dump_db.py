@@ -1,11 +1,26 @@
 """
 Script para hacer dump de la base de datos SQLite a formato SQL
 Equivalente a: sqlite3 pos_cremeria.db .dump > pos_cremeria.sql
+
+Para bases grandes hay una ruta rápida (exportar / restaurar-rapido):
+- exportar: un archivo comprimido por tabla (JSON por línea) y un manifest.json con
+  el esquema, el conteo de filas y un checksum por tabla.
+- restaurar-rapido: desde un respaldo de backup_manager (.db / .db.gz, se copia con la
+  API de backup) o desde una exportación (carga con executemany por lotes, sin journal,
+  e índices y triggers creados al final). Luego compara conteos y checksums.
 """
+import base64
+import gzip
+import hashlib
+import json
 import sqlite3
 import os
+import time
 from datetime import datetime
 
+# Filas por lote en la carga masiva
+TAMANO_LOTE = 5000
+
 def dump_database(db_path, output_file=None):
     """Hacer dump de la base de datos a archivo SQL"""
     
@@ -87,6 +102,228 @@ def restaurar_database(sql_file, db_path=None):
         print(f"❌ Error al restaurar: {e}")
         return False
 
+# === EXPORTACIÓN / RESTAURACIÓN RÁPIDA ===
+
+def _a_json(valor):
+    if isinstance(valor, bytes):
+        return {"$b64": base64.b64encode(valor).decode('ascii')}
+    return valor
+
+def _de_json(valor):
+    if isinstance(valor, dict) and "$b64" in valor:
+        return base64.b64decode(valor["$b64"])
+    return valor
+
+def _linea_fila(fila):
+    try:
+        return json.dumps(fila, ensure_ascii=False, separators=(',', ':'))
+    except TypeError:
+        # Solo las filas con BLOB pasan por la conversión a base64
+        return json.dumps([_a_json(v) for v in fila], ensure_ascii=False, separators=(',', ':'))
+
+def _tablas_usuario(conn):
+    """Tablas con su CREATE, sin las internas de SQLite"""
+    return conn.execute('''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+        ORDER BY name
+    ''').fetchall()
+
+def _checksum_tabla(conn, tabla):
+    """(filas, sha256) de una tabla recorrida en orden de rowid"""
+    digest = hashlib.sha256()
+    filas = 0
+    for fila in conn.execute(f'SELECT * FROM "{tabla}" ORDER BY rowid'):
+        digest.update(_linea_fila(fila).encode('utf-8'))
+        digest.update(b"\n")
+        filas += 1
+    return filas, digest.hexdigest()
+
+def exportar_tablas(db_path, destino_dir=None):
+    """Exportar cada tabla a `<tabla>.jsonl.gz` más un manifest.json"""
+    if not os.path.exists(db_path):
+        print(f"❌ Base de datos no encontrada: {db_path}")
+        return None
+
+    if destino_dir is None:
+        destino_dir = f"pos_cremeria_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    os.makedirs(destino_dir, exist_ok=True)
+
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        # Una sola transacción de lectura: todas las tablas del mismo instante
+        conn.execute("BEGIN")
+        manifiesto = {
+            'creado': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'origen': os.path.abspath(db_path),
+            'user_version': conn.execute("PRAGMA user_version").fetchone()[0],
+            'journal_mode': conn.execute("PRAGMA journal_mode").fetchone()[0],
+            'tablas': {},
+            'indices': [fila[0] for fila in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")],
+            'triggers': [fila[0] for fila in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger'")],
+            'vistas': [fila[0] for fila in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'view'")],
+        }
+
+        tablas = _tablas_usuario(conn)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+            tablas.append(('sqlite_sequence', None))
+
+        for tabla, sql in tablas:
+            cursor = conn.execute(f'SELECT * FROM "{tabla}" ORDER BY rowid')
+            columnas = [d[0] for d in cursor.description]
+            digest = hashlib.sha256()
+            filas = 0
+            archivo = f"{tabla}.jsonl.gz"
+            with gzip.open(os.path.join(destino_dir, archivo), 'wt', encoding='utf-8', compresslevel=6) as f:
+                for fila in cursor:
+                    linea = _linea_fila(fila)
+                    f.write(linea + "\n")
+                    digest.update(linea.encode('utf-8'))
+                    digest.update(b"\n")
+                    filas += 1
+            manifiesto['tablas'][tabla] = {
+                'sql': sql, 'columnas': columnas, 'filas': filas,
+                'checksum': digest.hexdigest(), 'archivo': archivo,
+            }
+            print(f"   {tabla}: {filas:,} filas")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    with open(os.path.join(destino_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Exportación completada en {time.perf_counter() - inicio:.2f}s: {os.path.abspath(destino_dir)}")
+    return destino_dir
+
+def _cargar_exportacion(origen_dir, db_path):
+    """Carga masiva de una exportación en una base nueva; devuelve el manifiesto"""
+    with open(os.path.join(origen_dir, "manifest.json"), 'r', encoding='utf-8') as f:
+        manifiesto = json.load(f)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # Base nueva y sin lectores: si falla se descarta, así que no hace falta journal
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        conn.execute("PRAGMA cache_size = -65536")
+
+        conn.execute("BEGIN")
+        for tabla, info in manifiesto['tablas'].items():
+            if info['sql']:
+                conn.execute(info['sql'])
+
+        for tabla, info in manifiesto['tablas'].items():
+            if tabla == 'sqlite_sequence':
+                # Las inserciones con id explícito ya la llenaron; se reemplaza con la original
+                conn.execute("DELETE FROM sqlite_sequence")
+            marcadores = ", ".join("?" for _ in info['columnas'])
+            columnas = ", ".join(f'"{c}"' for c in info['columnas'])
+            insertar = f'INSERT INTO "{tabla}" ({columnas}) VALUES ({marcadores})'
+
+            lote = []
+            with gzip.open(os.path.join(origen_dir, info['archivo']), 'rt', encoding='utf-8') as f:
+                for linea in f:
+                    fila = json.loads(linea)
+                    if '"$b64"' in linea:
+                        fila = [_de_json(v) for v in fila]
+                    lote.append(fila)
+                    if len(lote) >= TAMANO_LOTE:
+                        conn.executemany(insertar, lote)
+                        lote.clear()
+            if lote:
+                conn.executemany(insertar, lote)
+
+        # Índices y triggers al final: se construyen una vez y los triggers no se disparan en la carga
+        for sql in manifiesto['indices'] + manifiesto['vistas'] + manifiesto['triggers']:
+            conn.execute(sql)
+        conn.execute(f"PRAGMA user_version = {int(manifiesto['user_version'])}")
+        conn.execute("COMMIT")
+
+        conn.execute("PRAGMA locking_mode = NORMAL")
+        conn.execute(f"PRAGMA journal_mode = {manifiesto.get('journal_mode') or 'DELETE'}")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return manifiesto
+
+def verificar_contra_manifiesto(db_path, manifiesto):
+    """Comparar conteos y checksums de cada tabla; devuelve la lista de diferencias"""
+    diferencias = []
+    conn = sqlite3.connect(db_path)
+    try:
+        for tabla, info in manifiesto['tablas'].items():
+            filas, checksum = _checksum_tabla(conn, tabla)
+            if filas != info['filas']:
+                diferencias.append(f"{tabla}: {filas} filas, se esperaban {info['filas']}")
+            elif checksum != info['checksum']:
+                diferencias.append(f"{tabla}: checksum distinto")
+    finally:
+        conn.close()
+    return diferencias
+
+def restaurar_rapido(origen, db_path=None):
+    """Restaurar desde un respaldo (.db / .db.gz) o desde una carpeta de exportación"""
+    if not os.path.exists(origen):
+        print(f"❌ Origen no encontrado: {origen}")
+        return False
+
+    if db_path is None:
+        db_path = f"pos_cremeria_restored_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    if os.path.exists(db_path):
+        print(f"❌ La base destino ya existe: {db_path} (para reemplazar la base en uso: python backup_manager.py restaurar)")
+        return False
+
+    print(f"📥 Restaurando desde: {origen}")
+    print(f"📦 Base de datos destino: {db_path}")
+    inicio = time.perf_counter()
+
+    try:
+        if os.path.isdir(origen):
+            manifiesto = _cargar_exportacion(origen, db_path)
+            print(f"   Datos cargados en {time.perf_counter() - inicio:.2f}s, verificando...")
+            diferencias = verificar_contra_manifiesto(db_path, manifiesto)
+            if diferencias:
+                print("❌ La restauración no coincide con el manifiesto:")
+                for diferencia in diferencias:
+                    print(f"   - {diferencia}")
+                return False
+            print(f"   ✅ {len(manifiesto['tablas'])} tablas coinciden con el manifiesto (filas y checksum)")
+        else:
+            # Respaldo de backup_manager: copia página a página con la API de backup
+            from backup_manager import _archivo_descomprimido, verificar_integridad
+            ruta, temporal = _archivo_descomprimido(origen, os.path.dirname(os.path.abspath(db_path)))
+            try:
+                conn_origen = sqlite3.connect(ruta)
+                conn_destino = sqlite3.connect(db_path)
+                try:
+                    conn_origen.backup(conn_destino)
+                finally:
+                    conn_destino.close()
+                    conn_origen.close()
+            finally:
+                if temporal:
+                    os.remove(ruta)
+            resultado = verificar_integridad(db_path)
+            if resultado != "ok":
+                print(f"❌ integrity_check: {resultado}")
+                return False
+            print("   ✅ integrity_check: ok")
+    except Exception as e:
+        print(f"❌ Error al restaurar: {e}")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        return False
+
+    print(f"✅ Base de datos restaurada en {time.perf_counter() - inicio:.2f}s")
+    print(f"   Archivo: {os.path.abspath(db_path)}")
+    return True
+
 if __name__ == "__main__":
     import sys
     
@@ -102,6 +339,21 @@ if __name__ == "__main__":
             output_file = sys.argv[3] if len(sys.argv) > 3 else None
             dump_database(db_path, output_file)
             
+        elif comando == "exportar":
+            db_path = sys.argv[2] if len(sys.argv) > 2 else "pos_cremeria.db"
+            destino_dir = sys.argv[3] if len(sys.argv) > 3 else None
+            exportar_tablas(db_path, destino_dir)
+            
+        elif comando == "restaurar-rapido":
+            origen = sys.argv[2] if len(sys.argv) > 2 else None
+            db_path = sys.argv[3] if len(sys.argv) > 3 else None
+            
+            if origen is None:
+                print("❌ Debes especificar el respaldo (.db/.db.gz) o la carpeta exportada")
+                print("   Uso: python dump_db.py restaurar-rapido origen [nueva_db.db]")
+            else:
+                restaurar_rapido(origen, db_path)
+        
         elif comando == "restore" or comando == "restaurar":
             sql_file = sys.argv[2] if len(sys.argv) > 2 else None
             db_path = sys.argv[3] if len(sys.argv) > 3 else None
@@ -117,6 +369,8 @@ if __name__ == "__main__":
             print("\nComandos disponibles:")
             print("  dump     - Hacer dump de la base de datos")
             print("  restore  - Restaurar desde archivo SQL")
+            print("  exportar - Exportar por tabla (comprimido) con manifiesto")
+            print("  restaurar-rapido - Restaurar desde respaldo o exportación")
     
     else:
         # Modo interactivo
@@ -5,6 +5,10 @@ import plotly.express as px
 from datetime import datetime, date
 import time
 from sync_manager import get_sync_manager
+from programador_sync import mostrar_estado_sync
+from cache_manager import leer_sql
+from archivo_historico import conectar_historico, leer_sql_con_historico
+from change_notifier import datos_de_pagina
 
 # Inicializar gestor de sincronización
 sync = get_sync_manager()
@@ -12,58 +16,11 @@ sync = get_sync_manager()
 # Ruta de la base de datos
 DB_PATH = "pos_cremeria.db"
 
-# Crear tablas para egresos e ingresos adicionales
-def crear_tablas_finanzas():
-    """Crear tablas para gestión financiera completa"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        # Tabla para egresos adicionales
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS egresos_adicionales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                tipo TEXT NOT NULL,
-                descripcion TEXT NOT NULL,
-                monto REAL NOT NULL,
-                observaciones TEXT,
-                usuario TEXT DEFAULT 'Sistema'
-            )
-        ''')
-        
-        # Tabla para ingresos pasivos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ingresos_pasivos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                descripcion TEXT NOT NULL,
-                monto REAL NOT NULL,
-                observaciones TEXT,
-                usuario TEXT DEFAULT 'Sistema'
-            )
-        ''')
-        
-        conn.commit()
-    except Exception as e:
-        print(f"Error al crear tablas de finanzas: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
-
 def mostrar():
     st.title("📊 Reportes Financieros")
     
-    # Crear tablas si no existen
-    crear_tablas_finanzas()
-    
-    # Sincronizar datos desde Supabase al inicio (solo si hay conexión)
-    if sync.is_online():
-        with st.spinner('🔄 Sincronizando datos desde Supabase...'):
-            resultado_ordenes = sync.sync_ordenes_compra_from_supabase()
-            
-            if resultado_ordenes.get('success', 0) > 0:
-                st.toast(f"✅ {resultado_ordenes['success']} órdenes de compra sincronizadas")
+    # Las órdenes de compra las descarga programador_sync.py en segundo plano
+    mostrar_estado_sync(['ordenes_compra'])
 
     # CSS personalizado para agrandar tabs con fondo negro y letras blancas/negras
     st.markdown("""
@@ -245,7 +202,8 @@ def mostrar_resumen_financiero_completo():
     # INGRESOS
     st.subheader("💚 INGRESOS")
     
-    conn = sqlite3.connect(DB_PATH)
+    # Incluye historico_AAAA.db si el período llega a meses archivados
+    conn = conectar_historico(fecha_desde_str, DB_PATH)
     
     try:
         # Ingresos por ventas
@@ -302,7 +260,7 @@ def mostrar_resumen_financiero_completo():
         st.write(f"**Total de ventas:** ${ingresos_ventas:,.2f}")
         
         # Mostrar todas las ventas del período para verificar
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar_historico(fecha_desde_str, DB_PATH)
         try:
             ventas_debug = pd.read_sql_query(
                 f"SELECT fecha, codigo, nombre, total FROM ventas WHERE DATE(fecha) BETWEEN '{fecha_desde_str}' AND '{fecha_hasta_str}' ORDER BY fecha DESC",
@@ -583,18 +541,14 @@ def mostrar_egresos_manuales():
     st.divider()
     st.subheader("📋 Egresos Recientes")
     
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        egresos_recientes_query = """
-            SELECT fecha, tipo, descripcion, monto, observaciones
-            FROM egresos_adicionales 
-            ORDER BY fecha DESC 
-            LIMIT 10
-        """
-        
-        egresos_recientes_df = pd.read_sql_query(egresos_recientes_query, conn)
-    finally:
-        conn.close()
+    egresos_recientes_query = """
+        SELECT fecha, tipo, descripcion, monto, observaciones
+        FROM egresos_adicionales 
+        ORDER BY fecha DESC 
+        LIMIT 10
+    """
+    
+    egresos_recientes_df = leer_sql(egresos_recientes_query, tablas=['egresos_adicionales'])
     
     if not egresos_recientes_df.empty:
         # Formatear fecha para mejor visualización
@@ -619,29 +573,25 @@ def mostrar_ordenes_compra():
     """Mostrar órdenes de compra pendientes de pago"""
     st.write("### 🧾 Órdenes de Compra")
     
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        # Obtener órdenes de compra con información de pedidos
-        ordenes_query = """
-            SELECT 
-                oc.id, 
-                oc.fecha_creacion, 
-                oc.total_orden, 
-                oc.estado, 
-                oc.fecha_pago, 
-                oc.notas,
-                oc.pedido_id,
-                p.fecha_pedido,
-                p.fecha_entrega_esperada
-            FROM ordenes_compra oc
-            LEFT JOIN pedidos p ON oc.pedido_id = p.id
-            ORDER BY 
-                CASE WHEN oc.estado = 'PENDIENTE' THEN 0 ELSE 1 END,
-                oc.fecha_creacion DESC
-        """
-        ordenes_df = pd.read_sql_query(ordenes_query, conn)
-    finally:
-        conn.close()
+    # Obtener órdenes de compra con información de pedidos
+    ordenes_query = """
+        SELECT 
+            oc.id, 
+            oc.fecha_creacion, 
+            oc.total_orden, 
+            oc.estado, 
+            oc.fecha_pago, 
+            oc.notas,
+            oc.pedido_id,
+            p.fecha_pedido,
+            p.fecha_entrega_esperada
+        FROM ordenes_compra oc
+        LEFT JOIN pedidos p ON oc.pedido_id = p.id
+        ORDER BY 
+            CASE WHEN oc.estado = 'PENDIENTE' THEN 0 ELSE 1 END,
+            oc.fecha_creacion DESC
+    """
+    ordenes_df = leer_sql(ordenes_query, tablas=['ordenes_compra', 'pedidos'])
     
     if ordenes_df.empty:
         st.info("📋 No hay órdenes de compra registradas")
@@ -996,18 +946,14 @@ def mostrar_registro_ingresos():
     st.divider()
     st.subheader("📋 Ingresos Recientes")
     
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        ingresos_recientes_query = """
-            SELECT fecha, descripcion, monto, observaciones
-            FROM ingresos_pasivos 
-            ORDER BY fecha DESC 
-            LIMIT 10
-        """
-        
-        ingresos_recientes_df = pd.read_sql_query(ingresos_recientes_query, conn)
-    finally:
-        conn.close()
+    ingresos_recientes_query = """
+        SELECT fecha, descripcion, monto, observaciones
+        FROM ingresos_pasivos 
+        ORDER BY fecha DESC 
+        LIMIT 10
+    """
+    
+    ingresos_recientes_df = leer_sql(ingresos_recientes_query, tablas=['ingresos_pasivos'])
     
     if not ingresos_recientes_df.empty:
         # Formatear fecha para mejor visualización
@@ -1154,15 +1100,12 @@ def mostrar_historial_financiero():
 def mostrar_resumen_general():
     st.subheader("📈 Resumen General")
     
-    conn = sqlite3.connect(DB_PATH)
     try:
-        ventas_df = pd.read_sql_query("SELECT * FROM ventas", conn)
-        productos_df = pd.read_sql_query("SELECT * FROM productos", conn)
+        ventas_df = leer_sql("SELECT * FROM ventas", tablas=['ventas'])
+        productos_df = leer_sql("SELECT * FROM productos", tablas=['productos'])
     except Exception as e:
         st.error(f"Error al cargar datos: {str(e)}")
         return
-    finally:
-        conn.close()
 
     if ventas_df.empty:
         st.warning("No hay datos de ventas disponibles.")
@@ -1442,18 +1385,16 @@ def mostrar_ventas_por_dia():
         ORDER BY DATE(fecha) DESC
     """
     
-    conn = sqlite3.connect(DB_PATH)
     try:
-        ventas_dia_df = pd.read_sql_query(
+        ventas_dia_df = leer_sql_con_historico(
             query, 
-            conn, 
-            params=[fecha_desde.strftime('%Y-%m-%d'), fecha_hasta.strftime('%Y-%m-%d')]
+            params=[fecha_desde.strftime('%Y-%m-%d'), fecha_hasta.strftime('%Y-%m-%d')],
+            desde=fecha_desde,
+            tablas=['ventas']
         )
     except Exception as e:
         st.error(f"Error al consultar ventas: {str(e)}")
         return
-    finally:
-        conn.close()
     
     if ventas_dia_df.empty:
         st.info("No hay ventas en el rango de fechas seleccionado.")
@@ -1539,29 +1480,23 @@ def mostrar_listado_ventas():
     
     with col_filtro2:
         # Obtener tipos de pago únicos
-        conn = sqlite3.connect(DB_PATH)
         try:
             tipos_pago_query = "SELECT DISTINCT tipos_pago FROM ventas WHERE tipos_pago IS NOT NULL AND tipos_pago != ''"
-            tipos_pago_df = pd.read_sql_query(tipos_pago_query, conn)
+            tipos_pago_df = leer_sql(tipos_pago_query, tablas=['ventas'])
             tipos_pago_lista = ["Todos"] + tipos_pago_df['tipos_pago'].tolist()
         except:
             tipos_pago_lista = ["Todos"]
-        finally:
-            conn.close()
         
         filtro_pago = st.selectbox("💳 Filtrar por tipo de pago:", tipos_pago_lista)
     
     with col_filtro3:
         # Obtener tipos de cliente únicos
-        conn = sqlite3.connect(DB_PATH)
         try:
             tipos_cliente_query = "SELECT DISTINCT tipo_cliente FROM ventas WHERE tipo_cliente IS NOT NULL"
-            tipos_cliente_df = pd.read_sql_query(tipos_cliente_query, conn)
+            tipos_cliente_df = leer_sql(tipos_cliente_query, tablas=['ventas'])
             tipos_cliente_lista = ["Todos"] + tipos_cliente_df['tipo_cliente'].tolist()
         except:
             tipos_cliente_lista = ["Todos", "Normal", "Mayoreo"]
-        finally:
-            conn.close()
         
         filtro_cliente = st.selectbox("👤 Filtrar por tipo de cliente:", tipos_cliente_lista)
     
@@ -1597,14 +1532,11 @@ def mostrar_listado_ventas():
     
     query += " ORDER BY fecha DESC"
     
-    conn = sqlite3.connect(DB_PATH)
     try:
-        ventas_detalle_df = pd.read_sql_query(query, conn, params=params)
+        ventas_detalle_df = leer_sql_con_historico(query, params=params, desde=fecha_venta, tablas=['ventas'])
     except Exception as e:
         st.error(f"Error al consultar ventas: {str(e)}")
         return
-    finally:
-        conn.close()
     
     if ventas_detalle_df.empty:
         st.info("No hay ventas para los filtros seleccionados.")
@@ -2030,6 +1962,15 @@ def mostrar_listado_ventas():
         with col_total4:
             st.metric("📋 Total Crédito", f"${total_credito:.2f}")
 
+def generar_csv_ventas_completas():
+    """CSV con todas las ventas (incluye los meses archivados); None si no hay ventas"""
+    conn = conectar_historico(None, DB_PATH)
+    try:
+        ventas_df = pd.read_sql_query("SELECT * FROM ventas ORDER BY fecha DESC", conn)
+    finally:
+        conn.close()
+    return ventas_df.to_csv(index=False).encode('utf-8') if not ventas_df.empty else None
+
 def mostrar_exportar_reportes():
     st.subheader("💾 Exportar Reportes")
     
@@ -2037,11 +1978,10 @@ def mostrar_exportar_reportes():
     
     with col_export1:
         st.write("**📊 Exportar Ventas Completas**")
-        conn = sqlite3.connect(DB_PATH)
         try:
-            ventas_df = pd.read_sql_query("SELECT * FROM ventas ORDER BY fecha DESC", conn)
-            if not ventas_df.empty:
-                csv_completo = ventas_df.to_csv(index=False).encode('utf-8')
+            # Leer todas las ventas y armar el CSV solo cuando la tabla cambió
+            csv_completo = datos_de_pagina('csv_ventas_completas', ['ventas'], generar_csv_ventas_completas)
+            if csv_completo:
                 st.download_button(
                     "📥 Descargar Todas las Ventas (CSV)", 
                     data=csv_completo, 
@@ -2052,14 +1992,12 @@ def mostrar_exportar_reportes():
                 st.info("No hay datos para exportar")
         except Exception as e:
             st.error(f"Error al exportar: {str(e)}")
-        finally:
-            conn.close()
     
     with col_export2:
         st.write("**📅 Exportar Ventas por Fecha**")
         fecha_export = st.date_input("Seleccionar fecha:", value=date.today())
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = conectar_historico(fecha_export, DB_PATH)
         try:
             ventas_fecha_df = pd.read_sql_query(
                 "SELECT * FROM ventas WHERE DATE(fecha) = ? ORDER BY fecha DESC", 
@@ -2104,7 +2042,7 @@ def mostrar_exportar_reportes():
     
     with col_rango3:
         if st.button("📊 Generar Reporte de Rango"):
-            conn = sqlite3.connect(DB_PATH)
+            conn = conectar_historico(fecha_desde_export, DB_PATH)
             try:
                 ventas_rango_df = pd.read_sql_query(
                     "SELECT * FROM ventas WHERE DATE(fecha) BETWEEN ? AND ? ORDER BY fecha DESC", 
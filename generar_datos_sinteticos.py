@@ -0,0 +1,231 @@
+"""
+Generador de una cremería sintética para pruebas de rendimiento
+Crea una base nueva con el esquema de migraciones.py y la llena con datos reproducibles
+(misma semilla → misma base): productos por unidad y a granel, años de ventas con
+tickets de varias líneas, créditos, egresos/ingresos y pedidos con sus partidas.
+Las ventas llegan hasta hoy, así que los reportes "del día" también tienen datos.
+
+Uso:
+    python generar_datos_sinteticos.py sintetica.db
+    python generar_datos_sinteticos.py sintetica.db --productos 2000 --anios 3 --tickets-dia 300
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from kardex import inicializar_saldos
+from migraciones import ejecutar_migraciones
+
+CATEGORIAS = ['lacteos', 'quesos', 'cremas', 'embutidos', 'abarrotes', 'bebidas', 'botanas', 'limpieza']
+PROVEEDORES = ['Lala', 'Alpura', 'Sigma', 'FUD', 'Chilchota', 'Nochebuena', 'Zwan', 'Bimbo']
+TIPOS_PAGO = ['Efectivo', 'Efectivo', 'Efectivo', 'Tarjeta', 'Transferencia']
+TIPOS_CLIENTE = ['Normal'] * 8 + ['Mayoreo 1', 'Mayoreo 2']
+CLIENTES_CREDITO = ['Lula', 'Don Pepe', 'Tienda Rosy', 'Cocina Económica', 'Mary', 'Abarrotes Juárez']
+
+def _fecha(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+def generar_productos(rnd, cantidad):
+    productos = []
+    for i in range(cantidad):
+        granel = rnd.random() < 0.2
+        compra = round(rnd.uniform(8, 250), 2)
+        normal = round(compra * rnd.uniform(1.2, 1.6), 2)
+        productos.append({
+            'codigo': f"75{i:011d}",
+            'nombre': f"{rnd.choice(CATEGORIAS).capitalize()} {rnd.choice(PROVEEDORES)} #{i}",
+            'precio_compra': compra,
+            'precio_normal': normal,
+            'precio_mayoreo_1': round(normal * 0.95, 2),
+            'precio_mayoreo_2': round(normal * 0.92, 2),
+            'precio_mayoreo_3': round(normal * 0.90, 2),
+            'stock': 0 if granel else rnd.randint(0, 120),
+            'tipo_venta': 'granel' if granel else 'unidad',
+            'precio_por_kg': normal if granel else 0.0,
+            'peso_unitario': 0.0,
+            'stock_kg': round(rnd.uniform(0, 60), 3) if granel else 0.0,
+            'stock_minimo': 0 if granel else rnd.randint(3, 15),
+            'stock_minimo_kg': round(rnd.uniform(1, 8), 3) if granel else 0.0,
+            'stock_maximo': 0 if granel else rnd.randint(40, 150),
+            'stock_maximo_kg': round(rnd.uniform(30, 80), 3) if granel else 0.0,
+            'categoria': rnd.choice(CATEGORIAS),
+        })
+    return productos
+
+def generar_ventas(rnd, productos, desde, hasta, tickets_dia, prob_credito):
+    """Filas de ventas (una por línea de ticket) y los créditos de los tickets fiados"""
+    ventas, creditos = [], []
+    venta_id = 0
+    dia = desde
+    while dia <= hasta:
+        for _ in range(max(1, int(rnd.gauss(tickets_dia, tickets_dia * 0.15)))):
+            momento = dia + timedelta(seconds=rnd.randint(7 * 3600, 21 * 3600))
+            if momento > datetime.now():
+                continue
+            fecha = _fecha(momento)
+            lineas = []
+            for producto in rnd.sample(productos, rnd.randint(1, 6)):
+                if producto['tipo_venta'] == 'granel':
+                    peso = round(rnd.uniform(0.1, 2.5), 3)
+                    lineas.append((producto, 1, producto['precio_por_kg'], round(peso * producto['precio_por_kg'], 2), peso))
+                else:
+                    cantidad = rnd.randint(1, 4)
+                    lineas.append((producto, cantidad, producto['precio_normal'],
+                                   round(cantidad * producto['precio_normal'], 2), 0.0))
+            total_ticket = round(sum(linea[3] for linea in lineas), 2)
+
+            fiado = rnd.random() < prob_credito
+            cliente = rnd.choice(CLIENTES_CREDITO) if fiado else ""
+            # Los créditos de más de una semana ya están pagados
+            pagado = 0 if fiado and (hasta - dia).days < 7 else 1
+            tipo_pago = 'Crédito' if fiado else rnd.choice(TIPOS_PAGO)
+            vencimiento = (momento + timedelta(days=1)).strftime("%Y-%m-%d") if fiado else ""
+
+            primera = None
+            for producto, cantidad, precio, total, peso in lineas:
+                venta_id += 1
+                primera = primera or venta_id
+                ventas.append((
+                    venta_id, fecha, producto['codigo'], producto['nombre'], cantidad, precio, total,
+                    rnd.choice(TIPOS_CLIENTE), tipo_pago,
+                    total_ticket if tipo_pago == 'Efectivo' else 0,
+                    total_ticket if tipo_pago == 'Tarjeta' else 0,
+                    total_ticket if tipo_pago == 'Transferencia' else 0,
+                    total_ticket if fiado else 0,
+                    vencimiento, '15:00', cliente, pagado, 1, peso, producto['tipo_venta'],
+                ))
+            if fiado:
+                creditos.append((cliente, total_ticket, fecha, vencimiento, '15:00', primera, pagado, 1))
+        dia += timedelta(days=1)
+    return ventas, creditos
+
+def generar_pedidos(rnd, productos, desde, hasta, por_semana):
+    pedidos, items = [], []
+    pedido_id = 0
+    item_id = 0
+    dia = desde
+    while dia <= hasta:
+        for _ in range(por_semana):
+            pedido_id += 1
+            fecha = dia + timedelta(days=rnd.randint(0, 6), hours=rnd.randint(8, 18))
+            reciente = (hasta - fecha).days < 10
+            estado = 'PENDIENTE' if reciente else rnd.choice(['RECIBIDO', 'COMPLETADO'])
+            partidas = rnd.sample(productos, rnd.randint(3, 15))
+            total = 0.0
+            for producto in partidas:
+                item_id += 1
+                cantidad = rnd.randint(5, 60)
+                subtotal = round(cantidad * producto['precio_compra'], 2)
+                total += subtotal
+                recibido = 0 if estado == 'PENDIENTE' else cantidad
+                items.append((item_id, pedido_id, producto['codigo'], producto['nombre'], cantidad, recibido,
+                              producto['precio_compra'], subtotal, rnd.choice(PROVEEDORES),
+                              'RECIBIDO' if recibido >= cantidad else 'PENDIENTE'))
+            pedidos.append((pedido_id, fecha.strftime("%Y-%m-%d"), (fecha + timedelta(days=3)).strftime("%Y-%m-%d"),
+                            estado, len(partidas), round(total, 2), '', 'admin', _fecha(fecha)))
+        dia += timedelta(days=7)
+    return pedidos, items
+
+def generar_base(db_path, productos=500, anios=1.0, tickets_dia=150, prob_credito=0.03,
+                 pedidos_semana=4, semilla=42, verbose=True):
+    """Crear `db_path` desde cero; devuelve el conteo de filas por tabla"""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} ya existe")
+
+    inicio = time.perf_counter()
+    rnd = random.Random(semilla)
+    hasta = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    desde = hasta - timedelta(days=int(365 * anios))
+
+    if verbose:
+        print(f"🏗️ Creando esquema en {db_path}...")
+    ejecutar_migraciones(db_path)
+
+    catalogo = generar_productos(rnd, productos)
+    ventas, creditos = generar_ventas(rnd, catalogo, desde, hasta, tickets_dia, prob_credito)
+    pedidos, items = generar_pedidos(rnd, catalogo, desde, hasta, pedidos_semana)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        columnas = list(catalogo[0].keys())
+        conn.executemany(
+            f"INSERT INTO productos ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+            [tuple(p[c] for c in columnas) for p in catalogo]
+        )
+        # Saldo inicial del kardex con el stock con el que arranca la tienda sintética
+        inicializar_saldos(conn)
+        conn.executemany('''
+            INSERT INTO ventas (id, fecha, codigo, nombre, cantidad, precio_unitario, total, tipo_cliente, tipos_pago,
+                                monto_efectivo, monto_tarjeta, monto_transferencia, monto_credito,
+                                fecha_vencimiento_credito, hora_vencimiento_credito, cliente_credito, pagado,
+                                alerta_mostrada, peso_vendido, tipo_venta)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ventas)
+        conn.executemany('''
+            INSERT INTO creditos_pendientes (cliente, monto, fecha_venta, fecha_vencimiento, hora_vencimiento,
+                                             venta_id, pagado, alerta_mostrada)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', creditos)
+        conn.executemany('''
+            INSERT INTO pedidos (id, fecha_pedido, fecha_entrega_esperada, estado, total_productos, total_costo,
+                                 notas, creado_por, fecha_creacion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', pedidos)
+        conn.executemany('''
+            INSERT INTO pedidos_items (id, pedido_id, codigo_producto, nombre_producto, cantidad_solicitada,
+                                       cantidad_recibida, precio_unitario, subtotal, proveedor, estado_item)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', items)
+
+        meses = max(1, int(12 * anios))
+        conn.executemany('''
+            INSERT INTO egresos_adicionales (fecha, tipo, descripcion, monto, observaciones)
+            VALUES (?, ?, ?, ?, '')
+        ''', [((hasta - timedelta(days=30 * m)).strftime("%Y-%m-%d"), tipo, f"{tipo} mes {m}", round(rnd.uniform(500, 9000), 2))
+              for m in range(meses) for tipo in ('Renta', 'Luz', 'Nómina')])
+        conn.executemany('''
+            INSERT INTO ingresos_pasivos (fecha, descripcion, monto, observaciones)
+            VALUES (?, ?, ?, '')
+        ''', [((hasta - timedelta(days=30 * m)).strftime("%Y-%m-%d"), f"Recarga mes {m}", round(rnd.uniform(100, 900), 2))
+              for m in range(meses)])
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+
+        conteos = {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                   for tabla in ('productos', 'ventas', 'creditos_pendientes', 'pedidos', 'pedidos_items',
+                                 'egresos_adicionales', 'ingresos_pasivos', 'movimientos_inventario')}
+    finally:
+        conn.close()
+
+    if verbose:
+        detalle = ", ".join(f"{tabla}: {n:,}" for tabla, n in conteos.items())
+        print(f"✅ Base sintética lista en {time.perf_counter() - inicio:.1f}s ({detalle})")
+    return conteos
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generar una base de datos sintética de la cremería")
+    parser.add_argument('destino', help="Archivo .db a crear (no debe existir)")
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--anios', type=float, default=1.0, help="Años de historia de ventas")
+    parser.add_argument('--tickets-dia', type=int, default=150)
+    parser.add_argument('--credito', type=float, default=0.03, help="Proporción de tickets fiados")
+    parser.add_argument('--pedidos-semana', type=int, default=4)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    try:
+        generar_base(args.destino, args.productos, args.anios, args.tickets_dia, args.credito,
+                     args.pedidos_semana, args.semilla)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
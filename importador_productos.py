@@ -0,0 +1,448 @@
+"""
+Importación masiva de productos desde listas de precios (CSV o Excel)
+El archivo se lee por lotes (no se carga completo en memoria); cada lote se normaliza y
+valida con operaciones sobre columnas (tipo de venta, precio por kg, categoría, precios)
+y se escribe con un solo `executemany` de upsert. Todo el archivo entra en una sola
+transacción: o se importa completo o no se importa nada.
+
+- Productos nuevos: se dan de alta con su stock como SALDO_INICIAL del kardex.
+- Productos existentes: solo se actualizan las columnas que trae el archivo y solo si
+  cambiaron. El stock de los existentes se respeta salvo que se pida actualizarlo
+  (entonces se registra como AJUSTE).
+- Con `dry_run` se hace todo y al final se deshace: sirve como reporte de qué cambiaría.
+- Al terminar, los productos tocados se suben a Supabase en lotes.
+
+Uso desde consola:
+    python importador_productos.py lista_lala.xlsx --dry-run
+    python importador_productos.py lista_lala.csv --actualizar-stock
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from migraciones import COLUMNAS_PRODUCTOS
+
+DB_PATH = "pos_cremeria.db"
+
+# Encabezados aceptados (ya normalizados: minúsculas, sin acentos, con _) → columna de productos
+ALIAS_COLUMNAS = {
+    'codigo': 'codigo', 'codigo_de_barras': 'codigo', 'clave': 'codigo', 'sku': 'codigo', 'upc': 'codigo',
+    'nombre': 'nombre', 'producto': 'nombre', 'descripcion': 'nombre', 'articulo': 'nombre',
+    'precio_compra': 'precio_compra', 'costo': 'precio_compra', 'precio_costo': 'precio_compra',
+    'precio_proveedor': 'precio_compra',
+    'precio_normal': 'precio_normal', 'precio': 'precio_normal', 'precio_venta': 'precio_normal',
+    'precio_publico': 'precio_normal',
+    'precio_mayoreo_1': 'precio_mayoreo_1', 'mayoreo_1': 'precio_mayoreo_1', 'precio_mayoreo': 'precio_mayoreo_1',
+    'precio_mayoreo_2': 'precio_mayoreo_2', 'mayoreo_2': 'precio_mayoreo_2',
+    'precio_mayoreo_3': 'precio_mayoreo_3', 'mayoreo_3': 'precio_mayoreo_3',
+    'tipo_venta': 'tipo_venta', 'tipo': 'tipo_venta', 'unidad_venta': 'tipo_venta',
+    'precio_por_kg': 'precio_por_kg', 'precio_kg': 'precio_por_kg',
+    'peso_unitario': 'peso_unitario', 'peso': 'peso_unitario',
+    'stock': 'stock', 'existencia': 'stock', 'existencias': 'stock',
+    'stock_kg': 'stock_kg', 'existencia_kg': 'stock_kg',
+    'stock_minimo': 'stock_minimo', 'minimo': 'stock_minimo',
+    'stock_minimo_kg': 'stock_minimo_kg', 'minimo_kg': 'stock_minimo_kg',
+    'stock_maximo': 'stock_maximo', 'maximo': 'stock_maximo',
+    'stock_maximo_kg': 'stock_maximo_kg', 'maximo_kg': 'stock_maximo_kg',
+    'categoria': 'categoria', 'departamento': 'categoria',
+}
+
+# Formas de escribir el tipo de venta en las listas de los proveedores
+TIPOS_VENTA = {
+    'unidad': 'unidad', 'pieza': 'unidad', 'pza': 'unidad', 'pz': 'unidad', 'u': 'unidad', 'caja': 'unidad',
+    'granel': 'granel', 'a_granel': 'granel', 'kg': 'granel', 'kilo': 'granel', 'kilogramo': 'granel',
+}
+
+COLUMNAS_TEXTO = ('codigo', 'nombre', 'tipo_venta', 'categoria')
+COLUMNAS_ENTERAS = ('stock', 'stock_minimo', 'stock_maximo')
+COLUMNAS_STOCK = ('stock', 'stock_kg')
+COLUMNAS_PRECIO_MAYOREO = ('precio_mayoreo_1', 'precio_mayoreo_2', 'precio_mayoreo_3')
+
+# Valores para las columnas que no trae el archivo al dar de alta un producto
+VALORES_ALTA = {
+    'precio_compra': 0.0, 'stock': 0, 'tipo_venta': 'unidad', 'precio_por_kg': 0.0, 'peso_unitario': 0.0,
+    'stock_kg': 0.0, 'stock_minimo': 10, 'stock_minimo_kg': 0.0, 'stock_maximo': 30, 'stock_maximo_kg': 0.0,
+    'categoria': 'cremeria',
+}
+
+def _normalizar_serie(serie):
+    """Minúsculas, sin acentos y sin espacios de más (vectorizado)"""
+    return (serie.fillna('').astype(str).str.normalize('NFKD')
+                 .str.encode('ascii', 'ignore').str.decode('ascii')
+                 .str.lower().str.strip().str.replace(r'\s+', ' ', regex=True))
+
+def normalizar_encabezados(columnas):
+    """{encabezado del archivo: columna de productos}; los no reconocidos no aparecen"""
+    normalizados = _normalizar_serie(pd.Series(list(columnas), dtype=object)).str.replace(r'[\s\-\.]+', '_', regex=True)
+    mapa = {}
+    for original, normalizado in zip(columnas, normalizados):
+        destino = ALIAS_COLUMNAS.get(normalizado)
+        if destino and destino not in mapa.values():
+            mapa[original] = destino
+    return mapa
+
+def leer_lotes(archivo, nombre=None, lote=1000, hoja=None, encoding='utf-8-sig'):
+    """Leer un CSV o Excel por lotes de `lote` filas; cada lote es un DataFrame de texto
+    con la columna `fila` (número de renglón en el archivo, contando el encabezado)"""
+    nombre = nombre or (archivo if isinstance(archivo, str) else getattr(archivo, 'name', ''))
+    extension = os.path.splitext(nombre)[1].lower()
+    siguiente_fila = 2
+
+    if extension in ('.xlsx', '.xlsm'):
+        import openpyxl
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = (libro[hoja] if hoja else libro.worksheets[0]).iter_rows(values_only=True)
+            encabezados = [str(valor).strip() if valor is not None else f"columna_{i}"
+                           for i, valor in enumerate(next(filas, ()))]
+            pendientes = []
+            for valores in filas:
+                if valores is None or all(valor is None for valor in valores):
+                    siguiente_fila += 1
+                    continue
+                pendientes.append((siguiente_fila,) + tuple(valores[:len(encabezados)]))
+                siguiente_fila += 1
+                if len(pendientes) >= lote:
+                    yield pd.DataFrame(pendientes, columns=['fila'] + encabezados, dtype=object)
+                    pendientes = []
+            if pendientes:
+                yield pd.DataFrame(pendientes, columns=['fila'] + encabezados, dtype=object)
+        finally:
+            libro.close()
+    elif extension in ('.csv', '.txt', ''):
+        # sep=None detecta coma, punto y coma o tabulador
+        for parte in pd.read_csv(archivo, dtype=str, chunksize=lote, sep=None, engine='python',
+                                 encoding=encoding, skip_blank_lines=True):
+            parte.insert(0, 'fila', range(siguiente_fila, siguiente_fila + len(parte)))
+            siguiente_fila += len(parte)
+            yield parte
+    else:
+        raise ValueError(f"Formato no soportado: {extension} (use .csv o .xlsx)")
+
+def _numero(serie):
+    """Texto de la lista ('$1,234.50', '12 kg') → número; lo que no se puede leer queda NaN"""
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float)
+    texto = serie.astype(str).str.replace(r'[$,\s]', '', regex=True).str.replace(r'[a-zA-Z]+$', '', regex=True)
+    return pd.to_numeric(texto.where(serie.notna()), errors='coerce')
+
+def normalizar_lote(lote_df, mapa_columnas):
+    """Normalizar y validar un lote; devuelve (válidas, errores)
+
+    `válidas` tiene `fila` y las columnas de productos que trae el archivo, ya con sus
+    tipos (una sola columna de existencias queda como `existencia`; la reparte
+    _aplicar_tipo_venta). `errores` tiene fila, codigo y error (una fila por renglón rechazado).
+    """
+    df = lote_df[['fila'] + list(mapa_columnas)].rename(columns=mapa_columnas)
+    errores = pd.Series('', index=df.index)
+
+    def rechazar(mascara, mensaje):
+        nonlocal errores
+        errores = errores.where(~mascara | (errores != ''), mensaje)
+
+    # Excel guarda los códigos numéricos como 7501234567890.0
+    df['codigo'] = df['codigo'].astype(object).where(df['codigo'].notna(), '').astype(str).str.strip() \
+                               .str.replace(r'\.0$', '', regex=True)
+    rechazar(df['codigo'] == '', "sin código")
+
+    if 'nombre' in df:
+        nombre = df['nombre'].fillna('').astype(str).str.strip().str.replace(r'\s+', ' ', regex=True)
+        # Vacío = conserva el nombre actual; a los productos nuevos se les exige más abajo
+        df['nombre'] = nombre.where(nombre != '')
+
+    if 'tipo_venta' in df:
+        tipo = _normalizar_serie(df['tipo_venta']).str.replace(' ', '_')
+        # Vacío = no cambia (o el valor por defecto si el producto es nuevo)
+        df['tipo_venta'] = tipo.map(TIPOS_VENTA)
+        rechazar((tipo != '') & df['tipo_venta'].isna(), "tipo de venta no reconocido (use unidad o granel)")
+
+    if 'categoria' in df:
+        categoria = _normalizar_serie(df['categoria'])
+        df['categoria'] = categoria.where(categoria != '')
+
+    # Una sola columna de existencias: se reparte entre stock y stock_kg según el tipo de
+    # venta, que para los existentes puede venir de la base (ver _aplicar_tipo_venta)
+    if 'stock' in df and 'stock_kg' not in df:
+        df = df.rename(columns={'stock': 'existencia'})
+
+    for columna in df.columns:
+        if columna in COLUMNAS_TEXTO or columna == 'fila':
+            continue
+        valores = _numero(df[columna])
+        rechazar(df[columna].notna() & (df[columna].astype(str).str.strip() != '') & valores.isna(),
+                 f"{columna} no es un número")
+        rechazar(valores < 0, f"{columna} negativo")
+        df[columna] = valores.round(0) if columna in COLUMNAS_ENTERAS else valores
+
+    validas = df[errores == ''].copy()
+    rechazadas = pd.DataFrame({'fila': df['fila'][errores != ''], 'codigo': df['codigo'][errores != ''],
+                               'error': errores[errores != '']})
+    return validas, rechazadas
+
+def _aplicar_tipo_venta(validas, existentes):
+    """Repartir existencias y precios según el tipo de venta de cada renglón
+
+    Si el archivo no trae el tipo (columna o celda vacía) se usa el guardado del producto,
+    y para los nuevos el de alta. A granel las existencias son kg y el precio de venta es el
+    precio por kg (igual que fix_granel_precios.py); lo que no aplica queda vacío (NaN),
+    así que conserva el valor actual.
+    """
+    validas = validas.copy()
+    tipo = validas['tipo_venta'] if 'tipo_venta' in validas else pd.Series(np.nan, index=validas.index, dtype=object)
+    guardado = existentes.set_index('codigo')['tipo_venta'].reindex(validas['codigo']).to_numpy()
+    tipo = tipo.fillna(pd.Series(guardado, index=validas.index)).fillna(VALORES_ALTA['tipo_venta'])
+    granel = tipo == 'granel'
+
+    if 'existencia' in validas:
+        existencia = validas.pop('existencia')
+        validas['stock'] = existencia.where(~granel).round(0)
+        validas['stock_kg'] = existencia.where(granel)
+
+    if 'precio_por_kg' in validas or 'precio_normal' in validas:
+        if 'precio_por_kg' not in validas:
+            validas['precio_por_kg'] = validas['precio_normal'].where(granel)
+        elif 'precio_normal' in validas:
+            validas['precio_por_kg'] = validas['precio_por_kg'].where(~granel | validas['precio_por_kg'].notna(),
+                                                                      validas['precio_normal'])
+        if 'precio_normal' in validas:
+            validas['precio_normal'] = validas['precio_normal'].where(~granel | validas['precio_por_kg'].isna(),
+                                                                      validas['precio_por_kg'])
+        else:
+            validas['precio_normal'] = validas['precio_por_kg'].where(granel)
+    return validas
+
+def _comparar(validas, existentes, columnas):
+    """Máscara por columna de lo que cambia en los productos que ya existen"""
+    actuales = existentes.set_index('codigo').reindex(validas['codigo'])
+    cambios = {}
+    for columna in columnas:
+        nuevo = validas[columna].to_numpy()
+        actual = actuales[columna].to_numpy()
+        if columna in COLUMNAS_TEXTO:
+            distinto = pd.notna(nuevo) & (pd.Series(nuevo).astype(str).to_numpy() != pd.Series(actual).fillna('').astype(str).to_numpy())
+        else:
+            nuevo = pd.to_numeric(pd.Series(nuevo), errors='coerce').to_numpy()
+            actual = pd.to_numeric(pd.Series(actual), errors='coerce').to_numpy()
+            # Una celda vacía en el archivo no cambia nada
+            distinto = ~np.isnan(nuevo) & ~np.isclose(nuevo, np.nan_to_num(actual, nan=-1.0))
+        cambios[columna] = distinto
+    return pd.DataFrame(cambios, index=validas.index)
+
+def _completar_alta(nuevos, columnas_archivo):
+    """Filas completas para dar de alta productos nuevos"""
+    filas = nuevos.copy()
+    for columna in COLUMNAS_PRODUCTOS:
+        if columna not in filas:
+            filas[columna] = np.nan
+        if columna in VALORES_ALTA:
+            filas[columna] = filas[columna].where(filas[columna].notna(), VALORES_ALTA[columna])
+    # Sin precios de mayoreo en la lista: se usan los de venta normal
+    for columna in COLUMNAS_PRECIO_MAYOREO:
+        filas[columna] = filas[columna].where(filas[columna].notna(), filas['precio_normal'])
+    return filas
+
+def importar_productos(archivo, nombre=None, db_path=DB_PATH, dry_run=False, actualizar_stock=False,
+                       lote=1000, hoja=None, usuario=None, sincronizar=True, encoding='utf-8-sig'):
+    """Importar una lista de productos; devuelve un dict con el reporte
+
+    Claves: leidas, nuevos, actualizados, sin_cambios, errores (DataFrame fila/codigo/error),
+    cambios_por_columna, detalle (DataFrame codigo/nombre/accion/cambios), columnas_ignoradas,
+    aplicado, sync y duracion_s.
+    """
+    inicio = time.perf_counter()
+    reporte = {'leidas': 0, 'nuevos': 0, 'actualizados': 0, 'sin_cambios': 0,
+               'cambios_por_columna': {}, 'columnas_ignoradas': [], 'aplicado': False, 'sync': None}
+    errores, detalle, tocados = [], [], []
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        mapa_columnas = None
+        for parte in leer_lotes(archivo, nombre, lote, hoja, encoding):
+            if mapa_columnas is None:
+                mapa_columnas = normalizar_encabezados([c for c in parte.columns if c != 'fila'])
+                reporte['columnas_ignoradas'] = [c for c in parte.columns if c != 'fila' and c not in mapa_columnas]
+                if 'codigo' not in mapa_columnas.values():
+                    raise ValueError("El archivo no tiene columna de código (codigo, clave, sku...)")
+            reporte['leidas'] += len(parte)
+
+            validas, rechazadas = normalizar_lote(parte, mapa_columnas)
+            errores.append(rechazadas)
+            if validas.empty:
+                continue
+            # Si un código se repite en el lote, gana el último renglón
+            validas = validas.drop_duplicates('codigo', keep='last')
+
+            codigos = validas['codigo'].tolist()
+            existentes = pd.read_sql_query(
+                f"SELECT * FROM productos WHERE codigo IN ({', '.join('?' * len(codigos))})", conn, params=codigos
+            )
+            validas = _aplicar_tipo_venta(validas, existentes)
+            columnas = [c for c in validas.columns if c not in ('fila', 'codigo')]
+            es_nuevo = ~validas['codigo'].isin(existentes['codigo'])
+            # Para dar de alta hacen falta nombre y precio de venta
+            completos = pd.Series(True, index=validas.index)
+            for columna in ('nombre', 'precio_normal'):
+                completos &= validas[columna].notna() if columna in validas else False
+            incompletos = es_nuevo & ~completos
+            if incompletos.any():
+                errores.append(pd.DataFrame({'fila': validas['fila'][incompletos], 'codigo': validas['codigo'][incompletos],
+                                             'error': "producto nuevo sin nombre o sin precio de venta"}))
+                validas = validas[~incompletos]
+                es_nuevo = es_nuevo[~incompletos]
+            es_nuevo = es_nuevo.to_numpy()
+
+            cambios = _comparar(validas, existentes, columnas)
+            if not actualizar_stock:
+                for columna in COLUMNAS_STOCK:
+                    if columna in cambios:
+                        cambios[columna] = False
+            cambia = cambios.any(axis=1).to_numpy() & ~es_nuevo
+
+            # Altas: fila completa; su stock entra al kardex como SALDO_INICIAL
+            nuevos = _completar_alta(validas[es_nuevo], columnas)
+            if not nuevos.empty:
+                cursor.executemany(
+                    f"INSERT INTO productos ({', '.join(COLUMNAS_PRODUCTOS)}) VALUES ({', '.join('?' * len(COLUMNAS_PRODUCTOS))})",
+                    nuevos[list(COLUMNAS_PRODUCTOS)].astype({c: int for c in COLUMNAS_ENTERAS}).astype(object)
+                                                    .itertuples(index=False, name=None)
+                )
+                cursor.executemany('''
+                    INSERT INTO movimientos_inventario
+                        (fecha, codigo, tipo_movimiento, cantidad, cantidad_kg, stock_resultante, stock_kg_resultante,
+                         referencia_tipo, usuario, notas)
+                    VALUES (?, ?, 'SALDO_INICIAL', ?, ?, ?, ?, 'importacion', ?, 'Alta por importación')
+                ''', [(fecha, codigo, int(stock), float(stock_kg), int(stock), float(stock_kg), usuario)
+                      for codigo, stock, stock_kg in nuevos[['codigo', 'stock', 'stock_kg']].itertuples(index=False)])
+
+            # Existentes que cambian: upsert solo de las columnas que trae el archivo
+            actualizar = validas[cambia]
+            columnas_set = [c for c in columnas if c not in COLUMNAS_STOCK]
+            if not actualizar.empty and columnas_set:
+                # Una celda vacía conserva el valor actual
+                cursor.executemany(
+                    f"UPDATE productos SET {', '.join(f'{c} = COALESCE(?, {c})' for c in columnas_set)} WHERE codigo = ?",
+                    actualizar[columnas_set + ['codigo']].astype(object).where(actualizar[columnas_set + ['codigo']].notna(), None)
+                                                         .itertuples(index=False, name=None)
+                )
+            if actualizar_stock and not actualizar.empty and any(c in columnas for c in COLUMNAS_STOCK):
+                from kardex import ajustar_stock
+                for fila in actualizar.itertuples(index=False):
+                    stock = getattr(fila, 'stock', None)
+                    stock_kg = getattr(fila, 'stock_kg', None)
+                    ajustar_stock(cursor, fila.codigo,
+                                  None if stock is None or pd.isna(stock) else int(stock),
+                                  None if stock_kg is None or pd.isna(stock_kg) else float(stock_kg),
+                                  'AJUSTE', usuario=usuario, notas="Importación de lista de productos")
+
+            # Reporte de este lote
+            reporte['nuevos'] += int(es_nuevo.sum())
+            reporte['actualizados'] += int(cambia.sum())
+            reporte['sin_cambios'] += int((~es_nuevo & ~cambia).sum())
+            for columna, cantidad in cambios[cambia].sum().items():
+                if cantidad:
+                    reporte['cambios_por_columna'][columna] = reporte['cambios_por_columna'].get(columna, 0) + int(cantidad)
+            detalle.append(_detalle_lote(validas, existentes, cambios, es_nuevo, cambia))
+            tocados.extend(validas['codigo'][es_nuevo | cambia])
+
+        if mapa_columnas is None:
+            raise ValueError("El archivo está vacío")
+
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+            reporte['aplicado'] = True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    reporte['errores'] = pd.concat(errores, ignore_index=True) if errores else pd.DataFrame(columns=['fila', 'codigo', 'error'])
+    reporte['detalle'] = pd.concat(detalle, ignore_index=True) if detalle else pd.DataFrame(columns=['codigo', 'nombre', 'accion', 'cambios'])
+
+    if reporte['aplicado'] and tocados:
+        from cache_manager import invalidar_tablas
+        invalidar_tablas('productos', 'movimientos_inventario')
+        if sincronizar:
+            from sync_manager import get_sync_manager
+            exito, error = get_sync_manager().sync_productos_to_supabase(tocados)
+            reporte['sync'] = "ok" if exito else error
+    reporte['duracion_s'] = round(time.perf_counter() - inicio, 2)
+    return reporte
+
+def _detalle_lote(validas, existentes, cambios, es_nuevo, cambia):
+    """Una fila por producto nuevo o modificado, con los cambios en texto ('precio_normal: 10 → 12')"""
+    actuales = existentes.set_index('codigo').reindex(validas['codigo'])
+    textos = pd.Series('', index=validas.index)
+    for columna in cambios.columns:
+        mascara = cambios[columna].to_numpy() & cambia
+        if not mascara.any():
+            continue
+        antes = pd.Series(actuales[columna].to_numpy(), index=validas.index)
+        despues = validas[columna]
+        if columna not in COLUMNAS_TEXTO:
+            antes, despues = pd.to_numeric(antes).round(4), despues.round(4)
+        antes, despues = antes.astype(str), despues.astype(str)
+        texto = (columna + ": " + antes + " → " + despues).where(mascara, '')
+        textos = (textos + np.where((textos != '') & (texto != ''), "; ", "") + texto)
+    nombre = pd.Series(actuales['nombre'].to_numpy(), index=validas.index)
+    if 'nombre' in validas:
+        nombre = validas['nombre'].fillna(nombre)
+    detalle = pd.DataFrame({
+        'codigo': validas['codigo'],
+        'nombre': nombre,
+        'accion': np.where(es_nuevo, 'nuevo', np.where(cambia, 'actualizado', 'sin cambios')),
+        'cambios': textos,
+    })
+    return detalle[es_nuevo | cambia]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importar productos desde una lista CSV o Excel")
+    parser.add_argument('archivo', help="Archivo .csv o .xlsx")
+    parser.add_argument('--dry-run', action='store_true', help="Validar y mostrar los cambios sin guardarlos")
+    parser.add_argument('--actualizar-stock', action='store_true',
+                        help="Tomar el stock del archivo también para productos existentes (como AJUSTE)")
+    parser.add_argument('--hoja', help="Hoja del Excel (por defecto la primera)")
+    parser.add_argument('--lote', type=int, default=1000, help="Renglones por lote")
+    parser.add_argument('--encoding', default='utf-8-sig', help="Codificación del CSV (p. ej. cp1252)")
+    parser.add_argument('--sin-sync', action='store_true', help="No subir los cambios a Supabase")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    args = parser.parse_args(argv)
+
+    try:
+        reporte = importar_productos(args.archivo, db_path=args.db, dry_run=args.dry_run,
+                                     actualizar_stock=args.actualizar_stock, lote=args.lote, hoja=args.hoja,
+                                     usuario='importador', sincronizar=not args.sin_sync, encoding=args.encoding)
+    except (ValueError, FileNotFoundError, KeyError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    modo = "🔎 Simulación (sin cambios en la base)" if args.dry_run else "✅ Importación aplicada"
+    print(f"{modo} en {reporte['duracion_s']}s: {reporte['leidas']} renglones · {reporte['nuevos']} nuevos · "
+          f"{reporte['actualizados']} actualizados · {reporte['sin_cambios']} sin cambios · "
+          f"{len(reporte['errores'])} con errores")
+    if reporte['columnas_ignoradas']:
+        print(f"⚠️ Columnas ignoradas: {', '.join(map(str, reporte['columnas_ignoradas']))}")
+    for columna, cantidad in reporte['cambios_por_columna'].items():
+        print(f"   • {columna}: {cantidad}")
+    if not reporte['detalle'].empty:
+        print(reporte['detalle'].head(30).to_string(index=False))
+    if not reporte['errores'].empty:
+        print("❌ Renglones rechazados:")
+        print(reporte['errores'].head(30).to_string(index=False))
+    if reporte['sync'] not in (None, 'ok'):
+        print(f"📴 Sin sincronizar a Supabase: {reporte['sync']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from io import BytesIO
 from datetime import datetime, timedelta
+import numpy as np
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
 import hashlib
 import time
 import unicodedata
@@ -13,6 +17,10 @@ import re
 import config
 from db_adapter import get_db_adapter
 from sync_manager import get_sync_manager
+from cache_manager import cache_consulta, invalidar_tablas
+from kardex import ajustar_stock, obtener_movimientos
+from pronostico_demanda import sugerir_cantidades
+from migraciones import COLUMNAS_PRODUCTOS
 from auth_manager import verificar_sesion_admin, cerrar_sesion_admin, obtener_tiempo_restante, mostrar_formulario_login
 
 DB_PATH = "pos_cremeria.db"
@@ -95,87 +103,12 @@ def crear_admin_por_defecto():
 # crear_tabla_usuarios()
 # admin_creado = crear_admin_por_defecto()
 
-def actualizar_base_datos_granel():
-    """Migración para agregar soporte de productos a granel"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        # Agregar nuevas columnas para productos a granel
-        cursor.execute("PRAGMA table_info(productos)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'tipo_venta' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN tipo_venta TEXT DEFAULT 'unidad'")
-        if 'precio_por_kg' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN precio_por_kg REAL DEFAULT 0")
-        if 'peso_unitario' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN peso_unitario REAL DEFAULT 0")
-        if 'stock_kg' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN stock_kg REAL DEFAULT 0")
-        if 'categoria' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN categoria TEXT DEFAULT 'cremeria'")
-        
-        # Actualizar tabla de ventas
-        cursor.execute("PRAGMA table_info(ventas)")
-        ventas_columns = [column[1] for column in cursor.fetchall()]
-        
-        if 'peso_vendido' not in ventas_columns:
-            cursor.execute("ALTER TABLE ventas ADD COLUMN peso_vendido REAL DEFAULT 0")
-        if 'tipo_venta' not in ventas_columns:
-            cursor.execute("ALTER TABLE ventas ADD COLUMN tipo_venta TEXT DEFAULT 'unidad'")
-        
-        conn.commit()
-    except Exception as e:
-        print(f"Error al actualizar base de datos granel: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
-
-def crear_tabla_stock_minimo():
-    """Crear tabla para almacenar stock mínimo si no existe"""
-def crear_tabla_stock_minimo():
-    """Crear tabla para almacenar stock mínimo si no existe"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        # Asegurar migración de granel
-        actualizar_base_datos_granel()
-        
-        # Agregar columna stock_minimo si no existe
-        cursor.execute("PRAGMA table_info(productos)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'stock_minimo' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN stock_minimo INTEGER DEFAULT 10")
-            conn.commit()
-        
-        if 'stock_minimo_kg' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN stock_minimo_kg REAL DEFAULT 0")
-            conn.commit()
-        
-        # Agregar columnas de stock_maximo
-        if 'stock_maximo' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN stock_maximo INTEGER DEFAULT 0")
-            conn.commit()
-        
-        if 'stock_maximo_kg' not in columns:
-            cursor.execute("ALTER TABLE productos ADD COLUMN stock_maximo_kg REAL DEFAULT 0")
-            conn.commit()
-    except Exception as e:
-        print(f"Error al crear tabla stock mínimo: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
-
+@cache_consulta(tablas=['productos', 'pronostico_demanda'])
 def obtener_productos_stock_bajo():
     """Obtener productos con stock menor o igual al stock mínimo"""
     conn = sqlite3.connect(DB_PATH)
     
     try:
-        # Asegurar que la columna existe
-        crear_tabla_stock_minimo()
-        
         # Porcentaje ahora se calcula respecto al stock_maximo (capacidad completa)
         # y la cantidad necesaria se calcula como (stock_maximo - stock) para rellenar a capacidad.
         query = """
@@ -201,6 +134,8 @@ def obtener_productos_stock_bajo():
         """
         
         productos_bajo_stock = pd.read_sql_query(query, conn)
+        # Con ventas recientes, la cantidad a pedir cubre los días de venta pronosticados
+        productos_bajo_stock = sugerir_cantidades(productos_bajo_stock)
         
         # Agregar columnas display unificadas
         if not productos_bajo_stock.empty:
@@ -224,6 +159,15 @@ def obtener_productos_stock_bajo():
     finally:
         conn.close()
 
+@cache_consulta(tablas=['productos'])
+def obtener_inventario():
+    """Obtener todos los productos para la vista de inventario"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return pd.read_sql_query("SELECT * FROM productos", conn)
+    finally:
+        conn.close()
+
 def actualizar_stock_minimo(codigo, nuevo_stock_minimo, nuevo_stock_minimo_kg=None):
     """Actualizar el stock mínimo de un producto"""
     conn = sqlite3.connect(DB_PATH)
@@ -308,17 +252,15 @@ def actualizar_stock_maximo(codigo, nuevo_stock_maximo, nuevo_stock_maximo_kg=No
     finally:
         conn.close()
 
-def actualizar_stock_producto(codigo, nuevo_stock, nuevo_stock_kg=None):
+def actualizar_stock_producto(codigo, nuevo_stock, nuevo_stock_kg=None, motivo=None):
     """Actualizar el stock actual de un producto (solo admins)"""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     try:
-        if nuevo_stock_kg is not None:
-            cursor.execute("UPDATE productos SET stock = ?, stock_kg = ? WHERE codigo = ?", 
-                          (nuevo_stock, nuevo_stock_kg, codigo))
-        else:
-            cursor.execute("UPDATE productos SET stock = ? WHERE codigo = ?", (nuevo_stock, codigo))
+        # La diferencia contra el stock actual queda registrada en el kardex
+        ajustar_stock(cursor, codigo, nuevo_stock, nuevo_stock_kg, 'AJUSTE',
+                      usuario=st.session_state.get('usuario_actual'), notas=motivo or "Ajuste manual desde inventario")
         
         conn.commit()
         
@@ -360,15 +302,8 @@ def obtener_producto_individual(codigo):
         producto = cursor.fetchone()
         
         if producto:
-            # Obtener nombres de columnas
-            cursor.execute("PRAGMA table_info(productos)")
-            columnas = [col[1] for col in cursor.fetchall()]
-            
             # Convertir a diccionario
-            producto_dict = {}
-            for i, valor in enumerate(producto):
-                if i < len(columnas):
-                    producto_dict[columnas[i]] = valor
+            producto_dict = dict(zip(COLUMNAS_PRODUCTOS, producto))
             
             return producto_dict
         return None
@@ -481,8 +416,14 @@ def mostrar_alertas_stock():
                 "cantidad_necesaria": st.column_config.NumberColumn(
                     "🛒 Cantidad a Pedir", 
                     format="%.2f",
-                    help="Cantidad necesaria para completar al stock máximo (capacidad completa). Fórmula: Stock Máximo - Stock Actual"
+                    help="Con ventas recientes: lo que se venderá en los días de cobertura (según el día de la semana) más un colchón, menos el stock actual. Sin ventas: Stock Máximo - Stock Actual"
+                ),
+                "demanda_diaria": st.column_config.NumberColumn("📈 Venta/día", format="%.2f"),
+                "dias_cobertura": st.column_config.NumberColumn(
+                    "⏳ Días de stock", format="%.1f",
+                    help="Días que alcanza el stock actual con la venta diaria pronosticada"
                 ),
+                "origen_sugerencia": None,
                 "precio_compra": st.column_config.NumberColumn("Precio Compra", format="$%.2f"),
                 "precio_normal": st.column_config.NumberColumn("Precio Venta", format="$%.2f"),
                 "precio_por_kg": st.column_config.NumberColumn("Precio/Kg", format="$%.2f/kg")
@@ -509,95 +450,95 @@ def mostrar_alertas_stock():
         st.success("✅ Todos los productos tienen stock suficiente")
         return pd.DataFrame()
 
+# Estilo de encabezados y límites de ancho de columna para los reportes de Excel
+EXCEL_FUENTE_ENCABEZADO = Font(bold=True, color="FFFFFF")
+EXCEL_RELLENO_ENCABEZADO = PatternFill("solid", fgColor="366092")
+EXCEL_ANCHO_MAXIMO = 50
+
+def _anchos_columnas(df):
+    """Ancho de cada columna (encabezado incluido) calculado sobre la columna completa, sin recorrer celdas"""
+    anchos = []
+    for columna in df.columns:
+        largo = df[columna].astype(str).str.len().max() if len(df) else 0
+        anchos.append(min(max(int(largo or 0), len(str(columna))) + 5, EXCEL_ANCHO_MAXIMO))
+    return anchos
+
+def _escribir_hoja(libro, nombre, df):
+    """Agregar una hoja a un libro de solo escritura: las filas se escriben en flujo, sin guardarlas en memoria"""
+    hoja = libro.create_sheet(title=nombre)
+    # En modo de solo escritura los anchos se definen antes de la primera fila
+    for indice, ancho in enumerate(_anchos_columnas(df), start=1):
+        hoja.column_dimensions[get_column_letter(indice)].width = ancho
+
+    encabezados = []
+    for columna in df.columns:
+        celda = WriteOnlyCell(hoja, value=str(columna))
+        celda.font = EXCEL_FUENTE_ENCABEZADO
+        celda.fill = EXCEL_RELLENO_ENCABEZADO
+        encabezados.append(celda)
+    hoja.append(encabezados)
+
+    # Celdas vacías en lugar de NaN (igual que DataFrame.to_excel)
+    valores = df.astype(object).where(df.notna(), None)
+    for fila in valores.itertuples(index=False, name=None):
+        hoja.append(fila)
+
 def exportar_a_excel(productos_df, productos_bajo_stock_df):
-    """Exportar datos a Excel con múltiples hojas"""
+    """Exportar datos a Excel con múltiples hojas
+
+    El libro se escribe en modo de solo escritura de openpyxl: cada hoja se vuelca fila por
+    fila al archivo temporal del libro, así que exportar el catálogo completo no duplica en
+    memoria todas las celdas. Los totales se calculan sobre columnas completas.
+    """
+    hojas = {'Inventario_Completo': productos_df}
+
+    if not productos_bajo_stock_df.empty:
+        granel = productos_bajo_stock_df['tipo_venta'] == 'granel'
+        cantidad = productos_bajo_stock_df['cantidad_necesaria']
+        inversion = cantidad * productos_bajo_stock_df['precio_compra']
+        precio_venta = productos_bajo_stock_df['precio_por_kg'].where(granel, productos_bajo_stock_df['precio_normal'])
+        valor_venta = cantidad * precio_venta
+
+        hojas['Stock_Bajo_URGENTE'] = productos_bajo_stock_df
+
+        hojas['Resumen_Financiero'] = pd.DataFrame({
+            'Concepto': [
+                'Total de productos con stock bajo',
+                'Productos por unidad',
+                'Productos a granel',
+                'Inversión total necesaria',
+                'Valor de venta potencial',
+                'Ganancia potencial estimada'
+            ],
+            'Valor': [
+                len(productos_bajo_stock_df),
+                int((productos_bajo_stock_df['tipo_venta'] == 'unidad').sum()),
+                int(granel.sum()),
+                f"${inversion.sum():.2f}",
+                f"${valor_venta.sum():.2f}",
+                f"${(valor_venta - inversion).sum():.2f}"
+            ]
+        })
+
+        lista_compras = productos_bajo_stock_df[['codigo', 'nombre', 'tipo_venta', 'cantidad_necesaria', 'precio_compra']].copy()
+        lista_compras['inversion_necesaria'] = inversion
+        lista_compras['unidad'] = np.where(granel, 'Kg', 'Unidades')
+        hojas['Lista_de_Compras'] = lista_compras.rename(columns={
+            'codigo': 'Código',
+            'nombre': 'Producto',
+            'tipo_venta': 'Tipo Venta',
+            'cantidad_necesaria': 'Cantidad a Comprar',
+            'precio_compra': 'Precio Unitario',
+            'inversion_necesaria': 'Total por Producto',
+            'unidad': 'Unidad'
+        })
+
+    libro = openpyxl.Workbook(write_only=True)
+    for nombre, df in hojas.items():
+        _escribir_hoja(libro, nombre, df)
+
     output = BytesIO()
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Hoja 1: Inventario completo
-        productos_df.to_excel(writer, sheet_name='Inventario_Completo', index=False)
-        
-        # Hoja 2: Productos con stock bajo
-        if not productos_bajo_stock_df.empty:
-            productos_bajo_stock_df.to_excel(writer, sheet_name='Stock_Bajo_URGENTE', index=False)
-            
-            # Calcular totales para reabastecimiento
-            resumen_compras = productos_bajo_stock_df.copy()
-            resumen_compras['inversion_necesaria'] = resumen_compras['cantidad_necesaria'] * resumen_compras['precio_compra']
-            resumen_compras['valor_venta_potencial'] = resumen_compras.apply(
-                lambda row: row['cantidad_necesaria'] * (row['precio_por_kg'] if row['tipo_venta'] == 'granel' else row['precio_normal']), 
-                axis=1
-            )
-            resumen_compras['ganancia_potencial'] = resumen_compras['valor_venta_potencial'] - resumen_compras['inversion_necesaria']
-            
-            # Hoja 3: Resumen financiero
-            resumen_financiero = pd.DataFrame({
-                'Concepto': [
-                    'Total de productos con stock bajo',
-                    'Productos por unidad',
-                    'Productos a granel',
-                    'Inversión total necesaria',
-                    'Valor de venta potencial',
-                    'Ganancia potencial estimada'
-                ],
-                'Valor': [
-                    len(productos_bajo_stock_df),
-                    len(productos_bajo_stock_df[productos_bajo_stock_df['tipo_venta'] == 'unidad']),
-                    len(productos_bajo_stock_df[productos_bajo_stock_df['tipo_venta'] == 'granel']),
-                    f"${resumen_compras['inversion_necesaria'].sum():.2f}",
-                    f"${resumen_compras['valor_venta_potencial'].sum():.2f}",
-                    f"${resumen_compras['ganancia_potencial'].sum():.2f}"
-                ]
-            })
-            
-            resumen_financiero.to_excel(writer, sheet_name='Resumen_Financiero', index=False)
-            
-            # Hoja 4: Lista de compras
-            lista_compras = productos_bajo_stock_df[['codigo', 'nombre', 'tipo_venta', 'cantidad_necesaria', 'precio_compra']].copy()
-            lista_compras['inversion_necesaria'] = lista_compras['cantidad_necesaria'] * lista_compras['precio_compra']
-            lista_compras['unidad'] = lista_compras.apply(
-                lambda row: 'Kg' if row['tipo_venta'] == 'granel' else 'Unidades', axis=1
-            )
-            lista_compras = lista_compras.rename(columns={
-                'codigo': 'Código',
-                'nombre': 'Producto',
-                'tipo_venta': 'Tipo Venta',
-                'cantidad_necesaria': 'Cantidad a Comprar',
-                'precio_compra': 'Precio Unitario',
-                'inversion_necesaria': 'Total por Producto',
-                'unidad': 'Unidad'
-            })
-            lista_compras.to_excel(writer, sheet_name='Lista_de_Compras', index=False)
-        
-        # Configurar estilos para las hojas
-        workbook = writer.book
-        
-        try:
-            header_style = openpyxl.styles.NamedStyle(name="header")
-            header_style.font = openpyxl.styles.Font(bold=True, color="FFFFFF")
-            header_style.fill = openpyxl.styles.PatternFill("solid", fgColor="366092")
-            
-            for sheet_name in writer.sheets:
-                worksheet = writer.sheets[sheet_name]
-                for cell in worksheet[1]:  # Primera fila (headers)
-                    cell.style = header_style
-                
-                # Ajustar ancho de columnas
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 5, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
-        except Exception as e:
-            # Si hay error con los estilos, continuar sin ellos
-            print(f"Advertencia: No se pudieron aplicar estilos: {e}")
-    
+    libro.save(output)
     output.seek(0)
     return output
 
@@ -645,21 +586,15 @@ def mostrar():
         # No mostrar el resto del contenido mientras se muestra el login
         return
     
-    # Crear tabla de stock mínimo si no existe
-    crear_tabla_stock_minimo()
-    
-    # IMPORTANTE: Forzar recarga de datos cada vez que se muestra la página
-    # Esto asegura que siempre veamos los datos más recientes
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        productos_df = pd.read_sql_query("SELECT * FROM productos", conn)
-    finally:
-        conn.close()
+    # El caché se invalida solo cuando cambia la tabla productos,
+    # así que siempre vemos los datos más recientes sin releer en cada clic
+    productos_df = obtener_inventario()
     
     # Botón de recarga manual (por si acaso)
     col_refresh = st.columns([5, 1])
     with col_refresh[1]:
         if st.button("🔄 Refrescar", key="refresh_inventario"):
+            invalidar_tablas('productos')
             st.rerun()
     
     # 1. Mostrar alertas de stock bajo
@@ -1425,11 +1360,11 @@ def mostrar():
                                 else:
                                     # Actualizar stock, stock mínimo y stock máximo
                                     if producto_info['es_granel']:
-                                        success1 = actualizar_stock_producto(producto_info['codigo'], int(nueva_cantidad), nueva_cantidad)
+                                        success1 = actualizar_stock_producto(producto_info['codigo'], int(nueva_cantidad), nueva_cantidad, motivo_stock)
                                         success2 = actualizar_stock_minimo(producto_info['codigo_barras'] or producto_info['nombre'], int(nuevo_stock_minimo), nuevo_stock_minimo)
                                         success3 = actualizar_stock_maximo(producto_info['codigo'], int(nuevo_stock_maximo), nuevo_stock_maximo)
                                     else:
-                                        success1 = actualizar_stock_producto(producto_info['codigo'], int(nueva_cantidad))
+                                        success1 = actualizar_stock_producto(producto_info['codigo'], int(nueva_cantidad), motivo=motivo_stock)
                                         success2 = actualizar_stock_minimo(producto_info['codigo_barras'] or producto_info['nombre'], int(nuevo_stock_minimo), None)
                                         success3 = actualizar_stock_maximo(producto_info['codigo'], int(nuevo_stock_maximo), None)
                                     
@@ -1447,6 +1382,13 @@ def mostrar():
                                         st.error("❌ Error al actualizar el stock")
                             except Exception as e:
                                 st.error(f"❌ Error: {str(e)}")
+                    
+                    with st.expander("📜 Movimientos de inventario (kardex)"):
+                        movimientos_df = obtener_movimientos(producto_info['codigo'], limite=50)
+                        if movimientos_df.empty:
+                            st.info("Sin movimientos registrados")
+                        else:
+                            st.dataframe(movimientos_df, hide_index=True, width='stretch')
                 
                 with tab2:
                     st.write("#### 💰 Gestión de Precios")
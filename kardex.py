@@ -0,0 +1,320 @@
+"""
+Kardex: libro de movimientos de inventario
+Cada cambio de stock se registra como un movimiento en `movimientos_inventario`
+(solo inserción) dentro de la misma transacción que actualiza `productos`.
+El stock de `productos` queda como saldo en caché: la suma de los movimientos de
+un producto debe coincidir siempre con su stock.
+
+Uso desde consola:
+    python kardex.py verificar           # productos cuyo saldo no cuadra con el kardex
+    python kardex.py movimientos 11111   # últimos movimientos de un producto
+"""
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+DB_PATH = "pos_cremeria.db"
+
+# Tipos de movimiento válidos
+TIPOS_MOVIMIENTO = (
+    'SALDO_INICIAL',     # Stock existente al crear el kardex o al dar de alta un producto
+    'VENTA',             # Salida por venta en punto de venta
+    'RECEPCION_PEDIDO',  # Entrada por pedido recibido
+    'AJUSTE',            # Ajuste manual de inventario (conteo físico, edición)
+    'CORRECCION',        # Corrección de diferencias (scripts de conciliación)
+)
+
+# Tolerancia para comparar saldos en kg
+TOLERANCIA = 1e-6
+
+_saldos_inicializados = set()
+
+class StockInsuficiente(Exception):
+    """Una o más salidas dejarían el stock en negativo (otra terminal vendió antes)
+
+    `faltantes` es una lista de dicts con codigo, solicitado y disponible
+    (en piezas o en kg según `unidad`).
+    """
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        detalle = ", ".join(f"{f['codigo']} (pide {f['solicitado']:g}, hay {f['disponible']:g} {f['unidad']})"
+                            for f in faltantes)
+        super().__init__(f"Stock insuficiente: {detalle}")
+
+def crear_tabla_movimientos(conn, commit=True):
+    """Crear la tabla del kardex, sus índices y los triggers que la hacen de solo inserción"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS movimientos_inventario (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            codigo TEXT NOT NULL,
+            tipo_movimiento TEXT NOT NULL,
+            cantidad INTEGER DEFAULT 0,
+            cantidad_kg REAL DEFAULT 0,
+            stock_resultante INTEGER,
+            stock_kg_resultante REAL,
+            referencia_tipo TEXT,
+            referencia_id INTEGER,
+            usuario TEXT,
+            notas TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_movimientos_codigo
+        ON movimientos_inventario (codigo, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_movimientos_referencia
+        ON movimientos_inventario (referencia_tipo, referencia_id)
+    ''')
+
+    # El kardex no se edita ni se borra: los errores se corrigen con otro movimiento
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_movimientos_no_update
+        BEFORE UPDATE ON movimientos_inventario
+        BEGIN
+            SELECT RAISE(ABORT, 'movimientos_inventario es de solo inserción');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_movimientos_no_delete
+        BEFORE DELETE ON movimientos_inventario
+        BEGIN
+            SELECT RAISE(ABORT, 'movimientos_inventario es de solo inserción');
+        END
+    ''')
+
+    inicializar_saldos(conn)
+    if commit:
+        conn.commit()
+
+def _asegurar_saldos(cursor):
+    """Registrar una vez por proceso los saldos iniciales que falten
+
+    La tabla la crean las migraciones; aquí solo se cubren productos que llegaron
+    sin pasar por el kardex (ej. sincronizados desde Supabase).
+    """
+    conn = cursor.connection
+    clave = conn.execute("PRAGMA database_list").fetchone()[2]
+    if clave not in _saldos_inicializados:
+        # Si hay una transacción abierta, los saldos se suman a ella (sin commit intermedio)
+        en_transaccion = conn.in_transaction
+        inicializar_saldos(conn)
+        if not en_transaccion:
+            conn.commit()
+        _saldos_inicializados.add(clave)
+
+def inicializar_saldos(conn):
+    """Registrar SALDO_INICIAL para los productos que aún no tienen movimientos"""
+    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor = conn.execute('''
+        INSERT INTO movimientos_inventario
+            (fecha, codigo, tipo_movimiento, cantidad, cantidad_kg,
+             stock_resultante, stock_kg_resultante, referencia_tipo, notas)
+        SELECT ?, p.codigo, 'SALDO_INICIAL', COALESCE(p.stock, 0), COALESCE(p.stock_kg, 0),
+               COALESCE(p.stock, 0), COALESCE(p.stock_kg, 0), 'inicio_kardex', 'Saldo al iniciar el kardex'
+        FROM productos p
+        WHERE NOT EXISTS (
+            SELECT 1 FROM movimientos_inventario m WHERE m.codigo = p.codigo
+        )
+    ''', (fecha,))
+    return cursor.rowcount
+
+def registrar_movimiento(cursor, codigo, tipo_movimiento, cantidad=0, cantidad_kg=0.0,
+                         referencia_tipo=None, referencia_id=None, usuario=None, notas=None,
+                         validar_stock=False):
+    """Aplicar un movimiento de stock y registrarlo en el kardex
+
+    No hace commit: el llamador decide la transacción para que el movimiento y
+    el cambio de stock (y la venta o pedido que lo origina) queden juntos.
+    Con `validar_stock=True` el UPDATE solo se aplica si el stock no queda en negativo
+    (comprobación optimista: la condición se evalúa sobre el stock actual, no sobre lo que
+    la terminal leyó al escanear) y si no alcanza lanza StockInsuficiente.
+    Devuelve (stock_resultante, stock_kg_resultante) o None si el producto no existe.
+    """
+    if tipo_movimiento not in TIPOS_MOVIMIENTO:
+        raise ValueError(f"Tipo de movimiento inválido: {tipo_movimiento}")
+
+    _asegurar_saldos(cursor)
+
+    cantidad = cantidad or 0
+    cantidad_kg = cantidad_kg or 0.0
+
+    condicion = ""
+    if validar_stock:
+        condicion = '''
+          AND (? >= 0 OR COALESCE(stock, 0) + ? >= 0)
+          AND (? >= 0 OR COALESCE(stock_kg, 0) + ? >= ?)
+        '''
+    cursor.execute(f'''
+        UPDATE productos
+        SET stock = COALESCE(stock, 0) + ?, stock_kg = COALESCE(stock_kg, 0) + ?
+        WHERE codigo = ? {condicion}
+        RETURNING stock, stock_kg
+    ''', (cantidad, cantidad_kg, codigo)
+        + ((cantidad, cantidad, cantidad_kg, cantidad_kg, -TOLERANCIA) if validar_stock else ()))
+    resultado = cursor.fetchone()
+    if resultado is None:
+        if validar_stock:
+            cursor.execute("SELECT stock, stock_kg FROM productos WHERE codigo = ?", (codigo,))
+            actual = cursor.fetchone()
+            if actual is not None:
+                granel = cantidad_kg < 0
+                raise StockInsuficiente([{
+                    'codigo': codigo,
+                    'solicitado': -cantidad_kg if granel else -cantidad,
+                    'disponible': (actual[1] or 0.0) if granel else (actual[0] or 0),
+                    'unidad': 'kg' if granel else 'pzas',
+                }])
+        return None
+    stock_resultante, stock_kg_resultante = resultado
+
+    cursor.execute('''
+        INSERT INTO movimientos_inventario
+            (fecha, codigo, tipo_movimiento, cantidad, cantidad_kg,
+             stock_resultante, stock_kg_resultante, referencia_tipo, referencia_id, usuario, notas)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), codigo, tipo_movimiento, cantidad, cantidad_kg,
+          stock_resultante, stock_kg_resultante, referencia_tipo, referencia_id, usuario, notas))
+
+    return stock_resultante, stock_kg_resultante
+
+# Entradas de un pedido agrupadas por producto: piezas enteras para 'unidad', kg para granel
+_SQL_ENTRADAS_PEDIDO = """
+    SELECT pi.codigo_producto AS codigo,
+           SUM(CASE WHEN p.tipo_venta = 'granel' THEN 0 ELSE CAST(pi.cantidad_recibida AS INTEGER) END) AS cantidad,
+           SUM(CASE WHEN p.tipo_venta = 'granel' THEN pi.cantidad_recibida ELSE 0 END) AS cantidad_kg
+    FROM pedidos_items pi
+    JOIN productos p ON p.codigo = pi.codigo_producto
+    WHERE pi.pedido_id = :pedido_id AND pi.cantidad_recibida > 0
+    GROUP BY pi.codigo_producto
+"""
+
+def registrar_recepcion_pedido(cursor, pedido_id, usuario=None):
+    """Sumar al stock todo lo recibido de un pedido con un movimiento RECEPCION_PEDIDO por producto
+
+    Equivale a llamar registrar_movimiento() por cada item, pero con un solo UPDATE ... FROM
+    y un solo INSERT ... SELECT. No hace commit. Devuelve los códigos actualizados.
+    """
+    _asegurar_saldos(cursor)
+
+    cursor.execute(f"""
+        UPDATE productos
+        SET stock = COALESCE(productos.stock, 0) + entradas.cantidad,
+            stock_kg = COALESCE(productos.stock_kg, 0) + entradas.cantidad_kg
+        FROM ({_SQL_ENTRADAS_PEDIDO}) AS entradas
+        WHERE productos.codigo = entradas.codigo
+        RETURNING productos.codigo
+    """, {'pedido_id': pedido_id})
+    codigos = [fila[0] for fila in cursor.fetchall()]
+
+    # El stock ya quedó actualizado: se registra como saldo resultante de cada movimiento
+    cursor.execute(f"""
+        INSERT INTO movimientos_inventario
+            (fecha, codigo, tipo_movimiento, cantidad, cantidad_kg,
+             stock_resultante, stock_kg_resultante, referencia_tipo, referencia_id, usuario)
+        SELECT :fecha, entradas.codigo, 'RECEPCION_PEDIDO', entradas.cantidad, entradas.cantidad_kg,
+               p.stock, p.stock_kg, 'pedido', :pedido_id, :usuario
+        FROM ({_SQL_ENTRADAS_PEDIDO}) AS entradas
+        JOIN productos p ON p.codigo = entradas.codigo
+    """, {'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'pedido_id': pedido_id, 'usuario': usuario})
+
+    return codigos
+
+def ajustar_stock(cursor, codigo, nuevo_stock=None, nuevo_stock_kg=None, tipo_movimiento='AJUSTE',
+                  usuario=None, notas=None, referencia_tipo=None, referencia_id=None):
+    """Llevar el stock a un valor absoluto registrando la diferencia como movimiento
+
+    Devuelve (stock_resultante, stock_kg_resultante), o None si el producto no existe.
+    """
+    cursor.execute("SELECT stock, stock_kg FROM productos WHERE codigo = ?", (codigo,))
+    actual = cursor.fetchone()
+    if actual is None:
+        return None
+
+    stock_actual = actual[0] or 0
+    stock_kg_actual = actual[1] or 0.0
+    diferencia = (nuevo_stock - stock_actual) if nuevo_stock is not None else 0
+    diferencia_kg = (nuevo_stock_kg - stock_kg_actual) if nuevo_stock_kg is not None else 0.0
+
+    if diferencia == 0 and abs(diferencia_kg) < TOLERANCIA:
+        return stock_actual, stock_kg_actual
+
+    return registrar_movimiento(
+        cursor, codigo, tipo_movimiento, diferencia, diferencia_kg,
+        referencia_tipo=referencia_tipo, referencia_id=referencia_id, usuario=usuario, notas=notas
+    )
+
+def verificar_saldos(db_path=DB_PATH, codigo=None) -> pd.DataFrame:
+    """Recalcular saldos desde el kardex y devolver los productos que no cuadran"""
+    conn = sqlite3.connect(db_path)
+    try:
+        _asegurar_saldos(conn.cursor())
+        query = '''
+            SELECT p.codigo, p.nombre,
+                   COALESCE(p.stock, 0) AS stock,
+                   COALESCE(m.saldo, 0) AS saldo_kardex,
+                   COALESCE(p.stock_kg, 0) AS stock_kg,
+                   COALESCE(m.saldo_kg, 0) AS saldo_kardex_kg,
+                   COALESCE(m.movimientos, 0) AS movimientos
+            FROM productos p
+            LEFT JOIN (
+                SELECT codigo, SUM(cantidad) AS saldo, SUM(cantidad_kg) AS saldo_kg, COUNT(*) AS movimientos
+                FROM movimientos_inventario
+                GROUP BY codigo
+            ) m ON m.codigo = p.codigo
+        '''
+        params = ()
+        if codigo:
+            query += " WHERE p.codigo = ?"
+            params = (codigo,)
+
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+    df['diferencia'] = df['stock'] - df['saldo_kardex']
+    df['diferencia_kg'] = (df['stock_kg'] - df['saldo_kardex_kg']).round(6)
+    return df[(df['diferencia'] != 0) | (df['diferencia_kg'].abs() > TOLERANCIA)].reset_index(drop=True)
+
+def obtener_movimientos(codigo, limite=100, db_path=DB_PATH) -> pd.DataFrame:
+    """Últimos movimientos de un producto (usa el índice por código)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        _asegurar_saldos(conn.cursor())
+        return pd.read_sql_query('''
+            SELECT id, fecha, tipo_movimiento, cantidad, cantidad_kg,
+                   stock_resultante, stock_kg_resultante, referencia_tipo, referencia_id, usuario, notas
+            FROM movimientos_inventario
+            WHERE codigo = ?
+            ORDER BY id DESC
+            LIMIT ?
+        ''', conn, params=(codigo, limite))
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    from migraciones import asegurar_esquema
+    asegurar_esquema()
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('verificar', 'movimientos'):
+        print("Uso: python kardex.py verificar [codigo] | movimientos <codigo> [limite]")
+        sys.exit(1)
+
+    if sys.argv[1] == 'verificar':
+        diferencias = verificar_saldos(codigo=sys.argv[2] if len(sys.argv) > 2 else None)
+        if diferencias.empty:
+            print("✅ Todos los saldos cuadran con el kardex")
+        else:
+            print(f"⚠️ {len(diferencias)} producto(s) no cuadran con el kardex:")
+            print(diferencias.to_string(index=False))
+            sys.exit(2)
+    else:
+        if len(sys.argv) < 3:
+            print("Uso: python kardex.py movimientos <codigo> [limite]")
+            sys.exit(1)
+        limite = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        print(obtener_movimientos(sys.argv[2], limite).to_string(index=False))
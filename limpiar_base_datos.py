@@ -2,12 +2,15 @@
 """
 Script para limpiar la base de datos del sistema POS
 Elimina todos los productos, ventas y datos financieros para hacer pruebas frescas
+(para sacar meses viejos sin perderlos está archivo_historico.py)
 """
 
 import sqlite3
 import os
 from datetime import datetime
 
+from backup_manager import crear_backup
+
 def limpiar_base_datos():
     """Eliminar todos los datos de productos, ventas y finanzas"""
     
@@ -22,12 +25,10 @@ def limpiar_base_datos():
     print("=" * 50)
     
     # Hacer backup antes de limpiar
-    backup_name = f"backup_pos_cremeria_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
     
     try:
-        # Crear backup
-        import shutil
-        shutil.copy2(db_path, backup_name)
+        # Crear backup (en caliente y verificado)
+        backup_name = crear_backup(db_path)['archivo']
         print(f"✅ Backup creado: {backup_name}")
         
         # Conectar a la base de datos
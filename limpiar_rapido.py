@@ -5,8 +5,8 @@ Para usar dentro del contenedor Docker
 """
 
 import sqlite3
-import shutil
-from datetime import datetime
+
+from backup_manager import crear_backup
 
 def limpiar_rapido():
     """Limpiar base de datos sin confirmaciones"""
@@ -15,9 +15,8 @@ def limpiar_rapido():
     
     try:
         # Backup automático
-        backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        shutil.copy2(db_path, backup_name)
-        print(f"Backup creado: {backup_name}")
+        backup = crear_backup(db_path)
+        print(f"Backup creado: {backup['archivo']}")
         
         # Limpiar
         conn = sqlite3.connect(db_path)
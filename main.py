@@ -1,20 +1,18 @@
 import streamlit as st
 import sqlite3
 import hashlib
+import importlib
 from datetime import datetime, timedelta
-import json
-import uuid
 
-# Importar los módulos
-import productos
-import inventario
-import ventas
-import finanzas
-import turnos
-import pedidos
-import usuarios
 import config
+import change_notifier
+from migraciones import asegurar_esquema
+from backup_manager import get_programador_backups
+from mantenimiento_db import get_servicio_mantenimiento
+from programador_sync import get_programador_sync
+from rendimiento import get_perfilador, medir_pagina
 from db_adapter import get_db_adapter
+from session_store import get_session_store
 
 # Obtener configuración desde secrets.toml
 DB_PATH = config.get_db_path()
@@ -22,79 +20,18 @@ DB_PATH = config.get_db_path()
 # Inicializar adaptador de base de datos
 db = get_db_adapter()
 
-# Archivo para almacenar sesiones activas (persistente entre reloads)
-SESSIONS_FILE = "active_sessions.json"
-
-def cargar_sesiones_activas():
-    """Cargar sesiones activas desde archivo"""
-    try:
-        with open(SESSIONS_FILE, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
-
-def guardar_sesiones_activas(sesiones):
-    """Guardar sesiones activas en archivo"""
-    try:
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump(sesiones, f)
-    except Exception as e:
-        print(f"Error al guardar sesiones: {e}")
-
 def crear_token_sesion(usuario_data):
     """Crear token único para la sesión"""
-    token = str(uuid.uuid4())
-    sesiones = cargar_sesiones_activas()
-    
-    # Limpiar sesiones expiradas
-    ahora = datetime.now().isoformat()
-    sesiones_validas = {}
-    for tok, data in sesiones.items():
-        expira = datetime.fromisoformat(data['expira'])
-        if expira > datetime.now():
-            sesiones_validas[tok] = data
-    
-    # Agregar nueva sesión
-    sesiones_validas[token] = {
-        'usuario': usuario_data[0],
-        'nombre_completo': usuario_data[1],
-        'rol': usuario_data[2],
-        'creada': datetime.now().isoformat(),
-        'expira': (datetime.now() + timedelta(hours=12)).isoformat()
-    }
-    
-    guardar_sesiones_activas(sesiones_validas)
-    return token
+    usuario, nombre_completo, rol = usuario_data[0], usuario_data[1], usuario_data[2]
+    return get_session_store().crear(usuario, nombre_completo, rol)
 
 def validar_token_sesion(token):
-    """Validar si un token de sesión es válido"""
-    if not token:
-        return None
-    
-    sesiones = cargar_sesiones_activas()
-    if token not in sesiones:
-        return None
-    
-    data = sesiones[token]
-    expira = datetime.fromisoformat(data['expira'])
-    
-    if expira < datetime.now():
-        # Sesión expirada, eliminar
-        del sesiones[token]
-        guardar_sesiones_activas(sesiones)
-        return None
-    
-    return data
+    """Validar si un token de sesión es válido (búsqueda en memoria, sin leer disco)"""
+    return get_session_store().validar(token)
 
 def eliminar_token_sesion(token):
     """Eliminar token de sesión al cerrar sesión"""
-    if not token:
-        return
-    
-    sesiones = cargar_sesiones_activas()
-    if token in sesiones:
-        del sesiones[token]
-        guardar_sesiones_activas(sesiones)
+    get_session_store().eliminar(token)
 
 def hash_password(password):
     """Encriptar contraseña usando SHA-256 con salt"""
@@ -129,7 +66,7 @@ def verificar_sesion_activa():
     token = query_params.get('session_token', None)
     
     if token:
-        # Validar token desde archivo persistente
+        # Validar token contra el almacén de sesiones
         session_data = validar_token_sesion(token)
         if session_data:
             # Restaurar sesión en session_state
@@ -140,6 +77,8 @@ def verificar_sesion_activa():
             st.session_state.session_token = token
             st.session_state.login_timestamp = datetime.fromisoformat(session_data['creada'])
             return True
+        # Token cerrado o expirado: quitarlo de la URL para no volver a validarlo en cada rerun
+        del st.query_params['session_token']
     
     # Si no hay token válido en URL, verificar session_state tradicional
     if not st.session_state.get('autenticado', False):
@@ -236,18 +175,47 @@ def mostrar_login():
                         st.query_params['session_token'] = token
                         
                         # Actualizar último acceso
-                        usuarios.actualizar_ultimo_acceso(resultado[0])
+                        cargar_pagina("Gestión de Usuarios").actualizar_ultimo_acceso(resultado[0])
                         
                         st.success(f"✅ Bienvenido, {resultado[1]}! Sesión válida por 12 horas.")
                         st.rerun()
                     else:
                         st.error("❌ Usuario o contraseña incorrectos")
 
+# Módulo de cada página; se importa la primera vez que se navega a ella
+MODULOS_PAGINAS = {
+    "Punto de Venta": "ventas",
+    "Gestión de Productos": "productos",
+    "Inventario": "inventario",
+    "Pedidos y Reabastecimiento": "pedidos",
+    "Finanzas": "finanzas",
+    "Turnos y Atención al Cliente": "turnos",
+    "Gestión de Usuarios": "usuarios",
+    "Salud de la Base de Datos": "mantenimiento_db",
+    "Rendimiento": "rendimiento",
+}
+
+def cargar_pagina(nombre):
+    """Importar (una sola vez por proceso) el módulo de una página"""
+    return importlib.import_module(MODULOS_PAGINAS[nombre])
+
 def main():
     st.set_page_config(page_title="Punto de Venta - Cremería", layout="wide")
+
+    # Medición de consultas y tiempos por página (antes de importar cualquier página)
+    get_perfilador()
     
-    # Crear tabla de usuarios si no existe
-    usuarios.crear_tabla_usuarios()
+    # Crear/actualizar tablas (solo la primera vez en el proceso)
+    asegurar_esquema()
+
+    # Respaldos automáticos en segundo plano (un solo hilo por proceso)
+    get_programador_backups()
+
+    # Mantenimiento de la base en ventanas sin actividad (un solo hilo por proceso)
+    get_servicio_mantenimiento()
+
+    # Descargas de Supabase en segundo plano en lugar de al mostrar cada página
+    get_programador_sync()
     
     # Verificar sesión activa (con validación de 12 horas)
     if not verificar_sesion_activa():
@@ -299,6 +267,10 @@ def main():
     if st.session_state.rol_usuario == "admin":
         if st.sidebar.button("🔐 Gestión de Usuarios", width='stretch'):
             st.session_state.pagina_seleccionada = "Gestión de Usuarios"
+        if st.sidebar.button("🩺 Salud de la Base de Datos", width='stretch'):
+            st.session_state.pagina_seleccionada = "Salud de la Base de Datos"
+        if st.sidebar.button("⏱️ Rendimiento", width='stretch'):
+            st.session_state.pagina_seleccionada = "Rendimiento"
     
     st.sidebar.divider()
     
@@ -310,20 +282,17 @@ def main():
     
     seleccion = st.session_state.pagina_seleccionada
 
-    if seleccion == "Punto de Venta":
-        ventas.mostrar()
-    elif seleccion == "Gestión de Productos":
-        productos.mostrar()
-    elif seleccion == "Inventario":
-        inventario.mostrar()
-    elif seleccion == "Pedidos y Reabastecimiento":
-        pedidos.mostrar()
-    elif seleccion == "Finanzas":
-        finanzas.mostrar()
-    elif seleccion == "Turnos y Atención al Cliente":
-        turnos.mostrar()
-    elif seleccion == "Gestión de Usuarios":
-        usuarios.mostrar()
+    # Tablas que cambiaron desde el render anterior (se marcan como vistas): las secciones
+    # de la página las consultan con change_notifier.datos_de_pagina para no repetir consultas
+    change_notifier.tablas_cambiadas(seleccion)
+
+    # Duración del rerun (incluye la primera importación de la página) y sus consultas
+    with medir_pagina(seleccion):
+        cargar_pagina(seleccion).mostrar()
+
+    # Avisar si otra sesión cambia los datos de la página
+    with st.sidebar:
+        change_notifier.mostrar_aviso_cambios(seleccion)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
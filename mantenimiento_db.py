@@ -0,0 +1,509 @@
+"""
+Salud y mantenimiento de la base de datos
+- Mide el tamaño de cada tabla e índice (tabla virtual `dbstat`), páginas libres,
+  fragmentación y filas, y lo guarda en `historial_almacenamiento` / `historial_base`
+  para ver el crecimiento en el tiempo.
+- Un hilo de mantenimiento corre `PRAGMA optimize`, ANALYZE semanal, `incremental_vacuum`
+  por bloques y checkpoint del WAL, solo cuando la base lleva un rato sin escrituras.
+  Nada de esto bloquea como el VACUUM completo de verificar_limites_db.py.
+  Una vez al día también recalcula el pronóstico de demanda (pronostico_demanda.py).
+  Si el monitor de stock está instalado, borra los `cambios_stock` más viejos que la
+  retención configurada (stock_monitor.retention_days).
+- `mostrar()` es la página de administración con las métricas (de la última muestra) y tendencias.
+
+Uso desde consola:
+    python mantenimiento_db.py estado
+    python mantenimiento_db.py muestra
+    python mantenimiento_db.py mantenimiento
+    python mantenimiento_db.py activar-incremental   # una vez: auto_vacuum=INCREMENTAL + VACUUM
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+DB_PATH = "pos_cremeria.db"
+
+# ANALYZE completo como máximo una vez por semana (PRAGMA optimize cubre lo demás)
+DIAS_ENTRE_ANALYZE = 7
+# Páginas liberadas por paso de incremental_vacuum (se suelta el bloqueo entre pasos)
+PAGINAS_POR_PASO_VACUUM = 500
+
+def _ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def bytes_a_mb(valor):
+    return round((valor or 0) / (1024 * 1024), 2)
+
+# === MEDICIÓN ===
+
+def medir_base(conn):
+    """Tamaño, páginas libres y fragmentación de toda la base"""
+    tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+    paginas = conn.execute("PRAGMA page_count").fetchone()[0]
+    libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    try:
+        sin_uso = conn.execute("SELECT COALESCE(SUM(unused), 0) FROM dbstat").fetchone()[0]
+    except sqlite3.OperationalError:
+        # SQLite compilado sin dbstat: solo cuentan las páginas libres
+        sin_uso = 0
+    total = paginas * tamano_pagina
+    return {
+        'tamano_bytes': total,
+        'paginas': paginas,
+        'paginas_libres': libres,
+        'tamano_pagina': tamano_pagina,
+        'auto_vacuum': conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+        'journal_mode': conn.execute("PRAGMA journal_mode").fetchone()[0],
+        # Espacio desperdiciado: páginas libres + huecos dentro de páginas usadas
+        'fragmentacion': round((libres * tamano_pagina + sin_uso) * 100.0 / total, 2) if total else 0.0,
+    }
+
+def medir_objetos(conn) -> pd.DataFrame:
+    """Páginas, bytes y filas de cada tabla e índice"""
+    objetos = pd.read_sql_query('''
+        SELECT name AS objeto, type AS tipo, tbl_name AS tabla
+        FROM sqlite_master
+        WHERE type IN ('table', 'index')
+    ''', conn)
+
+    try:
+        tamanos = pd.read_sql_query('''
+            SELECT name AS objeto, COUNT(*) AS paginas, SUM(pgsize) AS bytes, SUM(unused) AS bytes_sin_uso
+            FROM dbstat
+            GROUP BY name
+        ''', conn)
+        objetos = objetos.merge(tamanos, on='objeto', how='left')
+    except Exception:
+        objetos['paginas'] = None
+        objetos['bytes'] = None
+        objetos['bytes_sin_uso'] = None
+
+    filas = {}
+    for tabla in objetos.loc[objetos['tipo'] == 'table', 'objeto']:
+        filas[tabla] = conn.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+    objetos['filas'] = objetos['objeto'].map(filas).astype('Int64')
+
+    return objetos.sort_values('bytes', ascending=False, na_position='last').reset_index(drop=True)
+
+def tomar_muestra(db_path=DB_PATH):
+    """Guardar una medición en el historial; devuelve (base, objetos)"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        base = medir_base(conn)
+        objetos = medir_objetos(conn)
+        fecha = _ahora()
+        conn.execute('''
+            INSERT INTO historial_base (fecha, tamano_bytes, paginas, paginas_libres, fragmentacion)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (fecha, base['tamano_bytes'], base['paginas'], base['paginas_libres'], base['fragmentacion']))
+        conn.executemany('''
+            INSERT INTO historial_almacenamiento (fecha, objeto, tipo, tabla, filas, paginas, bytes, bytes_sin_uso)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (fecha, fila.objeto, fila.tipo, fila.tabla,
+             None if pd.isna(fila.filas) else int(fila.filas),
+             None if pd.isna(fila.paginas) else int(fila.paginas),
+             None if pd.isna(fila.bytes) else int(fila.bytes),
+             None if pd.isna(fila.bytes_sin_uso) else int(fila.bytes_sin_uso))
+            for fila in objetos.itertuples(index=False)
+        ])
+        conn.commit()
+        return base, objetos
+    finally:
+        conn.close()
+
+# === MANTENIMIENTO ===
+
+def _registrar(conn, accion, inicio, resultado):
+    duracion = (time.perf_counter() - inicio) * 1000
+    conn.execute('''
+        INSERT INTO historial_mantenimiento (fecha, accion, duracion_ms, resultado)
+        VALUES (?, ?, ?, ?)
+    ''', (_ahora(), accion, round(duracion, 1), resultado))
+    conn.commit()
+    return accion, round(duracion, 1), resultado
+
+def _ultima_ejecucion(conn, accion):
+    fila = conn.execute(
+        "SELECT MAX(fecha) FROM historial_mantenimiento WHERE accion = ?", (accion,)
+    ).fetchone()
+    return datetime.strptime(fila[0], "%Y-%m-%d %H:%M:%S") if fila and fila[0] else None
+
+def ejecutar_mantenimiento(db_path=DB_PATH, forzar_analyze=False, dias_cambios_stock=30):
+    """Un ciclo de mantenimiento sin bloqueos largos; devuelve [(acción, ms, resultado)]"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    acciones = []
+    try:
+        inicio = time.perf_counter()
+        conn.execute("PRAGMA optimize")
+        acciones.append(_registrar(conn, 'optimize', inicio, 'ok'))
+
+        # Registro del monitor de stock: sin purga crecería una fila por cada cambio de stock.
+        # Antes del incremental_vacuum para que las páginas liberadas se recuperen en este ciclo
+        monitor_instalado = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cambios_stock'"
+        ).fetchone()
+        if monitor_instalado and dias_cambios_stock:
+            from monitor_stock import purgar_cambios
+            inicio = time.perf_counter()
+            borrados = purgar_cambios(conn, dias_cambios_stock)
+            acciones.append(_registrar(conn, 'purgar_cambios_stock', inicio,
+                                       f"{borrados} cambios de más de {dias_cambios_stock} días"))
+
+        ultimo_analyze = _ultima_ejecucion(conn, 'analyze')
+        if forzar_analyze or ultimo_analyze is None or datetime.now() - ultimo_analyze > timedelta(days=DIAS_ENTRE_ANALYZE):
+            inicio = time.perf_counter()
+            conn.execute("ANALYZE")
+            conn.commit()
+            acciones.append(_registrar(conn, 'analyze', inicio, 'ok'))
+
+        libres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if libres:
+            inicio = time.perf_counter()
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # Por bloques: entre pasos otras conexiones pueden escribir.
+                # executescript avanza el PRAGMA hasta el final (execute solo libera una página)
+                while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+                    conn.executescript(f"PRAGMA incremental_vacuum({PAGINAS_POR_PASO_VACUUM});")
+                    time.sleep(0.05)
+                acciones.append(_registrar(conn, 'incremental_vacuum', inicio, f"{libres} páginas liberadas"))
+            else:
+                acciones.append(_registrar(conn, 'incremental_vacuum', inicio,
+                                           f"omitido: auto_vacuum no es INCREMENTAL ({libres} páginas libres)"))
+
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal':
+            inicio = time.perf_counter()
+            ocupado, paginas_wal, copiadas = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            acciones.append(_registrar(conn, 'wal_checkpoint', inicio,
+                                       f"{copiadas}/{paginas_wal} páginas" + (" (ocupado)" if ocupado else "")))
+    finally:
+        conn.close()
+    return acciones
+
+def recalcular_pronostico(db_path=DB_PATH):
+    """Recalcular el pronóstico de demanda (una vez al día, con la base inactiva)"""
+    from pronostico_demanda import actualizar_pronostico
+
+    inicio = time.perf_counter()
+    productos = actualizar_pronostico(db_path)
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        return _registrar(conn, 'pronostico', inicio, f"{productos} productos")
+    finally:
+        conn.close()
+
+def activar_vacuum_incremental(db_path=DB_PATH):
+    """Cambiar a auto_vacuum=INCREMENTAL (requiere un VACUUM completo, con respaldo previo)"""
+    from backup_manager import crear_backup
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return None
+        respaldo = crear_backup(db_path)
+        inicio = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        _registrar(conn, 'activar_incremental', inicio, f"respaldo previo: {respaldo['archivo']}")
+        return respaldo
+    finally:
+        conn.close()
+
+
+class ServicioMantenimiento:
+    """Hilo que da mantenimiento cuando la base lleva `minutos_inactividad` sin escrituras"""
+
+    def __init__(self, db_path=DB_PATH, intervalo_horas=6, minutos_inactividad=10, revision=60,
+                 dias_cambios_stock=30):
+        self.db_path = db_path
+        self.dias_cambios_stock = dias_cambios_stock
+        self.intervalo = timedelta(hours=intervalo_horas)
+        self.inactividad = timedelta(minutes=minutos_inactividad)
+        self.revision = revision
+
+        self.ultimo_mantenimiento = None
+        self.ultima_muestra = None
+        self.ultimo_pronostico = None
+        self.ultimo_error = None
+
+        self._data_version = None
+        self._ultima_escritura = datetime.now()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._conn = None
+
+    def _hubo_escrituras(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        cambio = self._data_version is not None and data_version != self._data_version
+        self._data_version = data_version
+        return cambio
+
+    def _cargar_ultimas_ejecuciones(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.ultimo_mantenimiento = _ultima_ejecucion(conn, 'optimize')
+            self.ultimo_pronostico = _ultima_ejecucion(conn, 'pronostico')
+            fila = conn.execute("SELECT MAX(fecha) FROM historial_base").fetchone()
+            self.ultima_muestra = datetime.strptime(fila[0], "%Y-%m-%d %H:%M:%S") if fila[0] else None
+        finally:
+            conn.close()
+
+    def revisar(self):
+        """Un paso del ciclo: dar mantenimiento / tomar muestra si toca y la base está inactiva"""
+        ahora = datetime.now()
+        if self._hubo_escrituras():
+            self._ultima_escritura = ahora
+        if ahora - self._ultima_escritura < self.inactividad:
+            return
+
+        if self.ultimo_mantenimiento is None or ahora - self.ultimo_mantenimiento >= self.intervalo:
+            ejecutar_mantenimiento(self.db_path, dias_cambios_stock=self.dias_cambios_stock)
+            self.ultimo_mantenimiento = ahora
+        if self.ultima_muestra is None or ahora - self.ultima_muestra >= timedelta(days=1):
+            tomar_muestra(self.db_path)
+            self.ultima_muestra = ahora
+        if self.ultimo_pronostico is None or self.ultimo_pronostico.date() < ahora.date():
+            recalcular_pronostico(self.db_path)
+            self.ultimo_pronostico = ahora
+        # Lo que escribimos nosotros no cuenta como actividad
+        self._hubo_escrituras()
+
+    def _ciclo(self):
+        try:
+            self._cargar_ultimas_ejecuciones()
+        except sqlite3.Error as e:
+            print(f"Error al leer historial de mantenimiento: {e}")
+        while not self._detener.wait(self.revision):
+            try:
+                self.revisar()
+                self.ultimo_error = None
+            except Exception as e:
+                self.ultimo_error = str(e)
+                print(f"Error en mantenimiento de la base: {e}")
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="mantenimiento-db", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+
+# Instancia global del servicio de mantenimiento
+_servicio = None
+_servicio_lock = threading.Lock()
+
+def get_servicio_mantenimiento() -> ServicioMantenimiento:
+    """Obtener (e iniciar) la instancia única del servicio de mantenimiento"""
+    global _servicio
+    if _servicio is None:
+        with _servicio_lock:
+            if _servicio is None:
+                import config
+                _servicio = ServicioMantenimiento(
+                    db_path=config.get_db_path(),
+                    intervalo_horas=config.get_maintenance_interval_hours(),
+                    minutos_inactividad=config.get_maintenance_idle_minutes(),
+                    dias_cambios_stock=config.get_stock_changes_retention_days(),
+                )
+                if _servicio.intervalo > timedelta(0):
+                    _servicio.iniciar()
+    return _servicio
+
+# === PÁGINA DE ADMINISTRACIÓN ===
+
+def _leer_historial(query, params=()):
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+def mostrar():
+    st.title("🩺 Salud de la Base de Datos")
+
+    if st.session_state.get('rol_usuario') != 'admin':
+        st.error("❌ No tiene permisos de administrador para acceder a este módulo")
+        return
+
+    # Las métricas salen de la última muestra guardada: medir recorre toda la base (dbstat y
+    # COUNT(*) por tabla), así que solo se hace con el botón o desde el servicio
+    historial_base = _leer_historial("SELECT * FROM historial_base ORDER BY fecha")
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        tamano_pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+
+    if historial_base.empty:
+        st.info("Aún no hay mediciones. El servicio toma una al día, o usa 'Medir ahora'.")
+    else:
+        base = historial_base.iloc[-1]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("💾 Tamaño", f"{bytes_a_mb(base['tamano_bytes'])} MB")
+        col2.metric("📄 Páginas", f"{int(base['paginas']):,}")
+        col3.metric("🕳️ Páginas libres", f"{int(base['paginas_libres']):,}")
+        col4.metric("🧩 Fragmentación", f"{base['fragmentacion']}%")
+
+    modo_vacuum = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(auto_vacuum, auto_vacuum)
+    st.caption((f"Medición del {historial_base['fecha'].iloc[-1]} · " if not historial_base.empty else "")
+               + f"auto_vacuum: {modo_vacuum} · journal_mode: {journal_mode} · página: {tamano_pagina} bytes")
+
+    servicio = get_servicio_mantenimiento()
+    if servicio.ultimo_error:
+        st.error(f"❌ Último error del servicio de mantenimiento: {servicio.ultimo_error}")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("📏 Medir ahora", width='stretch', help="Mide tablas e índices y guarda la muestra en el historial"):
+            with st.spinner("Midiendo la base de datos..."):
+                tomar_muestra(DB_PATH)
+            st.rerun()
+    with col2:
+        if st.button("🔧 Ejecutar mantenimiento ahora", width='stretch'):
+            with st.spinner("Ejecutando mantenimiento..."):
+                acciones = ejecutar_mantenimiento(DB_PATH, forzar_analyze=True)
+            st.success("✅ " + ", ".join(f"{accion} ({ms:.0f} ms)" for accion, ms, _ in acciones))
+    with col3:
+        if auto_vacuum != 2:
+            if st.button("♻️ Activar vacuum incremental", width='stretch',
+                         help="Hace un VACUUM completo una sola vez (con respaldo previo)"):
+                with st.spinner("Reorganizando la base de datos..."):
+                    respaldo = activar_vacuum_incremental(DB_PATH)
+                st.success(f"✅ auto_vacuum=INCREMENTAL activado. Respaldo previo: {respaldo['archivo']}")
+                st.rerun()
+
+    tab_objetos, tab_tendencias, tab_historial, tab_archivo = st.tabs(
+        ["📋 Tablas e índices", "📈 Tendencias", "🛠️ Mantenimientos", "🗄️ Archivo histórico"]
+    )
+
+    with tab_objetos:
+        vista = pd.DataFrame()
+        if not historial_base.empty:
+            vista = _leer_historial('''
+                SELECT objeto, tipo, tabla, filas, paginas, bytes, bytes_sin_uso
+                FROM historial_almacenamiento
+                WHERE fecha = ?
+                ORDER BY bytes DESC
+            ''', (historial_base['fecha'].iloc[-1],))
+        if vista.empty:
+            st.info("Aún no hay mediciones de tablas e índices; usa 'Medir ahora'.")
+        else:
+            vista['MB'] = vista['bytes'].apply(bytes_a_mb)
+            st.dataframe(
+                vista[['objeto', 'tipo', 'tabla', 'filas', 'paginas', 'MB', 'bytes_sin_uso']],
+                width='stretch', hide_index=True
+            )
+
+    with tab_tendencias:
+        if historial_base.empty:
+            st.info("Aún no hay muestras. El servicio toma una al día, o usa 'Medir ahora'.")
+        else:
+            historial_base['MB'] = historial_base['tamano_bytes'].apply(bytes_a_mb)
+            st.plotly_chart(px.line(historial_base, x='fecha', y='MB', markers=True,
+                                    title="Tamaño de la base (MB)"), width='stretch')
+            st.plotly_chart(px.line(historial_base, x='fecha', y='fragmentacion', markers=True,
+                                    title="Fragmentación (%)"), width='stretch')
+
+            historial_tablas = _leer_historial('''
+                SELECT fecha, objeto, filas, bytes FROM historial_almacenamiento
+                WHERE tipo = 'table' AND objeto NOT LIKE 'sqlite_%' AND objeto NOT LIKE 'historial_%'
+                ORDER BY fecha
+            ''')
+            if not historial_tablas.empty:
+                st.plotly_chart(px.line(historial_tablas, x='fecha', y='filas', color='objeto', markers=True,
+                                        title="Filas por tabla"), width='stretch')
+
+    with tab_historial:
+        historial = _leer_historial("SELECT fecha, accion, duracion_ms, resultado FROM historial_mantenimiento ORDER BY id DESC LIMIT 100")
+        if historial.empty:
+            st.info("Aún no se ha ejecutado ningún mantenimiento")
+        else:
+            st.dataframe(historial, width='stretch', hide_index=True)
+
+    with tab_archivo:
+        mostrar_archivo_historico()
+
+def mostrar_archivo_historico():
+    """Meses archivados en historico_AAAA.db y botón para archivar los meses cerrados"""
+    import config
+    from archivo_historico import archivar, calcular_corte
+
+    meses = config.get_archive_keep_months()
+    corte = calcular_corte(meses)
+    st.caption(f"Se conservan {meses} meses en la base viva: se archiva lo anterior a {corte}")
+
+    archivados = _leer_historial(
+        "SELECT fecha, tabla, anio, archivo, filas, desde, hasta FROM archivo_historico ORDER BY id DESC"
+    )
+    if archivados.empty:
+        st.info("Aún no se ha archivado nada")
+    else:
+        st.dataframe(archivados, width='stretch', hide_index=True)
+
+    # Buscar los meses pendientes recorre ventas, créditos y turnos: solo a petición
+    if st.button("🔎 Revisar meses por archivar", width='stretch'):
+        with st.spinner("Revisando..."):
+            st.session_state['archivo_pendientes'] = (meses, archivar(DB_PATH, meses, dry_run=True))
+    revision = st.session_state.get('archivo_pendientes')
+    if revision is None or revision[0] != meses:
+        return
+    pendientes = revision[1]
+    if not pendientes:
+        st.success("✅ No hay meses cerrados por archivar")
+        return
+
+    st.dataframe(pd.DataFrame(pendientes)[['tabla', 'anio', 'filas', 'desde', 'hasta']],
+                 width='stretch', hide_index=True)
+    if st.button(f"🗄️ Archivar {sum(p['filas'] for p in pendientes)} filas", width='stretch'):
+        with st.spinner("Archivando..."):
+            resultados = archivar(DB_PATH, meses)
+        st.session_state.pop('archivo_pendientes', None)
+        st.success(f"✅ {sum(r['filas'] for r in resultados)} filas movidas a los históricos")
+        st.rerun()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Salud y mantenimiento de la base de datos")
+    parser.add_argument('comando', nargs='?', default='estado',
+                        choices=['estado', 'muestra', 'mantenimiento', 'activar-incremental'])
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    args = parser.parse_args(argv)
+
+    if args.comando == 'estado':
+        conn = sqlite3.connect(args.db)
+        try:
+            base = medir_base(conn)
+            print(f"💾 {bytes_a_mb(base['tamano_bytes'])} MB · {base['paginas']:,} páginas · "
+                  f"{base['paginas_libres']:,} libres · fragmentación {base['fragmentacion']}%")
+            print(medir_objetos(conn).to_string(index=False))
+        finally:
+            conn.close()
+    elif args.comando == 'muestra':
+        base, _ = tomar_muestra(args.db)
+        print(f"📸 Muestra guardada ({bytes_a_mb(base['tamano_bytes'])} MB)")
+    elif args.comando == 'mantenimiento':
+        for accion, ms, resultado in ejecutar_mantenimiento(args.db, forzar_analyze=True):
+            print(f"🔧 {accion}: {resultado} ({ms:.0f} ms)")
+    elif args.comando == 'activar-incremental':
+        respaldo = activar_vacuum_incremental(args.db)
+        if respaldo:
+            print(f"✅ auto_vacuum=INCREMENTAL activado (respaldo: {respaldo['archivo']})")
+        else:
+            print("✅ auto_vacuum=INCREMENTAL ya estaba activo")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,615 @@
+"""
+Migraciones del esquema de la base de datos
+Registro único y ordenado de todos los cambios de esquema (CREATE TABLE, columnas nuevas,
+reconstrucciones de tablas, índices y triggers). La versión aplicada se guarda en
+`PRAGMA user_version` y cada migración corre en su propia transacción junto con el
+cambio de versión, así que interrumpir el proceso nunca deja una migración a medias.
+
+Se ejecuta al desplegar (Dockerfile / docker-compose) antes de levantar Streamlit:
+
+    python migraciones.py              # aplicar pendientes
+    python migraciones.py --dry-run    # ejecutar y deshacer, mostrando tiempos
+    python migraciones.py --estado     # versión actual y migraciones pendientes
+
+En la app, `asegurar_esquema()` solo lee `user_version` una vez por proceso; si la base
+quedó atrasada (ej. Streamlit Cloud, sin paso de despliegue) aplica lo pendiente.
+También deja la base en modo WAL para que varias terminales lean mientras otra cobra.
+
+Para cambiar el esquema: agregar una función al final de MIGRACIONES con el siguiente
+número. Nunca editar una migración ya publicada.
+"""
+import argparse
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+DB_PATH = "pos_cremeria.db"
+
+def _agregar_columnas(cursor, tabla, columnas):
+    """Agregar las columnas que falten en `tabla` (una sola introspección)"""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    existentes = {columna[1] for columna in cursor.fetchall()}
+    for nombre, definicion in columnas:
+        if nombre not in existentes:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {definicion}")
+
+def definicion_difiere(cursor, tabla, crear_sql):
+    """True si las columnas de `tabla` (orden, tipo, NOT NULL, default, PK) no coinciden con `crear_sql`"""
+    referencia = sqlite3.connect(":memory:")
+    try:
+        referencia.execute(crear_sql.format(tabla=tabla))
+        esperada = referencia.execute(f"PRAGMA table_info({tabla})").fetchall()
+    finally:
+        referencia.close()
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    return cursor.fetchall() != esperada
+
+def reconstruir_tabla(cursor, tabla, crear_sql):
+    """Reconstruir `tabla` con la definición `crear_sql` conservando datos, índices y triggers
+
+    Es el procedimiento de SQLite para lo que ALTER TABLE no soporta (tipos, defaults,
+    restricciones, orden de columnas): crear la tabla nueva, copiar, borrar la vieja y
+    renombrar. `crear_sql` usa `{tabla}` como nombre. Debe correr dentro de una transacción.
+    """
+    temporal = f"{tabla}_reconstruida"
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    anteriores = [columna[1] for columna in cursor.fetchall()]
+
+    cursor.execute(f"DROP TABLE IF EXISTS {temporal}")
+    cursor.execute(crear_sql.format(tabla=temporal))
+    cursor.execute(f"PRAGMA table_info({temporal})")
+    nuevas = [columna[1] for columna in cursor.fetchall()]
+
+    perdidas = [columna for columna in anteriores if columna not in nuevas]
+    if perdidas:
+        raise ValueError(f"Reconstruir {tabla} perdería las columnas: {', '.join(perdidas)}")
+
+    # Índices y triggers se borran con la tabla: guardarlos para recrearlos
+    cursor.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (tabla,))
+    objetos = [fila[0] for fila in cursor.fetchall()]
+
+    columnas = ", ".join(columna for columna in nuevas if columna in anteriores)
+    cursor.execute(f"INSERT INTO {temporal} ({columnas}) SELECT {columnas} FROM {tabla}")
+    copiadas = cursor.rowcount
+
+    # legacy_alter_table evita que RENAME revalide triggers de otras tablas a mitad del cambio
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        cursor.execute(f"DROP TABLE {tabla}")
+        cursor.execute(f"ALTER TABLE {temporal} RENAME TO {tabla}")
+    finally:
+        cursor.execute("PRAGMA legacy_alter_table = OFF")
+
+    for sql in objetos:
+        cursor.execute(sql)
+
+    cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
+    if cursor.fetchone()[0] != copiadas:
+        raise RuntimeError(f"La reconstrucción de {tabla} no copió todas las filas")
+
+# === MIGRACIONES ===
+
+# Definición canónica de productos. Varias partes del código leen `SELECT *` por
+# posición, así que el orden físico de las columnas debe ser exactamente este.
+SQL_PRODUCTOS = '''
+    CREATE TABLE IF NOT EXISTS {tabla} (
+        codigo TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        precio_compra REAL NOT NULL,
+        precio_normal REAL NOT NULL,
+        precio_mayoreo_1 REAL NOT NULL,
+        precio_mayoreo_2 REAL NOT NULL,
+        precio_mayoreo_3 REAL NOT NULL,
+        stock INTEGER NOT NULL,
+        tipo_venta TEXT DEFAULT 'unidad',
+        precio_por_kg REAL DEFAULT 0,
+        peso_unitario REAL DEFAULT 0,
+        stock_kg REAL DEFAULT 0,
+        stock_minimo INTEGER DEFAULT 10,
+        stock_minimo_kg REAL DEFAULT 0,
+        stock_maximo INTEGER DEFAULT 30,
+        stock_maximo_kg REAL DEFAULT 0,
+        categoria TEXT DEFAULT 'cremeria'
+    )
+'''
+
+COLUMNAS_PRODUCTOS = (
+    'codigo', 'nombre', 'precio_compra', 'precio_normal',
+    'precio_mayoreo_1', 'precio_mayoreo_2', 'precio_mayoreo_3', 'stock',
+    'tipo_venta', 'precio_por_kg', 'peso_unitario', 'stock_kg',
+    'stock_minimo', 'stock_minimo_kg', 'stock_maximo', 'stock_maximo_kg', 'categoria',
+)
+
+def _esquema_productos(cursor):
+    cursor.execute(SQL_PRODUCTOS.format(tabla='productos'))
+
+    # Renombrar precio_mayoreo a precio_mayoreo_1 si existe el campo antiguo
+    cursor.execute("PRAGMA table_info(productos)")
+    columnas = {columna[1] for columna in cursor.fetchall()}
+    if 'precio_mayoreo' in columnas and 'precio_mayoreo_1' not in columnas:
+        cursor.execute("ALTER TABLE productos RENAME COLUMN precio_mayoreo TO precio_mayoreo_1")
+
+    _agregar_columnas(cursor, 'productos', [
+        ('precio_compra', "REAL DEFAULT 0"),
+        ('precio_mayoreo_2', "REAL DEFAULT 0"),
+        ('precio_mayoreo_3', "REAL DEFAULT 0"),
+        ('tipo_venta', "TEXT DEFAULT 'unidad'"),
+        ('precio_por_kg', "REAL DEFAULT 0"),
+        ('peso_unitario', "REAL DEFAULT 0"),
+        ('stock_kg', "REAL DEFAULT 0"),
+        ('stock_minimo', "INTEGER DEFAULT 10"),
+        ('stock_minimo_kg', "REAL DEFAULT 0"),
+        ('stock_maximo', "INTEGER DEFAULT 30"),
+        ('stock_maximo_kg', "REAL DEFAULT 0"),
+        ('categoria', "TEXT DEFAULT 'cremeria'"),
+    ])
+
+def _esquema_ventas(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ventas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT,
+            codigo TEXT,
+            nombre TEXT,
+            cantidad INTEGER,
+            precio_unitario REAL,
+            total REAL,
+            tipo_cliente TEXT,
+            tipos_pago TEXT,
+            monto_efectivo REAL DEFAULT 0,
+            monto_tarjeta REAL DEFAULT 0,
+            monto_transferencia REAL DEFAULT 0,
+            monto_credito REAL DEFAULT 0,
+            fecha_vencimiento_credito TEXT,
+            hora_vencimiento_credito TEXT DEFAULT '15:00',
+            cliente_credito TEXT,
+            pagado INTEGER DEFAULT 1,
+            alerta_mostrada INTEGER DEFAULT 0,
+            peso_vendido REAL DEFAULT 0,
+            tipo_venta TEXT DEFAULT 'unidad'
+        )
+    ''')
+    _agregar_columnas(cursor, 'ventas', [
+        ('tipos_pago', "TEXT DEFAULT 'Efectivo'"),
+        ('monto_efectivo', "REAL DEFAULT 0"),
+        ('monto_tarjeta', "REAL DEFAULT 0"),
+        ('monto_transferencia', "REAL DEFAULT 0"),
+        ('monto_credito', "REAL DEFAULT 0"),
+        ('fecha_vencimiento_credito', "TEXT"),
+        ('hora_vencimiento_credito', "TEXT DEFAULT '15:00'"),
+        ('cliente_credito', "TEXT"),
+        ('pagado', "INTEGER DEFAULT 1"),
+        ('alerta_mostrada', "INTEGER DEFAULT 0"),
+        ('peso_vendido', "REAL DEFAULT 0"),
+        ('tipo_venta', "TEXT DEFAULT 'unidad'"),
+    ])
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS creditos_pendientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente TEXT NOT NULL,
+            monto REAL NOT NULL,
+            fecha_venta TEXT NOT NULL,
+            fecha_vencimiento TEXT NOT NULL,
+            hora_vencimiento TEXT DEFAULT '15:00',
+            venta_id INTEGER,
+            pagado INTEGER DEFAULT 0,
+            alerta_mostrada INTEGER DEFAULT 0,
+            FOREIGN KEY (venta_id) REFERENCES ventas (id)
+        )
+    ''')
+    _agregar_columnas(cursor, 'creditos_pendientes', [
+        ('hora_vencimiento', "TEXT DEFAULT '15:00'"),
+        ('alerta_mostrada', "INTEGER DEFAULT 0"),
+    ])
+
+def _esquema_turnos(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS turnos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            empleado TEXT NOT NULL,
+            turno INTEGER NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+    ''')
+
+def _esquema_finanzas(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS egresos_adicionales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            tipo TEXT NOT NULL,
+            descripcion TEXT NOT NULL,
+            monto REAL NOT NULL,
+            observaciones TEXT,
+            usuario TEXT DEFAULT 'Sistema'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingresos_pasivos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            descripcion TEXT NOT NULL,
+            monto REAL NOT NULL,
+            observaciones TEXT,
+            usuario TEXT DEFAULT 'Sistema'
+        )
+    ''')
+
+def _esquema_pedidos(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pedidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha_pedido TEXT NOT NULL,
+            fecha_entrega_esperada TEXT,
+            estado TEXT DEFAULT 'PENDIENTE',
+            total_productos INTEGER DEFAULT 0,
+            total_costo REAL DEFAULT 0,
+            notas TEXT DEFAULT '',
+            creado_por TEXT NOT NULL,
+            fecha_creacion TEXT DEFAULT CURRENT_TIMESTAMP,
+            orden_compra_id INTEGER
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pedidos_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pedido_id INTEGER NOT NULL,
+            codigo_producto TEXT NOT NULL,
+            nombre_producto TEXT NOT NULL,
+            cantidad_solicitada REAL NOT NULL,
+            cantidad_recibida REAL DEFAULT 0,
+            precio_unitario REAL NOT NULL,
+            subtotal REAL NOT NULL,
+            proveedor TEXT DEFAULT '',
+            estado_item TEXT DEFAULT 'PENDIENTE',
+            FOREIGN KEY(pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE,
+            FOREIGN KEY(codigo_producto) REFERENCES productos(codigo)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ordenes_compra (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pedido_id INTEGER NOT NULL,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_orden REAL NOT NULL,
+            estado TEXT DEFAULT 'PENDIENTE',
+            fecha_pago TEXT,
+            notas TEXT,
+            creado_por TEXT DEFAULT 'admin',
+            FOREIGN KEY(pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
+        )
+    ''')
+    _agregar_columnas(cursor, 'ordenes_compra', [('pedido_id', "INTEGER")])
+
+def _esquema_usuarios(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usuarios_admin (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            usuario TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            nombre_completo TEXT NOT NULL,
+            rol TEXT DEFAULT 'usuario',
+            activo INTEGER DEFAULT 1,
+            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ultimo_acceso TIMESTAMP,
+            creado_por TEXT DEFAULT 'Sistema'
+        )
+    ''')
+
+    cursor.execute("PRAGMA table_info(usuarios_admin)")
+    faltaba_nombre = 'nombre_completo' not in {columna[1] for columna in cursor.fetchall()}
+    _agregar_columnas(cursor, 'usuarios_admin', [
+        ('nombre_completo', "TEXT DEFAULT 'Usuario'"),
+        ('rol', "TEXT DEFAULT 'usuario'"),
+        ('activo', "INTEGER DEFAULT 1"),
+        ('fecha_creacion', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ('ultimo_acceso', "TIMESTAMP"),
+        ('creado_por', "TEXT DEFAULT 'Sistema'"),
+    ])
+    if faltaba_nombre:
+        cursor.execute("UPDATE usuarios_admin SET nombre_completo = 'Administrador Principal' WHERE usuario = 'admin' AND nombre_completo = 'Usuario'")
+
+    # Usuario admin por defecto (mismo hash que usuarios.hash_password)
+    cursor.execute("SELECT COUNT(*) FROM usuarios_admin WHERE usuario = 'admin'")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute('''
+            INSERT INTO usuarios_admin (usuario, password, nombre_completo, rol, creado_por)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ('admin', hashlib.sha256('admin123'.encode()).hexdigest(), 'Administrador Principal', 'admin', 'Sistema'))
+    else:
+        cursor.execute("UPDATE usuarios_admin SET rol = 'admin' WHERE usuario = 'admin'")
+
+def _esquema_kardex(cursor):
+    from kardex import crear_tabla_movimientos
+    crear_tabla_movimientos(cursor.connection, commit=False)
+
+def _esquema_sesiones(cursor):
+    from session_store import crear_tabla_sesiones
+    crear_tabla_sesiones(cursor.connection, commit=False)
+
+def _esquema_control_versiones(cursor):
+    from cache_manager import instalar_control_versiones
+    instalar_control_versiones(cursor.connection, commit=False)
+
+def _reconstruir_productos(cursor):
+    # Bases creadas con versiones viejas tienen las columnas en otro orden (agregadas con
+    # ALTER) y otros defaults/restricciones, que ALTER TABLE no puede cambiar
+    if definicion_difiere(cursor, 'productos', SQL_PRODUCTOS):
+        reconstruir_tabla(cursor, 'productos', SQL_PRODUCTOS)
+
+def _eliminar_esquema_version(cursor):
+    cursor.execute("DROP TABLE IF EXISTS esquema_version")
+
+def _esquema_mantenimiento(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_almacenamiento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            objeto TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            tabla TEXT,
+            filas INTEGER,
+            paginas INTEGER,
+            bytes INTEGER,
+            bytes_sin_uso INTEGER
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_historial_almacenamiento ON historial_almacenamiento (objeto, fecha)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_base (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            tamano_bytes INTEGER,
+            paginas INTEGER,
+            paginas_libres INTEGER,
+            fragmentacion REAL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_mantenimiento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            accion TEXT NOT NULL,
+            duracion_ms REAL,
+            resultado TEXT
+        )
+    ''')
+
+def _esquema_archivo_historico(cursor):
+    # Una fila por tabla/año archivado; MAX(corte) es la frontera con la base viva
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archivo_historico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL,
+            tabla TEXT NOT NULL,
+            anio INTEGER NOT NULL,
+            archivo TEXT NOT NULL,
+            corte TEXT NOT NULL,
+            filas INTEGER NOT NULL,
+            desde TEXT,
+            hasta TEXT
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archivo_historico_tabla ON archivo_historico (tabla, corte)")
+
+def _esquema_sync_estado(cursor):
+    # Una fila por tabla que el programador descarga de Supabase
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sync_estado (
+            tabla TEXT PRIMARY KEY,
+            ultimo_intento TEXT,
+            ultimo_exito TEXT,
+            filas INTEGER DEFAULT 0,
+            fallidas INTEGER DEFAULT 0,
+            error TEXT,
+            duracion_ms REAL
+        )
+    ''')
+
+def _indices_pedidos(cursor):
+    # El listado de pedidos une cada página de pedidos con sus items en una sola consulta
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pedidos_items_pedido ON pedidos_items (pedido_id)")
+
+def _esquema_pronostico(cursor):
+    # Parámetros de demanda por producto; lo recalcula pronostico_demanda.py una vez al día
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS pronostico_demanda (
+            codigo TEXT PRIMARY KEY,
+            demanda_diaria REAL NOT NULL DEFAULT 0,
+            desviacion_diaria REAL NOT NULL DEFAULT 0,
+            dias_con_venta INTEGER NOT NULL DEFAULT 0,
+            factor_0 REAL NOT NULL DEFAULT 1,
+            factor_1 REAL NOT NULL DEFAULT 1,
+            factor_2 REAL NOT NULL DEFAULT 1,
+            factor_3 REAL NOT NULL DEFAULT 1,
+            factor_4 REAL NOT NULL DEFAULT 1,
+            factor_5 REAL NOT NULL DEFAULT 1,
+            factor_6 REAL NOT NULL DEFAULT 1,
+            calculado TEXT
+        )
+    ''')
+    # Las sugerencias de pedido en caché dependen del pronóstico
+    from cache_manager import instalar_control_versiones
+    instalar_control_versiones(cursor.connection, ['pronostico_demanda'], commit=False)
+
+# (versión, descripción, función) en orden de ejecución
+MIGRACIONES = [
+    (1, "Tabla productos y columnas de granel, stock mínimo/máximo y mayoreo", _esquema_productos),
+    (2, "Tablas ventas y creditos_pendientes", _esquema_ventas),
+    (3, "Tabla turnos", _esquema_turnos),
+    (4, "Tablas egresos_adicionales e ingresos_pasivos", _esquema_finanzas),
+    (5, "Tablas pedidos, pedidos_items y ordenes_compra", _esquema_pedidos),
+    (6, "Tabla usuarios_admin y usuario admin por defecto", _esquema_usuarios),
+    (7, "Kardex (movimientos_inventario) y saldos iniciales", _esquema_kardex),
+    (8, "Tabla sesiones", _esquema_sesiones),
+    (9, "Triggers de versión de tablas para la caché de consultas", _esquema_control_versiones),
+    (10, "Reconstruir productos con el orden de columnas y defaults canónicos", _reconstruir_productos),
+    (11, "Eliminar esquema_version (reemplazada por PRAGMA user_version)", _eliminar_esquema_version),
+    (12, "Historial de almacenamiento y mantenimiento de la base", _esquema_mantenimiento),
+    (13, "Registro de meses archivados en historico_AAAA.db", _esquema_archivo_historico),
+    (14, "Estado de la sincronización programada desde Supabase", _esquema_sync_estado),
+    (15, "Índice de pedidos_items por pedido", _indices_pedidos),
+    (16, "Tabla pronostico_demanda para las cantidades sugeridas de pedido", _esquema_pronostico),
+]
+
+ULTIMA_VERSION = MIGRACIONES[-1][0]
+
+# === EJECUCIÓN ===
+
+def _conectar(db_path):
+    # Sin transacciones implícitas: cada migración abre la suya con BEGIN IMMEDIATE
+    return sqlite3.connect(db_path, timeout=30, isolation_level=None)
+
+def leer_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migraciones_pendientes(version_actual):
+    return [m for m in MIGRACIONES if m[0] > version_actual]
+
+def _registrar_historial(cursor, version, descripcion, duracion):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_migraciones (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            aplicada TEXT NOT NULL,
+            duracion_ms REAL
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO historial_migraciones (version, descripcion, aplicada, duracion_ms)
+        VALUES (?, ?, ?, ?)
+    ''', (version, descripcion, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round(duracion * 1000, 1)))
+
+def ejecutar_migraciones(db_path=DB_PATH, dry_run=False, hasta=None):
+    """Aplicar las migraciones pendientes en orden
+
+    Con `dry_run=True` cada migración se ejecuta y se deshace (ROLLBACK), para ver qué
+    haría y cuánto tardaría sin tocar la base.
+    Devuelve la lista de (versión, descripción, segundos) ejecutadas.
+    """
+    conn = _conectar(db_path)
+    ejecutadas = []
+    try:
+        for version, descripcion, funcion in migraciones_pendientes(leer_version(conn)):
+            if hasta is not None and version > hasta:
+                break
+
+            inicio = time.perf_counter()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # Otro proceso pudo aplicarla mientras esperábamos el bloqueo
+                if leer_version(conn) >= version:
+                    cursor.execute("ROLLBACK")
+                    continue
+
+                funcion(cursor)
+                duracion = time.perf_counter() - inicio
+                _registrar_historial(cursor, version, descripcion, duracion)
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+                cursor.execute("ROLLBACK" if dry_run else "COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                print(f"❌ Migración {version:03d} falló: {descripcion}")
+                raise
+
+            ejecutadas.append((version, descripcion, duracion))
+            print(f"🛠️ [{version:03d}] {descripcion} ({duracion:.3f}s{', simulada' if dry_run else ''})")
+    finally:
+        conn.close()
+    return ejecutadas
+
+def version_esquema(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        return leer_version(conn)
+    finally:
+        conn.close()
+
+def activar_wal(db_path=DB_PATH):
+    """Poner la base en modo WAL (persistente en el archivo)
+
+    Con WAL las lecturas de las demás terminales no esperan a quien está cobrando y
+    cada commit solo agrega al -wal; los respaldos usan la API de backup, que lo incluye.
+    Devuelve el journal_mode resultante.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        modo = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if modo != 'wal':
+            modo = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+        return modo
+    except sqlite3.OperationalError as e:
+        # Otra conexión tiene la base ocupada: se intenta de nuevo en el siguiente arranque
+        print(f"⚠️ No se pudo activar WAL: {e}")
+        return None
+    finally:
+        conn.close()
+
+_esquema_listo = set()
+_esquema_lock = threading.Lock()
+
+def asegurar_esquema(db_path=DB_PATH):
+    """Verificar una sola vez por proceso que la base esté al día
+
+    Normalmente solo lee `user_version`: las migraciones se aplican al desplegar.
+    """
+    if db_path in _esquema_listo:
+        return
+    with _esquema_lock:
+        if db_path in _esquema_listo:
+            return
+        version = version_esquema(db_path)
+        if version < ULTIMA_VERSION:
+            print(f"⚠️ Esquema en versión {version}, se esperaba {ULTIMA_VERSION}: aplicando migraciones pendientes")
+            ejecutar_migraciones(db_path)
+        elif version > ULTIMA_VERSION:
+            print(f"⚠️ La base está en la versión {version}, más nueva que el código ({ULTIMA_VERSION})")
+        activar_wal(db_path)
+        _esquema_listo.add(db_path)
+
+def olvidar_esquema(db_path=DB_PATH):
+    """Volver a verificar el esquema en el próximo asegurar_esquema() (ej. tras restaurar un respaldo)"""
+    with _esquema_lock:
+        _esquema_listo.discard(db_path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aplicar las migraciones del esquema")
+    parser.add_argument('--dry-run', action='store_true', help="Ejecutar y deshacer cada migración pendiente")
+    parser.add_argument('--estado', action='store_true', help="Mostrar versión actual y pendientes sin ejecutar nada")
+    parser.add_argument('--hasta', type=int, help="Aplicar solo hasta esta versión")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    args = parser.parse_args(argv)
+
+    version = version_esquema(args.db)
+    pendientes = migraciones_pendientes(version)
+
+    if args.estado:
+        print(f"Versión del esquema: {version} (última: {ULTIMA_VERSION})")
+        for numero, descripcion, _ in pendientes:
+            print(f"  pendiente [{numero:03d}] {descripcion}")
+        return 0 if not pendientes else 2
+
+    if not pendientes:
+        print(f"✅ Esquema al día (versión {version})")
+        return 0
+
+    inicio = time.perf_counter()
+    ejecutadas = ejecutar_migraciones(args.db, dry_run=args.dry_run, hasta=args.hasta)
+    total = time.perf_counter() - inicio
+    if args.dry_run:
+        print(f"🔎 {len(ejecutadas)} migración(es) simuladas en {total:.2f}s, sin cambios en la base")
+    else:
+        print(f"✅ {len(ejecutadas)} migración(es) aplicadas en {total:.2f}s (versión {version_esquema(args.db)})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,57 +1,250 @@
+"""
+Monitor de stock por eventos
+Un trigger en `productos` registra cada cambio de stock en `cambios_stock`, y otro
+trigger en el kardex vincula ese cambio con el movimiento que lo originó (venta,
+pedido, ajuste...). Si un cambio queda sin movimiento es una escritura directa que
+no pasó por el kardex: justo lo que hay que investigar cuando el stock "se mueve solo".
+
+El monitor solo consulta la base cuando `PRAGMA data_version` indica que otra conexión
+hizo commit, y entonces lee los cambios nuevos por id (clave primaria).
+
+Uso:
+    python monitor_stock.py 11111 20004010           # vigilar productos específicos
+    python monitor_stock.py --umbral 11111=5         # avisar si 11111 baja de 5
+    python monitor_stock.py --bajo-minimo            # todos los productos, avisar bajo mínimo
+    python monitor_stock.py --purgar 30              # borrar cambios de más de 30 días
+
+El servicio de mantenimiento (mantenimiento_db.py) purga solo `cambios_stock` en sus
+ventanas de inactividad, según stock_monitor.retention_days (30 días por defecto).
+"""
+import argparse
 import sqlite3
+import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from kardex import crear_tabla_movimientos
+
+DB_PATH = "pos_cremeria.db"
+
+def instalar_registro_cambios(conn):
+    """Crear la tabla `cambios_stock` y los triggers que la alimentan"""
+    crear_tabla_movimientos(conn)
 
-def monitor_yogurt():
-    """Monitorear cambios en el stock del Yogurt 11111"""
-    conn = sqlite3.connect('pos_cremeria.db')
     cursor = conn.cursor()
-    
-    print("="*60)
-    print("MONITOREANDO YOGURT 11111 - Presiona Ctrl+C para detener")
-    print("="*60)
-    
-    # Obtener estado inicial
-    cursor.execute("SELECT stock, stock_kg FROM productos WHERE codigo = '11111'")
-    resultado = cursor.fetchone()
-    stock_anterior = resultado[0] if resultado else None
-    
-    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Stock inicial: {stock_anterior} unidades")
-    
-    try:
-        while True:
-            time.sleep(2)  # Verificar cada 2 segundos
-            
-            cursor.execute("SELECT stock, stock_kg FROM productos WHERE codigo = '11111'")
-            resultado = cursor.fetchone()
-            
-            if resultado:
-                stock_actual = resultado[0]
-                
-                if stock_actual != stock_anterior:
-                    print(f"\n🔔 [{datetime.now().strftime('%H:%M:%S')}] ¡CAMBIO DETECTADO!")
-                    print(f"   Stock anterior: {stock_anterior} unidades")
-                    print(f"   Stock actual: {stock_actual} unidades")
-                    print(f"   Diferencia: {stock_actual - stock_anterior}")
-                    
-                    # Verificar última venta
-                    cursor.execute("""
-                        SELECT fecha, cantidad, total 
-                        FROM ventas 
-                        WHERE codigo = '11111' 
-                        ORDER BY fecha DESC 
-                        LIMIT 1
-                    """)
-                    ultima_venta = cursor.fetchone()
-                    if ultima_venta:
-                        print(f"   Última venta: {ultima_venta[0]} - {ultima_venta[1]} unidades")
-                    
-                    stock_anterior = stock_actual
-    
-    except KeyboardInterrupt:
-        print("\n\n✅ Monitoreo detenido")
-    finally:
-        conn.close()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cambios_stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+            codigo TEXT NOT NULL,
+            stock_anterior REAL,
+            stock_nuevo REAL,
+            stock_kg_anterior REAL,
+            stock_kg_nuevo REAL,
+            movimiento_id INTEGER
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_cambios_stock
+        AFTER UPDATE OF stock, stock_kg ON productos
+        WHEN OLD.stock IS NOT NEW.stock OR OLD.stock_kg IS NOT NEW.stock_kg
+        BEGIN
+            INSERT INTO cambios_stock (codigo, stock_anterior, stock_nuevo, stock_kg_anterior, stock_kg_nuevo)
+            VALUES (NEW.codigo, OLD.stock, NEW.stock, OLD.stock_kg, NEW.stock_kg);
+        END
+    ''')
+
+    # Cada movimiento se vincula con el último cambio pendiente de su mismo producto:
+    # registrar_movimiento inserta el movimiento justo después de su UPDATE, y
+    # registrar_recepcion_pedido actualiza varios productos en un solo UPDATE antes de
+    # insertar todos sus movimientos, así que no basta con el último cambio de la tabla
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cambios_stock_pendientes
+        ON cambios_stock (codigo, id) WHERE movimiento_id IS NULL
+    ''')
+    # Se recrea para reemplazar la versión anterior que solo miraba MAX(id) de toda la tabla
+    cursor.execute("DROP TRIGGER IF EXISTS trg_cambios_stock_movimiento")
+    cursor.execute('''
+        CREATE TRIGGER trg_cambios_stock_movimiento
+        AFTER INSERT ON movimientos_inventario
+        WHEN NEW.referencia_tipo IS NOT 'inicio_kardex'
+        BEGIN
+            UPDATE cambios_stock SET movimiento_id = NEW.id
+            WHERE id = (SELECT MAX(id) FROM cambios_stock
+                        WHERE codigo = NEW.codigo AND movimiento_id IS NULL);
+        END
+    ''')
+    conn.commit()
+
+def purgar_cambios(conn, dias):
+    """Borrar los cambios registrados hace más de `dias` días"""
+    limite = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d %H:%M:%S")
+    cursor = conn.execute("DELETE FROM cambios_stock WHERE fecha < ?", (limite,))
+    conn.commit()
+    return cursor.rowcount
+
+
+class MonitorStock:
+    """Lee incrementalmente `cambios_stock` y reporta los cambios que interesan"""
+
+    def __init__(self, db_path=DB_PATH, codigos=None, umbrales=None, bajo_minimo=False,
+                 intervalo=0.5, desde_inicio=False):
+        self.db_path = db_path
+        self.codigos = set(codigos or [])
+        self.umbrales = dict(umbrales or {})
+        self.bajo_minimo = bajo_minimo
+        self.intervalo = intervalo
+
+        self.conn = sqlite3.connect(db_path)
+        instalar_registro_cambios(self.conn)
+
+        self._data_version = None
+        if desde_inicio:
+            self.ultimo_id = 0
+        else:
+            self.ultimo_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM cambios_stock").fetchone()[0]
+
+    def _hay_commits_nuevos(self):
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        return True
+
+    def leer_cambios(self):
+        """Cambios nuevos (id > último leído) con su movimiento de origen"""
+        query = '''
+            SELECT c.id, c.fecha, c.codigo, p.nombre, p.tipo_venta,
+                   c.stock_anterior, c.stock_nuevo, c.stock_kg_anterior, c.stock_kg_nuevo,
+                   p.stock_minimo, p.stock_minimo_kg,
+                   m.id AS movimiento_id, m.tipo_movimiento, m.referencia_tipo, m.referencia_id,
+                   m.usuario, m.notas
+            FROM cambios_stock c
+            LEFT JOIN productos p ON p.codigo = c.codigo
+            LEFT JOIN movimientos_inventario m ON m.id = c.movimiento_id
+            WHERE c.id > ? AND c.id <= ?
+        '''
+        # Fijar el tope antes de leer para no saltarse cambios que lleguen mientras tanto
+        hasta_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM cambios_stock").fetchone()[0]
+        params = [self.ultimo_id, hasta_id]
+        codigos = self.codigos | set(self.umbrales)
+        if codigos and not self.bajo_minimo:
+            query += f" AND c.codigo IN ({', '.join('?' for _ in codigos)})"
+            params.extend(codigos)
+        query += " ORDER BY c.id"
+
+        self.conn.row_factory = sqlite3.Row
+        try:
+            filas = [dict(fila) for fila in self.conn.execute(query, params).fetchall()]
+        finally:
+            self.conn.row_factory = None
+
+        # Avanzar aunque ningún cambio pase el filtro
+        self.ultimo_id = max(self.ultimo_id, hasta_id)
+
+        cambios = []
+        for fila in filas:
+            fila['alerta'] = self._evaluar_alerta(fila)
+            vigilado = fila['codigo'] in codigos if codigos else not self.bajo_minimo
+            if vigilado or (self.bajo_minimo and fila['alerta']):
+                cambios.append(fila)
+        return cambios
+
+    def _evaluar_alerta(self, cambio):
+        es_granel = cambio['tipo_venta'] == 'granel'
+        stock = (cambio['stock_kg_nuevo'] if es_granel else cambio['stock_nuevo']) or 0
+
+        umbral = self.umbrales.get(cambio['codigo'])
+        if umbral is not None and stock <= umbral:
+            return f"stock {stock:g} ≤ umbral {umbral:g}"
+
+        if self.bajo_minimo:
+            minimo = (cambio['stock_minimo_kg'] if es_granel else cambio['stock_minimo']) or 0
+            if minimo > 0 and stock <= minimo:
+                return f"stock {stock:g} ≤ mínimo {minimo:g}"
+        return None
+
+    def ejecutar(self, al_cambiar=None):
+        """Esperar cambios hasta Ctrl+C, llamando `al_cambiar(cambio)` por cada uno"""
+        al_cambiar = al_cambiar or imprimir_cambio
+        self._hay_commits_nuevos()
+        try:
+            while True:
+                time.sleep(self.intervalo)
+                if not self._hay_commits_nuevos():
+                    continue
+                for cambio in self.leer_cambios():
+                    al_cambiar(cambio)
+        except KeyboardInterrupt:
+            print("\n\n✅ Monitoreo detenido")
+        finally:
+            self.conn.close()
+
+
+def imprimir_cambio(cambio):
+    """Formato de consola para un cambio de stock"""
+    if cambio['tipo_venta'] == 'granel':
+        anterior, nuevo, unidad = cambio['stock_kg_anterior'] or 0, cambio['stock_kg_nuevo'] or 0, "kg"
+    else:
+        anterior, nuevo, unidad = cambio['stock_anterior'] or 0, cambio['stock_nuevo'] or 0, "unidades"
+
+    print(f"\n🔔 [{cambio['fecha']}] {cambio['codigo']} - {cambio['nombre'] or '(producto eliminado)'}")
+    print(f"   Stock: {anterior:g} → {nuevo:g} {unidad} (diferencia: {nuevo - anterior:+g})")
+
+    if cambio['movimiento_id']:
+        referencia = f" {cambio['referencia_tipo']} #{cambio['referencia_id']}" if cambio['referencia_tipo'] else ""
+        print(f"   Origen: {cambio['tipo_movimiento']}{referencia} (movimiento #{cambio['movimiento_id']})"
+              f"{' por ' + cambio['usuario'] if cambio['usuario'] else ''}")
+        if cambio['notas']:
+            print(f"   Notas: {cambio['notas']}")
+    else:
+        print("   ⚠️ Escritura directa: no hay movimiento en el kardex para este cambio")
+
+    if cambio['alerta']:
+        print(f"   🚨 {cambio['alerta']}")
+
+def _parsear_umbral(texto):
+    codigo, _, valor = texto.partition('=')
+    if not codigo or not valor:
+        raise argparse.ArgumentTypeError("El umbral debe tener formato CODIGO=VALOR")
+    return codigo, float(valor)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monitorear cambios de stock en tiempo real")
+    parser.add_argument('codigos', nargs='*', help="Códigos a vigilar (vacío = todos)")
+    parser.add_argument('--umbral', action='append', type=_parsear_umbral, default=[],
+                        help="Avisar cuando CODIGO baje de VALOR (ej. 11111=5)")
+    parser.add_argument('--bajo-minimo', action='store_true', help="Avisar cuando un producto quede bajo su stock mínimo")
+    parser.add_argument('--intervalo', type=float, default=0.5, help="Segundos entre revisiones de data_version")
+    parser.add_argument('--desde-inicio', action='store_true', help="Mostrar también los cambios ya registrados")
+    parser.add_argument('--purgar', type=int, metavar='DIAS', help="Borrar cambios de más de DIAS días y salir")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    args = parser.parse_args(argv)
+
+    if args.purgar is not None:
+        conn = sqlite3.connect(args.db)
+        try:
+            instalar_registro_cambios(conn)
+            print(f"🗑️ {purgar_cambios(conn, args.purgar)} cambios eliminados")
+        finally:
+            conn.close()
+        return 0
+
+    monitor = MonitorStock(args.db, args.codigos, dict(args.umbral), args.bajo_minimo,
+                           args.intervalo, args.desde_inicio)
+
+    vigilados = ', '.join(sorted(set(args.codigos) | {c for c, _ in args.umbral})) or "todos los productos"
+    print("=" * 60)
+    print(f"MONITOREANDO {vigilados} - Presiona Ctrl+C para detener")
+    print("=" * 60)
+
+    if args.desde_inicio:
+        for cambio in monitor.leer_cambios():
+            imprimir_cambio(cambio)
+
+    monitor.ejecutar()
+    return 0
 
 if __name__ == "__main__":
-    monitor_yogurt()
+    sys.exit(main())
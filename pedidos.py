@@ -37,6 +37,7 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 import time
+import math
 import hashlib
 import unicodedata
 import re
@@ -45,6 +46,10 @@ import re
 from db_adapter import get_db_adapter
 import config
 from sync_manager import get_sync_manager
+from programador_sync import mostrar_estado_sync
+from cache_manager import cache_consulta
+from kardex import registrar_recepcion_pedido
+from pronostico_demanda import sugerir_cantidades
 from auth_manager import verificar_sesion_admin, cerrar_sesion_admin, obtener_tiempo_restante, mostrar_formulario_login
 
 DB_PATH = "pos_cremeria.db"
@@ -110,70 +115,6 @@ def verificar_credenciales(usuario, password):
 
 # === GESTIÓN DE PEDIDOS Y CHECKLIST ===
 
-def crear_tabla_pedidos():
-    """Crear tabla de pedidos/checklist si no existe"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Crear tabla de pedidos (cabecera)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pedidos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            fecha_pedido TEXT NOT NULL,
-            fecha_entrega_esperada TEXT,
-            estado TEXT DEFAULT 'PENDIENTE',
-            total_productos INTEGER DEFAULT 0,
-            total_costo REAL DEFAULT 0,
-            notas TEXT DEFAULT '',
-            creado_por TEXT NOT NULL,
-            fecha_creacion TEXT DEFAULT CURRENT_TIMESTAMP,
-            orden_compra_id INTEGER
-        )
-    ''')
-    
-    # Crear tabla de items de pedido (detalle)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pedidos_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pedido_id INTEGER NOT NULL,
-            codigo_producto TEXT NOT NULL,
-            nombre_producto TEXT NOT NULL,
-            cantidad_solicitada REAL NOT NULL,
-            cantidad_recibida REAL DEFAULT 0,
-            precio_unitario REAL NOT NULL,
-            subtotal REAL NOT NULL,
-            proveedor TEXT DEFAULT '',
-            estado_item TEXT DEFAULT 'PENDIENTE',
-            FOREIGN KEY(pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE,
-            FOREIGN KEY(codigo_producto) REFERENCES productos(codigo)
-        )
-    ''')
-    
-    # Crear tabla de órdenes de compra
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS ordenes_compra (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pedido_id INTEGER NOT NULL,
-            fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            total_orden REAL NOT NULL,
-            estado TEXT DEFAULT 'PENDIENTE',
-            fecha_pago TEXT,
-            notas TEXT,
-            creado_por TEXT DEFAULT 'admin',
-            FOREIGN KEY(pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Agregar columna pedido_id si no existe (migración)
-    try:
-        cursor.execute("SELECT pedido_id FROM ordenes_compra LIMIT 1")
-    except sqlite3.OperationalError:
-        cursor.execute("ALTER TABLE ordenes_compra ADD COLUMN pedido_id INTEGER")
-        conn.commit()
-    
-    conn.commit()
-    conn.close()
-
 def generar_orden_compra_desde_pedido(pedido_id):
     """Generar orden de compra para un pedido específico con estado RECIBIDO"""
     conn = sqlite3.connect(DB_PATH)
@@ -231,8 +172,13 @@ def generar_orden_compra_desde_pedido(pedido_id):
     finally:
         conn.close()
 
+@cache_consulta(tablas=['productos', 'pronostico_demanda'])
 def obtener_productos_bajo_stock():
-    """Obtener productos con stock bajo que necesitan reabastecimiento"""
+    """Obtener productos con stock bajo que necesitan reabastecimiento
+    
+    `cantidad_necesaria` sale del pronóstico de demanda (días de cobertura) cuando el producto
+    tiene ventas recientes; si no, se usa la fórmula fija hasta el stock máximo.
+    """
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = None  # Forzar reconexión limpia
     
@@ -273,7 +219,7 @@ def obtener_productos_bajo_stock():
     """
     
     try:
-        productos_bajo_stock = pd.read_sql_query(query, conn)
+        productos_bajo_stock = sugerir_cantidades(pd.read_sql_query(query, conn))
     except Exception as e:
         print(f"Error al obtener productos bajo stock: {e}")
         productos_bajo_stock = pd.DataFrame()
@@ -302,28 +248,18 @@ def crear_pedido_con_productos(productos_lista, fecha_entrega_esperada="", notas
         pedido_id = cursor.lastrowid
         
         # Insertar los items del pedido
-        for producto in productos_lista:
-            subtotal = producto['cantidad'] * producto['precio']
-            cursor.execute('''
-                INSERT INTO pedidos_items
-                (pedido_id, codigo_producto, nombre_producto, cantidad_solicitada, precio_unitario, subtotal, proveedor)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (pedido_id, producto['codigo'], producto['nombre'], producto['cantidad'], 
-                  producto['precio'], subtotal, producto['proveedor']))
+        cursor.executemany('''
+            INSERT INTO pedidos_items
+            (pedido_id, codigo_producto, nombre_producto, cantidad_solicitada, precio_unitario, subtotal, proveedor)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(pedido_id, producto['codigo'], producto['nombre'], producto['cantidad'],
+               producto['precio'], producto['cantidad'] * producto['precio'], producto['proveedor'])
+              for producto in productos_lista])
         
         conn.commit()
         
         # Sincronizar con Supabase
-        if sync.is_online():
-            conn_temp = sqlite3.connect(DB_PATH)
-            conn_temp.row_factory = sqlite3.Row
-            cursor_temp = conn_temp.cursor()
-            cursor_temp.execute("SELECT * FROM pedidos WHERE id = ?", (pedido_id,))
-            pedido = cursor_temp.fetchone()
-            conn_temp.close()
-            
-            if pedido:
-                sync.sync_pedido_to_supabase(dict(pedido))
+        sync.sync_pedidos_to_supabase([pedido_id])
         
         return pedido_id, True
         
@@ -333,6 +269,117 @@ def crear_pedido_con_productos(productos_lista, fecha_entrega_esperada="", notas
     finally:
         conn.close()
 
+@cache_consulta(tablas=['pedidos_items'])
+def obtener_ultimo_proveedor():
+    """Proveedor del pedido más reciente de cada producto (codigo_producto, proveedor)"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return pd.read_sql_query("""
+            SELECT codigo_producto, proveedor
+            FROM pedidos_items
+            WHERE id IN (
+                SELECT MAX(id) FROM pedidos_items
+                WHERE proveedor IS NOT NULL AND proveedor != ''
+                GROUP BY codigo_producto
+            )
+        """, conn)
+    finally:
+        conn.close()
+
+def preparar_pedido_sugerido(productos_bajo_stock):
+    """Tabla para el editor de pedidos: un renglón por producto con la cantidad sugerida
+    y el último proveedor al que se le pidió"""
+    granel = productos_bajo_stock['tipo_venta'] == 'granel'
+    sugerido = pd.DataFrame({
+        'incluir': True,
+        'codigo': productos_bajo_stock['codigo'],
+        'nombre': productos_bajo_stock['nombre'],
+        'categoria': productos_bajo_stock['categoria'].fillna(''),
+        'stock': productos_bajo_stock['stock_kg'].where(granel, productos_bajo_stock['stock']).astype(float),
+        'unidad': granel.map({True: 'kg', False: 'unid.'}),
+        'cantidad': productos_bajo_stock['cantidad_necesaria'].astype(float),
+        'precio': productos_bajo_stock['precio_compra'].fillna(0).astype(float),
+        'tipo_venta': productos_bajo_stock['tipo_venta'],
+    })
+    proveedores = obtener_ultimo_proveedor().rename(columns={'codigo_producto': 'codigo'})
+    sugerido = sugerido.merge(proveedores, on='codigo', how='left')
+    sugerido['proveedor'] = sugerido['proveedor'].fillna('')
+    return sugerido.sort_values(['proveedor', 'categoria', 'nombre'], ignore_index=True)
+
+def resumen_por_proveedor(productos_df):
+    """Productos y costo por proveedor de una selección (columnas cantidad, precio, proveedor)"""
+    return (productos_df.assign(proveedor=productos_df['proveedor'].fillna('').str.strip(),
+                                subtotal=productos_df['cantidad'] * productos_df['precio'])
+                        .groupby('proveedor', sort=True)
+                        .agg(productos=('codigo', 'size'), total=('subtotal', 'sum'))
+                        .reset_index())
+
+def redondear_cantidades(productos_df):
+    """Cantidades de productos por unidad redondeadas hacia arriba a unidades completas
+    
+    La recepción suma al stock solo unidades enteras, así que un pedido de 2.5 unidades
+    costaría 2.5 pero entraría como 2. Los productos a granel conservan sus kg.
+    """
+    granel = productos_df['tipo_venta'] == 'granel'
+    cantidad = productos_df['cantidad'].fillna(0).astype(float)
+    return productos_df.assign(
+        cantidad=cantidad.where(granel, cantidad.round(3).apply(math.ceil)).astype(float)
+    )
+
+def crear_pedidos_por_proveedor(productos_df, fecha_entrega_esperada="", notas="", creado_por="admin"):
+    """Crear un pedido por proveedor con los productos de `productos_df` en una sola transacción
+    
+    `productos_df` necesita codigo, nombre, cantidad, precio, proveedor y tipo_venta. Devuelve
+    la lista de pedidos creados como dicts (id, proveedor, productos, total), o None si hubo un error.
+    """
+    productos_df = redondear_cantidades(productos_df)
+    productos_df = productos_df[productos_df['cantidad'] > 0].assign(
+        proveedor=productos_df['proveedor'].fillna('').str.strip()
+    )
+    if productos_df.empty:
+        return []
+    resumen = resumen_por_proveedor(productos_df)
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        fecha_pedido = datetime.now().strftime("%Y-%m-%d")
+        pedidos_creados = []
+        for fila in resumen.itertuples(index=False):
+            notas_pedido = f"Proveedor: {fila.proveedor or 'Sin proveedor'}" + (f" · {notas}" if notas else "")
+            cursor.execute('''
+                INSERT INTO pedidos 
+                (fecha_pedido, fecha_entrega_esperada, estado, total_productos, total_costo, notas, creado_por)
+                VALUES (?, ?, 'PENDIENTE', ?, ?, ?, ?)
+            ''', (fecha_pedido, fecha_entrega_esperada, int(fila.productos), float(fila.total), notas_pedido, creado_por))
+            pedidos_creados.append({'id': cursor.lastrowid, 'proveedor': fila.proveedor,
+                                    'productos': int(fila.productos), 'total': float(fila.total)})
+        
+        # Todos los items de todos los pedidos en un solo executemany
+        ids = {pedido['proveedor']: pedido['id'] for pedido in pedidos_creados}
+        items = productos_df.assign(pedido_id=productos_df['proveedor'].map(ids),
+                                    subtotal=productos_df['cantidad'] * productos_df['precio'])
+        cursor.executemany('''
+            INSERT INTO pedidos_items
+            (pedido_id, codigo_producto, nombre_producto, cantidad_solicitada, precio_unitario, subtotal, proveedor)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', items[['pedido_id', 'codigo', 'nombre', 'cantidad', 'precio', 'subtotal', 'proveedor']]
+              .astype({'pedido_id': int, 'cantidad': float, 'precio': float, 'subtotal': float})
+              .itertuples(index=False, name=None))
+        
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error al crear pedidos por proveedor: {e}")
+        return None
+    finally:
+        conn.close()
+    
+    # Sincronizar todos los pedidos nuevos en una sola petición
+    sync.sync_pedidos_to_supabase([pedido['id'] for pedido in pedidos_creados])
+    return pedidos_creados
+
 def agregar_producto_a_pedido(codigo_producto, nombre_producto, cantidad_solicitada, precio_unitario, proveedor="", fecha_entrega_esperada="", notas="", creado_por="admin"):
     """DEPRECADO: Usar crear_pedido_con_productos en su lugar"""
     # Mantener por compatibilidad, pero crear un pedido con un solo producto
@@ -347,6 +394,7 @@ def agregar_producto_a_pedido(codigo_producto, nombre_producto, cantidad_solicit
     pedido_id, exito = crear_pedido_con_productos(productos_lista, fecha_entrega_esperada, notas, creado_por)
     return exito
 
+@cache_consulta(tablas=['pedidos'])
 def obtener_pedidos_activos():
     """Obtener todos los pedidos activos"""
     conn = sqlite3.connect(DB_PATH)
@@ -366,6 +414,16 @@ def obtener_pedidos_activos():
     conn.close()
     return pedidos
 
+@cache_consulta(tablas=['pedidos'])
+def contar_pedidos():
+    """Total de pedidos registrados, sin filtros"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM pedidos").fetchone()[0]
+    finally:
+        conn.close()
+
+@cache_consulta(tablas=['pedidos_items'])
 def obtener_items_pedido(pedido_id):
     """Obtener los items/productos de un pedido específico"""
     conn = sqlite3.connect(DB_PATH)
@@ -381,6 +439,57 @@ def obtener_items_pedido(pedido_id):
     conn.close()
     return items
 
+POR_PAGINA_PEDIDOS = 20
+
+COLUMNAS_ITEM = ['item_id', 'codigo_producto', 'nombre_producto', 'cantidad_solicitada', 'cantidad_recibida',
+                 'precio_unitario', 'subtotal', 'proveedor', 'estado_item']
+
+@cache_consulta(tablas=['pedidos', 'pedidos_items'])
+def obtener_pedidos_con_items(estado=None, incluir_completados=True, pagina=1, por_pagina=POR_PAGINA_PEDIDOS):
+    """Una página de pedidos con sus items en una sola consulta
+
+    Devuelve una fila por item (los pedidos sin items traen item_id nulo), en el mismo orden
+    que obtener_pedidos_activos(). `total_filtrado` es cuántos pedidos cumplen los filtros.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    query = """
+    WITH filtrados AS (
+        SELECT id, fecha_pedido, fecha_entrega_esperada, estado,
+               total_productos, total_costo, notas, creado_por, orden_compra_id,
+               ROW_NUMBER() OVER (
+                   ORDER BY CASE WHEN estado = 'COMPLETADO' THEN 1 ELSE 0 END, fecha_pedido DESC, id DESC
+               ) AS orden,
+               COUNT(*) OVER () AS total_filtrado
+        FROM pedidos
+        WHERE (:estado IS NULL OR estado = :estado)
+          AND (:incluir_completados = 1 OR estado != 'COMPLETADO')
+    )
+    SELECT p.*,
+           i.id AS item_id, i.codigo_producto, i.nombre_producto, i.cantidad_solicitada, i.cantidad_recibida,
+           i.precio_unitario, i.subtotal, i.proveedor, i.estado_item
+    FROM filtrados p
+    LEFT JOIN pedidos_items i ON i.pedido_id = p.id
+    WHERE p.orden > :desde AND p.orden <= :hasta
+    ORDER BY p.orden, i.nombre_producto
+    """
+    params = {
+        'estado': estado,
+        'incluir_completados': 1 if incluir_completados else 0,
+        'desde': (pagina - 1) * por_pagina,
+        'hasta': pagina * por_pagina,
+    }
+    
+    try:
+        pedidos = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+    return pedidos
+
+def separar_items_pedido(filas_pedido):
+    """Items de un pedido a partir de sus filas de obtener_pedidos_con_items() (mismas columnas que obtener_items_pedido)"""
+    items = filas_pedido.loc[filas_pedido['item_id'].notna(), COLUMNAS_ITEM]
+    return items.rename(columns={'item_id': 'id'}).astype({'id': int})
+
 def marcar_pedido_como_recibido(pedido_id):
     """Marcar pedido como RECIBIDO: genera orden de compra y actualiza stock automáticamente"""
     conn = sqlite3.connect(DB_PATH)
@@ -400,39 +509,23 @@ def marcar_pedido_como_recibido(pedido_id):
         # 1. Actualizar estado a RECIBIDO
         cursor.execute("UPDATE pedidos SET estado = 'RECIBIDO' WHERE id = ?", (pedido_id,))
         
-        # 2. Actualizar stock de productos usando cantidad_recibida (no cantidad_solicitada)
-        cursor.execute("""
-            SELECT pi.codigo_producto, pi.cantidad_recibida, p.tipo_venta
-            FROM pedidos_items pi
-            JOIN productos p ON pi.codigo_producto = p.codigo
-            WHERE pi.pedido_id = ? AND pi.cantidad_recibida > 0
-        """, (pedido_id,))
-        
-        items = cursor.fetchall()
-        productos_actualizados = []
+        # 2. Actualizar stock de productos usando cantidad_recibida (no cantidad_solicitada),
+        #    todos los items a la vez (un UPDATE y un INSERT al kardex para el pedido completo)
+        productos_actualizados = registrar_recepcion_pedido(
+            cursor, pedido_id, usuario=st.session_state.get('usuario_actual', 'admin')
+        )
         
-        for codigo_producto, cantidad_recibida, tipo_venta in items:
-            if tipo_venta == 'granel':
-                cursor.execute("""
-                    UPDATE productos 
-                    SET stock_kg = stock_kg + ?
-                    WHERE codigo = ?
-                """, (cantidad_recibida, codigo_producto))
-            else:
-                cursor.execute("""
-                    UPDATE productos 
-                    SET stock = stock + ?
-                    WHERE codigo = ?
-                """, (int(cantidad_recibida), codigo_producto))
-            
-            # Marcar item como RECIBIDO
-            cursor.execute("""
-                UPDATE pedidos_items 
-                SET estado_item = 'RECIBIDO'
-                WHERE pedido_id = ? AND codigo_producto = ?
-            """, (pedido_id, codigo_producto))
-            
-            productos_actualizados.append(codigo_producto)
+        # Marcar como RECIBIDO los items de los productos que entraron al stock
+        cursor.execute("""
+            UPDATE pedidos_items 
+            SET estado_item = 'RECIBIDO'
+            WHERE pedido_id = ? AND codigo_producto IN (
+                SELECT pi.codigo_producto
+                FROM pedidos_items pi
+                JOIN productos p ON pi.codigo_producto = p.codigo
+                WHERE pi.pedido_id = ? AND pi.cantidad_recibida > 0
+            )
+        """, (pedido_id, pedido_id))
         
         # 3. Generar orden de compra con el total RECALCULADO (ya debe estar actualizado en la tabla pedidos)
         # Obtener el total_costo más reciente del pedido (que ya incluye cambios de cantidad_recibida)
@@ -460,22 +553,8 @@ def marcar_pedido_como_recibido(pedido_id):
         
         # 5. Sincronizar con Supabase
         if sync.is_online():
-            # Sincronizar productos actualizados
-            for codigo in productos_actualizados:
-                cursor.execute("SELECT * FROM productos WHERE codigo = ?", (codigo,))
-                producto = cursor.fetchone()
-                if producto:
-                    producto_dict = {
-                        'codigo': producto[0], 'nombre': producto[1], 'precio_compra': producto[2],
-                        'precio_normal': producto[3], 'precio_mayoreo_1': producto[4],
-                        'precio_mayoreo_2': producto[5], 'precio_mayoreo_3': producto[6],
-                        'stock': producto[7], 'tipo_venta': producto[8], 'precio_por_kg': producto[9],
-                        'peso_unitario': producto[10], 'stock_kg': producto[11],
-                        'stock_minimo': producto[12], 'stock_minimo_kg': producto[13],
-                        'stock_maximo': producto[14], 'stock_maximo_kg': producto[15],
-                        'categoria': producto[16]
-                    }
-                    sync.sync_producto_to_supabase(producto_dict)
+            # Productos actualizados en un solo upsert masivo
+            sync.sync_productos_to_supabase(productos_actualizados)
             
             # Sincronizar pedido
             conn.row_factory = sqlite3.Row
@@ -563,14 +642,18 @@ def actualizar_estado_pedido(pedido_id, estado=None, notas=None):
     return True
 
 def actualizar_item_pedido(item_id, cantidad_recibida=None, estado_item=None):
-    """Actualizar un item específico del pedido y recalcular el subtotal"""
+    """Actualizar un item específico del pedido y recalcular el subtotal
+    
+    El total del pedido se ajusta con la diferencia entre el subtotal anterior y el nuevo,
+    sin volver a sumar todos los items.
+    """
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     try:
-        # Obtener el item actual para saber el precio unitario
+        # Obtener el item actual para saber el precio unitario y el subtotal anterior
         cursor.execute("""
-            SELECT id, pedido_id, precio_unitario
+            SELECT id, pedido_id, precio_unitario, subtotal
             FROM pedidos_items
             WHERE id = ?
         """, (item_id,))
@@ -581,9 +664,11 @@ def actualizar_item_pedido(item_id, cantidad_recibida=None, estado_item=None):
         
         pedido_id = item[1]
         precio_unitario = item[2]
+        subtotal_anterior = item[3] or 0
         
         updates = []
         values = []
+        diferencia = 0
         
         # Si se actualiza la cantidad recibida, recalcular el subtotal
         if cantidad_recibida is not None:
@@ -594,6 +679,7 @@ def actualizar_item_pedido(item_id, cantidad_recibida=None, estado_item=None):
             nuevo_subtotal = cantidad_recibida * precio_unitario
             updates.append("subtotal = ?")
             values.append(nuevo_subtotal)
+            diferencia = nuevo_subtotal - subtotal_anterior
         
         if estado_item is not None:
             updates.append("estado_item = ?")
@@ -604,26 +690,13 @@ def actualizar_item_pedido(item_id, cantidad_recibida=None, estado_item=None):
             query = f"UPDATE pedidos_items SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, values)
             
-            # Recalcular el total del pedido (suma de todos los subtotales)
-            cursor.execute("""
-                SELECT SUM(subtotal) FROM pedidos_items WHERE pedido_id = ?
-            """, (pedido_id,))
-            
-            total_costo = cursor.fetchone()[0] or 0
-            
-            # Contar items que tienen cantidad_recibida > 0
-            cursor.execute("""
-                SELECT COUNT(*) FROM pedidos_items WHERE pedido_id = ? AND cantidad_recibida > 0
-            """, (pedido_id,))
-            
-            total_productos = cursor.fetchone()[0]
-            
-            # Actualizar el total del pedido
-            cursor.execute("""
-                UPDATE pedidos 
-                SET total_costo = ?, total_productos = ?
-                WHERE id = ?
-            """, (total_costo, total_productos, pedido_id))
+            # Ajustar el total del pedido por diferencia
+            if diferencia:
+                cursor.execute("""
+                    UPDATE pedidos 
+                    SET total_costo = COALESCE(total_costo, 0) + ?
+                    WHERE id = ?
+                """, (diferencia, pedido_id))
             
             conn.commit()
         
@@ -636,6 +709,88 @@ def actualizar_item_pedido(item_id, cantidad_recibida=None, estado_item=None):
     finally:
         conn.close()
 
+def actualizar_items_pedido(pedido_id, cantidades):
+    """Guardar varias cantidades recibidas de un pedido en una sola transacción
+    
+    `cantidades` es {item_id: cantidad_recibida}. Cada item recalcula su subtotal y su estado
+    (RECIBIDO si la cantidad es mayor a 0) y el total del pedido se ajusta por diferencia.
+    Devuelve el número de items actualizados, o None si hubo un error.
+    """
+    if not cantidades:
+        return 0
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        marcadores = ", ".join("?" * len(cantidades))
+        cursor.execute(f"""
+            SELECT id, precio_unitario, subtotal
+            FROM pedidos_items
+            WHERE pedido_id = ? AND id IN ({marcadores})
+        """, [pedido_id, *cantidades])
+        
+        cambios = []
+        diferencia = 0
+        for item_id, precio_unitario, subtotal_anterior in cursor.fetchall():
+            cantidad = cantidades[item_id]
+            nuevo_subtotal = cantidad * precio_unitario
+            diferencia += nuevo_subtotal - (subtotal_anterior or 0)
+            cambios.append((cantidad, nuevo_subtotal, 'RECIBIDO' if cantidad > 0 else 'PENDIENTE', item_id))
+        
+        cursor.executemany("""
+            UPDATE pedidos_items 
+            SET cantidad_recibida = ?, subtotal = ?, estado_item = ?
+            WHERE id = ?
+        """, cambios)
+        cursor.execute("""
+            UPDATE pedidos 
+            SET total_costo = COALESCE(total_costo, 0) + ?
+            WHERE id = ?
+        """, (diferencia, pedido_id))
+        
+        conn.commit()
+        return len(cambios)
+    
+    except Exception as e:
+        conn.rollback()
+        print(f"Error al actualizar items del pedido: {e}")
+        return None
+    finally:
+        conn.close()
+
+def recibir_todo_como_solicitado(pedido_id):
+    """Poner cantidad_recibida = cantidad_solicitada en todos los items del pedido (una transacción)"""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            UPDATE pedidos_items 
+            SET cantidad_recibida = cantidad_solicitada,
+                subtotal = cantidad_solicitada * precio_unitario,
+                estado_item = CASE WHEN cantidad_solicitada > 0 THEN 'RECIBIDO' ELSE 'PENDIENTE' END
+            WHERE pedido_id = ?
+        """, (pedido_id,))
+        actualizados = cursor.rowcount
+        
+        # Todos los subtotales cambiaron: el total se toma de nuevo (una sola suma por pedido)
+        cursor.execute("""
+            UPDATE pedidos 
+            SET total_costo = (SELECT COALESCE(SUM(subtotal), 0) FROM pedidos_items WHERE pedido_id = ?)
+            WHERE id = ?
+        """, (pedido_id, pedido_id))
+        
+        conn.commit()
+        return actualizados
+    
+    except Exception as e:
+        conn.rollback()
+        print(f"Error al recibir el pedido como solicitado: {e}")
+        return None
+    finally:
+        conn.close()
+
 def eliminar_pedido(pedido_id):
     """Eliminar un pedido del sistema (incluyendo sus items por CASCADE)"""
     conn = sqlite3.connect(DB_PATH)
@@ -658,53 +813,17 @@ def actualizar_stock_desde_pedido(pedido_id):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # Obtener todos los items del pedido con su cantidad recibida
-    cursor.execute("""
-        SELECT pi.codigo_producto, pi.cantidad_recibida, p.tipo_venta
-        FROM pedidos_items pi
-        JOIN productos p ON pi.codigo_producto = p.codigo
-        WHERE pi.pedido_id = ? AND pi.cantidad_recibida > 0
-    """, (pedido_id,))
-    
-    items = cursor.fetchall()
-    productos_actualizados = []
-    
-    for codigo_producto, cantidad_recibida, tipo_venta in items:
-        if tipo_venta == 'granel':
-            cursor.execute("""
-                UPDATE productos 
-                SET stock_kg = stock_kg + ?
-                WHERE codigo = ?
-            """, (cantidad_recibida, codigo_producto))
-        else:
-            cursor.execute("""
-                UPDATE productos 
-                SET stock = stock + ?
-                WHERE codigo = ?
-            """, (int(cantidad_recibida), codigo_producto))
-        
-        productos_actualizados.append(codigo_producto)
+    # Sumar al stock la cantidad recibida de todos los items en una sola pasada
+    productos_actualizados = registrar_recepcion_pedido(
+        cursor, pedido_id, usuario=st.session_state.get('usuario_actual', 'admin')
+    )
     
     conn.commit()
     
-    # Sincronizar a Supabase automáticamente
+    # Sincronizar a Supabase automáticamente (un solo upsert masivo)
     if sync.is_online():
         try:
-            for codigo in productos_actualizados:
-                cursor.execute("SELECT * FROM productos WHERE codigo = ?", (codigo,))
-                producto = cursor.fetchone()
-                if producto:
-                    producto_dict = {
-                        'codigo': producto[0], 'nombre': producto[1], 'precio_compra': producto[2],
-                        'precio_normal': producto[3], 'precio_mayoreo_1': producto[4],
-                        'precio_mayoreo_2': producto[5], 'precio_mayoreo_3': producto[6],
-                        'stock': producto[7], 'tipo_venta': producto[8], 'precio_por_kg': producto[9],
-                        'peso_unitario': producto[10], 'stock_kg': producto[11],
-                        'stock_minimo': producto[12], 'stock_minimo_kg': producto[13],
-                        'stock_maximo': producto[14], 'stock_maximo_kg': producto[15],
-                        'categoria': producto[16]
-                    }
-                    sync.sync_producto_to_supabase(producto_dict)
+            sync.sync_productos_to_supabase(productos_actualizados)
         except Exception as sync_error:
             print(f"Error en sincronización automática: {sync_error}")
     
@@ -716,20 +835,9 @@ def mostrar():
     
     # ⚠️ IMPORTANTE: NO sincronizar productos desde Supabase para evitar sobrescribir ventas
     # La sincronización de productos se hace automáticamente HACIA Supabase cuando hay cambios
-    # Solo sincronizar pedidos y órdenes de compra (que no afectan el stock)
-    if sync.is_online():
-        with st.spinner('🔄 Sincronizando pedidos y órdenes...'):
-            resultado_pedidos = sync.sync_pedidos_from_supabase()
-            resultado_ordenes = sync.sync_ordenes_compra_from_supabase()
-            
-            mensajes = []
-            if resultado_pedidos.get('success', 0) > 0:
-                mensajes.append(f"{resultado_pedidos['success']} pedidos")
-            if resultado_ordenes.get('success', 0) > 0:
-                mensajes.append(f"{resultado_ordenes['success']} órdenes")
-            
-            if mensajes:
-                st.toast(f"✅ Sincronizados: {', '.join(mensajes)}")
+    # Pedidos y órdenes de compra (que no afectan el stock) los descarga programador_sync.py
+    # en segundo plano; aquí solo se muestra qué tan recientes son
+    mostrar_estado_sync(['pedidos_reabastecimiento', 'ordenes_compra'])
     
     # Verificar si hay productos transferidos desde inventario
     if st.session_state.get('productos_para_pedido') and st.session_state.get('origen_pedido') == 'inventario':
@@ -746,7 +854,6 @@ def mostrar():
     # Inicializar sistema - DEPRECADO (usuarios ahora en usuarios.py)
     # crear_tabla_usuarios()
     # admin_creado = crear_admin_por_defecto()
-    crear_tabla_pedidos()
     
     # === INFORMACIÓN DEL FLUJO DE TRABAJO ===
     with st.expander("ℹ️ ¿Cómo funciona el flujo de pedidos?", expanded=False):
@@ -848,209 +955,59 @@ def mostrar():
             st.warning(f"⚠️ **{len(productos_bajo_stock)} productos** necesitan reabastecimiento urgente")
             
             # Nota informativa sobre el criterio de alerta
-            st.info("""
+            dias_cobertura = config.get_reorder_cover_days()
+            st.info(f"""
             🚨 **Criterio de Alerta:** Se muestran productos cuando **Stock Actual ≤ Stock Mínimo**  
-            📊 **Cantidad Sugerida:** Stock Máximo - Stock Actual (para completar capacidad máxima)  
-            💡 **Ejemplo:** Si tienes 5 kg y el máximo es 20 kg → Se sugiere pedir **15 kg**  
-            ✏️ Puedes modificar las cantidades manualmente según tus necesidades
+            📈 **Cantidad Sugerida:** lo que se venderá en los próximos **{dias_cobertura} días** según las ventas recientes (y el día de la semana), más un colchón, menos el stock actual  
+            📊 **Productos sin ventas recientes:** Stock Máximo - Stock Actual (para completar capacidad máxima)  
+            ✏️ Puedes modificar las cantidades y el proveedor en la tabla: se crea un pedido por proveedor
             """)
             
-            # Organizar productos por categoría
-            if 'categoria' in productos_bajo_stock.columns:
-                categorias_disponibles = productos_bajo_stock['categoria'].unique()
-                
-                # Mapeo de categorías con iconos
-                categoria_info = {
-                    'cremeria': {'icon': '🥛', 'name': 'Cremería', 'color': '#2196f3'},
-                    'abarrotes': {'icon': '🛒', 'name': 'Abarrotes', 'color': '#ff9800'},
-                    'otros': {'icon': '📦', 'name': 'Otros', 'color': '#9c27b0'}
-                }
-                
-                # Crear pestañas por categoría
-                tabs_categorias = []
-                for categoria in sorted(categorias_disponibles):
-                    info = categoria_info.get(categoria, {'icon': '📦', 'name': categoria.title(), 'color': '#9c27b0'})
-                    tabs_categorias.append(f"{info['icon']} {info['name']}")
-                
-                tab_cats = st.tabs(tabs_categorias)
-                
-                productos_seleccionados = []
-                
-                for i, categoria in enumerate(sorted(categorias_disponibles)):
-                    with tab_cats[i]:
-                        productos_categoria = productos_bajo_stock[productos_bajo_stock['categoria'] == categoria]
-                        info = categoria_info.get(categoria, {'icon': '📦', 'name': categoria.title(), 'color': '#9c27b0'})
-                        
-                        st.markdown(f"""
-                        <div style="background: linear-gradient(135deg, {info['color']}20 0%, {info['color']}10 100%); 
-                                    padding: 1rem; border-radius: 0.5rem; margin-bottom: 1rem; 
-                                    border: 2px solid {info['color']}40;">
-                            <h4 style="color: {info['color']}; margin: 0;">
-                                {info['icon']} {info['name']} - {len(productos_categoria)} productos críticos
-                            </h4>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Mostrar productos de esta categoría
-                        for idx, producto in productos_categoria.iterrows():
-                            col_check, col_info, col_cantidad, col_proveedor = st.columns([1, 4, 2, 2])
-                            
-                            with col_check:
-                                seleccionado = st.checkbox(
-                                    "Seleccionar",
-                                    key=f"select_producto_{producto['codigo']}_{categoria}",
-                                    label_visibility="collapsed"
-                                )
-                            
-                            with col_info:
-                                tipo_icono = "⚖️" if producto['tipo_venta'] == 'granel' else "📦"
-                                estado_color = "🔴" if producto['porcentaje_stock'] < 25 else "🟡"
-                                
-                                # Mostrar información según tipo de venta
-                                if producto['tipo_venta'] == 'granel':
-                                    stock_actual = producto['stock_kg']
-                                    stock_min = producto['stock_minimo_kg']
-                                    stock_max = producto.get('stock_maximo_kg', stock_min * 2)
-                                    unidad = "kg"
-                                else:
-                                    stock_actual = producto['stock']
-                                    stock_min = producto['stock_minimo']
-                                    stock_max = producto.get('stock_maximo', stock_min * 2)
-                                    unidad = "unid."
-                                
-                                cantidad_hasta_maximo = producto.get('cantidad_hasta_maximo', 0)
-                                
-                                st.markdown(f"""
-                                **{tipo_icono} {producto['nombre']}** {estado_color}  
-                                📊 Stock: {stock_actual:.1f} {unidad} | Mín: {stock_min:.1f} {unidad} | Máx: {stock_max:.1f} {unidad}  
-                                🛒 **Cantidad sugerida para completar stock máximo: {producto['cantidad_necesaria']:.1f} {unidad}**  
-                                💰 Precio: ${producto['precio_compra']:.2f} | 💵 Total: ${producto['cantidad_necesaria'] * producto['precio_compra']:.2f}
-                                """)
-                            
-                            with col_cantidad:
-                                if seleccionado:
-                                    cantidad_pedido = st.number_input(
-                                        "🛒 Cantidad a pedir:",
-                                        min_value=0.1 if producto['tipo_venta'] == 'granel' else 1.0,
-                                        value=float(producto['cantidad_necesaria']),  # Valor por defecto: completar al máximo
-                                        step=0.1 if producto['tipo_venta'] == 'granel' else 1.0,
-                                        key=f"cantidad_{producto['codigo']}_{categoria}",
-                                        format="%.1f" if producto['tipo_venta'] == 'granel' else "%.0f",
-                                        help="Cantidad sugerida para alcanzar el stock máximo (capacidad completa)"
-                                    )
-                                else:
-                                    cantidad_pedido = 0
-                            
-                            with col_proveedor:
-                                if seleccionado:
-                                    proveedor = st.text_input(
-                                        "Proveedor:",
-                                        key=f"proveedor_{producto['codigo']}_{categoria}",
-                                        placeholder="Nombre del proveedor"
-                                    )
-                                else:
-                                    proveedor = ""
-                            
-                            if seleccionado and cantidad_pedido > 0:
-                                productos_seleccionados.append({
-                                    'codigo': producto['codigo'],
-                                    'nombre': producto['nombre'],
-                                    'cantidad': cantidad_pedido,
-                                    'precio': producto['precio_compra'],
-                                    'proveedor': proveedor,
-                                    'tipo_venta': producto['tipo_venta'],
-                                    'categoria': categoria
-                                })
-                            
-                            st.divider()
-            else:
-                # Si no hay columna categoria, mostrar todos juntos como antes
-                st.write("#### Selecciona los productos para agregar al pedido:")
-                productos_seleccionados = []
-                
-                for idx, producto in productos_bajo_stock.iterrows():
-                    col_check, col_info, col_cantidad, col_proveedor = st.columns([1, 4, 2, 2])
-                    
-                    with col_check:
-                        seleccionado = st.checkbox(
-                            "Seleccionar",
-                            key=f"select_producto_{producto['codigo']}",
-                            label_visibility="collapsed"
-                        )
-                    
-                    with col_info:
-                        tipo_icono = "⚖️" if producto['tipo_venta'] == 'granel' else "📦"
-                        estado_color = "🔴" if producto['porcentaje_stock'] < 25 else "🟡"
-                        
-                        # Mostrar información según tipo de venta
-                        if producto['tipo_venta'] == 'granel':
-                            stock_actual = producto['stock_kg']
-                            stock_min = producto['stock_minimo_kg']
-                            stock_max = producto.get('stock_maximo_kg', stock_min * 2)
-                            unidad = "kg"
-                        else:
-                            stock_actual = producto['stock']
-                            stock_min = producto['stock_minimo']
-                            stock_max = producto.get('stock_maximo', stock_min * 2)
-                            unidad = "unid."
-                        
-                        cantidad_hasta_maximo = producto.get('cantidad_hasta_maximo', 0)
-                        
-                        st.markdown(f"""
-                        **{tipo_icono} {producto['nombre']}** {estado_color}  
-                        📊 Stock: {stock_actual:.1f} {unidad} | Mín: {stock_min:.1f} {unidad} | Máx: {stock_max:.1f} {unidad}  
-                        🛒 **Cantidad sugerida para completar stock máximo: {producto['cantidad_necesaria']:.1f} {unidad}**  
-                        💰 Precio: ${producto['precio_compra']:.2f} | 💵 Total: ${producto['cantidad_necesaria'] * producto['precio_compra']:.2f}
-                        """)
-                    
-                    with col_cantidad:
-                        if seleccionado:
-                            cantidad_pedido = st.number_input(
-                                "🛒 Cantidad a pedir:",
-                                min_value=0.1 if producto['tipo_venta'] == 'granel' else 1.0,
-                                value=float(producto['cantidad_necesaria']),
-                                step=0.1 if producto['tipo_venta'] == 'granel' else 1.0,
-                                key=f"cantidad_{producto['codigo']}",
-                                format="%.1f" if producto['tipo_venta'] == 'granel' else "%.0f",
-                                help="Cantidad sugerida para alcanzar el stock máximo (capacidad completa)"
-                            )
-                        else:
-                            cantidad_pedido = 0
-                    
-                    with col_proveedor:
-                        if seleccionado:
-                            proveedor = st.text_input(
-                                "Proveedor:",
-                                key=f"proveedor_{producto['codigo']}",
-                                placeholder="Nombre del proveedor"
-                            )
-                        else:
-                            proveedor = ""
-                    
-                    if seleccionado and cantidad_pedido > 0:
-                        productos_seleccionados.append({
-                            'codigo': producto['codigo'],
-                            'nombre': producto['nombre'],
-                            'cantidad': cantidad_pedido,
-                            'precio': producto['precio_compra'],
-                            'proveedor': proveedor,
-                            'tipo_venta': producto['tipo_venta']
-                        })
-                    
-                    st.divider()
+            # Un solo editor para todos los productos: incluir, cantidad y proveedor se editan en la tabla
+            sugerido_df = preparar_pedido_sugerido(productos_bajo_stock)
+            editado_df = st.data_editor(
+                sugerido_df,
+                column_config={
+                    "incluir": st.column_config.CheckboxColumn("✅", help="Incluir en el pedido"),
+                    "codigo": st.column_config.TextColumn("Código"),
+                    "nombre": st.column_config.TextColumn("Producto"),
+                    "categoria": st.column_config.TextColumn("Categoría"),
+                    "stock": st.column_config.NumberColumn("📦 Stock", format="%.1f"),
+                    "unidad": st.column_config.TextColumn("Unidad"),
+                    "cantidad": st.column_config.NumberColumn("🛒 Cantidad a pedir", min_value=0.0, step=0.1, format="%.1f",
+                                                              help="Cantidad sugerida según la venta pronosticada (o hasta el stock máximo si no hay ventas recientes). Los productos por unidad se piden en unidades completas"),
+                    "precio": st.column_config.NumberColumn("💰 Precio compra", format="$%.2f"),
+                    "proveedor": st.column_config.TextColumn("🏭 Proveedor", help="Se crea un pedido por proveedor"),
+                    "tipo_venta": None,
+                },
+                disabled=True if not es_admin else ['codigo', 'nombre', 'categoria', 'stock', 'unidad', 'precio'],
+                hide_index=True,
+                use_container_width=True,
+                key="editor_pedido_sugerido"
+            )
             
-            # Botón para agregar productos seleccionados al pedido
-            if productos_seleccionados and es_admin:
-                st.write("#### Resumen de productos seleccionados:")
-                
-                total_costo = 0
-                for prod in productos_seleccionados:
-                    costo_producto = prod['cantidad'] * prod['precio']
-                    total_costo += costo_producto
-                    unidad = "Kg" if prod['tipo_venta'] == 'granel' else "unidades"
-                    st.write(f"• **{prod['nombre']}**: {prod['cantidad']:.1f} {unidad} - ${costo_producto:.2f}")
-                
-                st.metric("💰 Costo Total del Pedido", f"${total_costo:.2f}")
+            seleccion_df = redondear_cantidades(editado_df)
+            seleccion_df = seleccion_df[seleccion_df['incluir'] & (seleccion_df['cantidad'] > 0)]
+            
+            if not es_admin:
+                st.info("🔒 Se requieren permisos de administrador para crear pedidos")
+            elif seleccion_df.empty:
+                st.info("ℹ️ Marca al menos un producto con cantidad mayor a 0 para crear pedidos")
+            else:
+                st.write("#### Pedidos a crear (uno por proveedor):")
+                resumen_df = resumen_por_proveedor(seleccion_df)
+                resumen_df['proveedor'] = resumen_df['proveedor'].replace('', 'Sin proveedor')
+                st.dataframe(
+                    resumen_df,
+                    column_config={
+                        "proveedor": "🏭 Proveedor",
+                        "productos": "📦 Productos",
+                        "total": st.column_config.NumberColumn("💰 Total", format="$%.2f"),
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+                st.metric("💰 Costo Total", f"${resumen_df['total'].sum():.2f}")
                 
                 col_fecha, col_notas = st.columns(2)
                 with col_fecha:
@@ -1065,33 +1022,24 @@ def mostrar():
                         placeholder="Observaciones adicionales..."
                     )
                 
-                if st.button("✅ Crear Pedido de Reabastecimiento", type="primary", use_container_width=True):
-                    try:
-                        # Crear UN solo pedido con todos los productos
-                        pedido_id, exito = crear_pedido_con_productos(
-                            productos_lista=productos_seleccionados,
-                            fecha_entrega_esperada=fecha_entrega.strftime("%Y-%m-%d"),
-                            notas=notas_generales,
-                            creado_por=st.session_state.get('usuario_admin', 'admin')
-                        )
-                        
-                        if exito:
-                            st.success(f"✅ Pedido #{pedido_id} creado exitosamente con {len(productos_seleccionados)} productos")
-                            st.balloons()
-                            time.sleep(2)
-                            st.rerun()
-                        else:
-                            st.error("❌ Error al crear el pedido")
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error al crear el pedido: {str(e)}")
+                if st.button(f"✅ Crear {len(resumen_df)} Pedido(s) de Reabastecimiento", type="primary", use_container_width=True):
+                    pedidos_creados = crear_pedidos_por_proveedor(
+                        seleccion_df,
+                        fecha_entrega_esperada=fecha_entrega.strftime("%Y-%m-%d"),
+                        notas=notas_generales,
+                        creado_por=st.session_state.get('usuario_admin', 'admin')
+                    )
+                    
+                    if pedidos_creados:
+                        numeros = ", ".join(f"#{pedido['id']}" for pedido in pedidos_creados)
+                        st.success(f"✅ {len(pedidos_creados)} pedido(s) creados ({numeros}) con {len(seleccion_df)} productos")
+                        # El editor vuelve a las cantidades sugeridas
+                        st.session_state.pop("editor_pedido_sugerido", None)
+                        st.balloons()
+                        time.sleep(2)
                         st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error al crear el pedido: {str(e)}")
-            
-            elif productos_seleccionados and not es_admin:
-                st.error("🔒 Se requieren permisos de administrador para crear pedidos")
+                    else:
+                        st.error("❌ Error al crear los pedidos")
         
         else:
             st.success("✅ Todos los productos tienen stock suficiente")
@@ -1100,35 +1048,46 @@ def mostrar():
     with tab2:
         st.subheader("📝 Gestión de Pedidos de Reabastecimiento")
         
-        pedidos_df = obtener_pedidos_activos()
+        total_pedidos = contar_pedidos()
         
-        if not pedidos_df.empty:
+        if total_pedidos:
             # Filtros
             col_filtro1, col_filtro2 = st.columns(2)
             
+            # Al cambiar un filtro se vuelve a la primera página
+            def reiniciar_pagina():
+                st.session_state.pagina_pedidos = 1
+            
             with col_filtro1:
                 filtro_estado = st.selectbox(
                     "Filtrar por estado:",
                     ["Todos", "PENDIENTE", "RECIBIDO", "COMPLETADO"],
-                    key="filtro_estado_pedidos"
+                    key="filtro_estado_pedidos",
+                    on_change=reiniciar_pagina
                 )
             
             with col_filtro2:
-                mostrar_completados = st.checkbox("Mostrar pedidos completados", value=False)
+                mostrar_completados = st.checkbox("Mostrar pedidos completados", value=False,
+                                                  on_change=reiniciar_pagina)
             
-            # Aplicar filtros
-            df_filtrado = pedidos_df.copy()
+            # Filtros y paginación en SQL: pedidos de la página y sus items en una sola consulta
+            estado_sql = None if filtro_estado == "Todos" else filtro_estado
+            pagina_actual = st.session_state.get('pagina_pedidos', 1)
+            pagina_df = obtener_pedidos_con_items(estado_sql, mostrar_completados, pagina_actual)
+            if pagina_df.empty and pagina_actual > 1:
+                pagina_actual = 1
+                st.session_state.pagina_pedidos = 1
+                pagina_df = obtener_pedidos_con_items(estado_sql, mostrar_completados, pagina_actual)
             
-            if filtro_estado != "Todos":
-                df_filtrado = df_filtrado[df_filtrado['estado'] == filtro_estado]
+            total_filtrado = int(pagina_df['total_filtrado'].iloc[0]) if not pagina_df.empty else 0
+            total_paginas = max(1, -(-total_filtrado // POR_PAGINA_PEDIDOS))
             
-            if not mostrar_completados:
-                df_filtrado = df_filtrado[df_filtrado['estado'] != 'COMPLETADO']
-            
-            st.info(f"📊 Mostrando {len(df_filtrado)} de {len(pedidos_df)} pedidos")
+            st.info(f"📊 Mostrando {total_filtrado} de {total_pedidos} pedidos"
+                    + (f" · página {pagina_actual} de {total_paginas}" if total_paginas > 1 else ""))
             
             # Mostrar cada pedido con sus items
-            for idx, pedido in df_filtrado.iterrows():
+            for _, filas_pedido in pagina_df.groupby('id', sort=False):
+                pedido = filas_pedido.iloc[0]
                 # Estado visual del pedido
                 estado_color = {
                     'PENDIENTE': '🟡',
@@ -1153,63 +1112,71 @@ def mostrar():
                         if pedido['notas']:
                             st.info(f"📝 **Notas:** {pedido['notas']}")
                         
-                        # Obtener y mostrar items del pedido
-                        items_df = obtener_items_pedido(pedido['id'])
+                        # Items del pedido (ya vienen en la consulta de la página)
+                        items_df = separar_items_pedido(filas_pedido)
                         
                         if not items_df.empty:
                             st.write("**Productos en este pedido:**")
+                            editable = es_admin and pedido['estado'] != 'COMPLETADO'
                             
-                            for item_idx, item in items_df.iterrows():
-                                col_item_info, col_item_cantidad, col_item_subtotal = st.columns([2.5, 1.2, 1.3])
-                                
-                                with col_item_info:
-                                    estado_item = "✅" if item['estado_item'] == 'RECIBIDO' else "⏳"
-                                    st.write(f"{estado_item} **{item['nombre_producto']}** ({item['codigo_producto']})")
-                                    st.write(f"   • Solicitado: {item['cantidad_solicitada']:.1f} | Precio: ${item['precio_unitario']:.2f}")
-                                    if item['proveedor']:
-                                        st.write(f"   • Proveedor: {item['proveedor']}")
-                                
-                                with col_item_cantidad:
-                                    if es_admin and pedido['estado'] != 'COMPLETADO':
-                                        nueva_cant_item = st.number_input(
-                                            "Recibido:",
-                                            min_value=0.0,
-                                            value=float(item['cantidad_recibida']),
-                                            step=1.0,
-                                            key=f"item_{item['id']}_cantidad",
-                                            label_visibility="collapsed"
-                                        )
-                                        
-                                        # Calcular el nuevo subtotal en tiempo real
-                                        nuevo_subtotal = nueva_cant_item * item['precio_unitario']
-                                        
-                                        # Mostrar si hay cambios
-                                        if nueva_cant_item != item['cantidad_recibida']:
-                                            st.warning(f"⚠️ Cambio detectado", icon="⚠️")
-                                            if st.button("💾 Guardar", key=f"save_item_{item['id']}", use_container_width=True):
-                                                actualizar_item_pedido(item['id'], cantidad_recibida=nueva_cant_item,
-                                                                      estado_item='RECIBIDO' if nueva_cant_item > 0 else 'PENDIENTE')
-                                                st.success("✅ Guardado", icon="✅")
-                                                time.sleep(0.5)
-                                                st.rerun()
+                            if editable and pedido['estado'] == 'PENDIENTE':
+                                if st.button("📥 Recibir todo como solicitado", key=f"recibir_todo_{pedido['id']}",
+                                             help="Copia la cantidad solicitada a 'Recibido' en todos los productos"):
+                                    if recibir_todo_como_solicitado(int(pedido['id'])) is not None:
+                                        # Descartar lo tecleado para que los campos tomen los valores guardados
+                                        for item_id in items_df['id']:
+                                            st.session_state.pop(f"item_{item_id}_cantidad", None)
+                                        st.rerun()
                                     else:
-                                        st.write(f"Recibido: {item['cantidad_recibida']:.1f}")
-                                
-                                with col_item_subtotal:
-                                    if es_admin and pedido['estado'] != 'COMPLETADO':
-                                        # Calcular el subtotal dinámicamente
-                                        nueva_cant_item = st.session_state.get(f"item_{item['id']}_cantidad", item['cantidad_recibida'])
-                                        nuevo_subtotal = nueva_cant_item * item['precio_unitario']
-                                        
-                                        # Mostrar el subtotal con cambio de color si es diferente
-                                        if nuevo_subtotal != item['subtotal']:
-                                            st.markdown(f"<div style='background-color: #fff3cd; padding: 8px; border-radius: 4px; text-align: center;'><b style='color: #856404;'>${nuevo_subtotal:.2f}</b><br><small style='color: #999;'>Nuevo: ${nuevo_subtotal:.2f}</small></div>", unsafe_allow_html=True)
+                                        st.error("❌ Error al actualizar las cantidades recibidas")
+                            
+                            # Con un formulario las cantidades no provocan un rerun por cada tecla:
+                            # se guardan todas juntas al presionar el botón
+                            contenedor_items = st.form(key=f"form_items_{pedido['id']}") if editable else st.container()
+                            with contenedor_items:
+                                for item_idx, item in items_df.iterrows():
+                                    col_item_info, col_item_cantidad, col_item_subtotal = st.columns([2.5, 1.2, 1.3])
+                                    
+                                    with col_item_info:
+                                        estado_item = "✅" if item['estado_item'] == 'RECIBIDO' else "⏳"
+                                        st.write(f"{estado_item} **{item['nombre_producto']}** ({item['codigo_producto']})")
+                                        st.write(f"   • Solicitado: {item['cantidad_solicitada']:.1f} | Precio: ${item['precio_unitario']:.2f}")
+                                        if item['proveedor']:
+                                            st.write(f"   • Proveedor: {item['proveedor']}")
+                                    
+                                    with col_item_cantidad:
+                                        if editable:
+                                            st.number_input(
+                                                "Recibido:",
+                                                min_value=0.0,
+                                                value=float(item['cantidad_recibida']),
+                                                step=1.0,
+                                                key=f"item_{item['id']}_cantidad",
+                                                label_visibility="collapsed"
+                                            )
                                         else:
-                                            st.write(f"Subtotal: ${item['subtotal']:.2f}")
-                                    else:
+                                            st.write(f"Recibido: {item['cantidad_recibida']:.1f}")
+                                    
+                                    with col_item_subtotal:
                                         st.write(f"Subtotal: ${item['subtotal']:.2f}")
+                                    
+                                    st.divider()
                                 
-                                st.divider()
+                                if editable and st.form_submit_button("💾 Guardar cantidades recibidas", use_container_width=True):
+                                    cambios = {}
+                                    for _, item in items_df.iterrows():
+                                        nueva_cant_item = st.session_state.get(f"item_{item['id']}_cantidad", item['cantidad_recibida'])
+                                        if nueva_cant_item != item['cantidad_recibida']:
+                                            cambios[int(item['id'])] = nueva_cant_item
+                                    
+                                    if not cambios:
+                                        st.info("ℹ️ No hay cambios en las cantidades")
+                                    elif actualizar_items_pedido(int(pedido['id']), cambios) is not None:
+                                        st.success(f"✅ {len(cambios)} producto(s) actualizado(s)", icon="✅")
+                                        time.sleep(0.5)
+                                        st.rerun()
+                                    else:
+                                        st.error("❌ Error al guardar las cantidades recibidas")
                     
                     with col_ped_acciones:
                         st.write("**Acciones:**")
@@ -1230,7 +1197,7 @@ def mostrar():
                                 <b>📦 IMPORTANTE - Antes de marcar como RECIBIDO:</b><br>
                                 1️⃣ Revisa las cantidades solicitadas en cada producto<br>
                                 2️⃣ Edita el campo "Recibido" con la cantidad real que recibiste<br>
-                                3️⃣ Guarda los cambios presionando el botón 💾<br>
+                                3️⃣ Guarda los cambios con "💾 Guardar cantidades recibidas"<br>
                                 4️⃣ Una vez confirmadas todas las cantidades, presiona "Marcar como RECIBIDO"<br>
                                 ✓ Se actualizará el stock con las cantidades que ingresaste<br>
                                 ✓ Se generará la orden de compra<br>
@@ -1282,6 +1249,9 @@ def mostrar():
                             st.success("✅ Completado")
                             if pedido.get('orden_compra_id'):
                                 st.info(f"Orden: #{pedido['orden_compra_id']}")
+            
+            if total_paginas > 1:
+                st.number_input("Página:", min_value=1, max_value=total_paginas, step=1, key="pagina_pedidos")
         
         else:
             st.info("📋 No hay pedidos registrados")
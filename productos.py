@@ -9,6 +9,10 @@ import config
 from datetime import datetime, timedelta
 from db_adapter import get_db_adapter
 from sync_manager import get_sync_manager
+from cache_manager import cache_consulta, invalidar_tablas
+from kardex import ajustar_stock
+from importador_productos import importar_productos
+from migraciones import COLUMNAS_PRODUCTOS
 from auth_manager import verificar_sesion_admin, cerrar_sesion_admin, obtener_tiempo_restante, mostrar_formulario_login
 
 # Conexión SQLite para operaciones de productos (trabajo local)
@@ -91,80 +95,6 @@ def crear_admin_por_defecto():
 # crear_tabla_usuarios()
 # admin_creado = crear_admin_por_defecto()
 
-# Ejecutar migración para soporte de productos a granel
-def actualizar_base_datos_productos_granel():
-    """Migración para agregar soporte de productos a granel y peso unitario"""
-    cursor.execute("PRAGMA table_info(productos)")
-    columns = [column[1] for column in cursor.fetchall()]
-    
-    # Agregar campos para productos a granel y peso unitario
-    if 'tipo_venta' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN tipo_venta TEXT DEFAULT 'unidad'")
-    if 'precio_por_kg' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN precio_por_kg REAL DEFAULT 0")
-    if 'peso_unitario' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN peso_unitario REAL DEFAULT 0")
-    if 'stock_kg' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN stock_kg REAL DEFAULT 0")
-    if 'stock_minimo' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN stock_minimo INTEGER DEFAULT 10")
-    if 'stock_minimo_kg' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN stock_minimo_kg REAL DEFAULT 0")
-    if 'stock_maximo' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN stock_maximo INTEGER DEFAULT 30")
-    if 'stock_maximo_kg' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN stock_maximo_kg REAL DEFAULT 0")
-    if 'categoria' not in columns:
-        cursor.execute("ALTER TABLE productos ADD COLUMN categoria TEXT DEFAULT 'cremeria'")
-    
-    conn.commit()
-
-# Ejecutar migración
-actualizar_base_datos_productos_granel()
-
-# Crear tabla base si no existe
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS productos (
-    codigo TEXT PRIMARY KEY,
-    nombre TEXT NOT NULL,
-    precio_compra REAL NOT NULL,
-    precio_normal REAL NOT NULL,
-    precio_mayoreo_1 REAL NOT NULL,
-    precio_mayoreo_2 REAL NOT NULL,
-    precio_mayoreo_3 REAL NOT NULL,
-    stock INTEGER NOT NULL,
-    tipo_venta TEXT DEFAULT 'unidad',
-    precio_por_kg REAL DEFAULT 0,
-    peso_unitario REAL DEFAULT 0,
-    stock_kg REAL DEFAULT 0,
-    stock_minimo INTEGER DEFAULT 10,
-    stock_minimo_kg REAL DEFAULT 0,
-    stock_maximo INTEGER DEFAULT 30,
-    stock_maximo_kg REAL DEFAULT 0,
-    categoria TEXT DEFAULT 'cremeria'
-)
-''')
-
-# Migrar tabla existente para agregar nuevos campos
-cursor.execute("PRAGMA table_info(productos)")
-columns = [column[1] for column in cursor.fetchall()]
-
-# Agregar precio_compra si no existe
-if 'precio_compra' not in columns:
-    cursor.execute("ALTER TABLE productos ADD COLUMN precio_compra REAL DEFAULT 0")
-
-# Renombrar precio_mayoreo a precio_mayoreo_1 si existe el campo antiguo
-if 'precio_mayoreo' in columns and 'precio_mayoreo_1' not in columns:
-    cursor.execute("ALTER TABLE productos RENAME COLUMN precio_mayoreo TO precio_mayoreo_1")
-
-# Agregar nuevos campos de mayoreo si no existen
-if 'precio_mayoreo_2' not in columns:
-    cursor.execute("ALTER TABLE productos ADD COLUMN precio_mayoreo_2 REAL DEFAULT 0")
-if 'precio_mayoreo_3' not in columns:
-    cursor.execute("ALTER TABLE productos ADD COLUMN precio_mayoreo_3 REAL DEFAULT 0")
-
-conn.commit()
-
 def agregar_producto(codigo, nombre, precio_compra, precio_normal, precio_mayoreo_1, precio_mayoreo_2, precio_mayoreo_3, 
                     stock, tipo_venta, precio_por_kg, peso_unitario, stock_kg, stock_minimo, stock_minimo_kg, stock_maximo, stock_maximo_kg, categoria, codigo_original=None):
     """Agregar o actualizar producto con soporte para granel y peso unitario"""
@@ -185,8 +115,17 @@ def agregar_producto(codigo, nombre, precio_compra, precio_normal, precio_mayore
     # Si hay un código original y es diferente al nuevo, eliminar el registro antiguo
     if codigo_original and codigo_original != codigo:
         print(f"  > Eliminando registro antiguo con código: {codigo_original}")
+        # Cerrar el saldo del código viejo en el kardex; el nuevo abre con su propio saldo
+        ajustar_stock(cursor, codigo_original, 0, 0.0, 'AJUSTE',
+                      usuario=st.session_state.get('usuario_actual'),
+                      notas=f"Cambio de código a {codigo}", referencia_tipo='cambio_codigo')
         cursor.execute("DELETE FROM productos WHERE codigo = ?", (codigo_original,))
     
+    # Conservar el stock actual; el nuevo valor se aplica como movimiento del kardex
+    cursor.execute("SELECT stock, stock_kg FROM productos WHERE codigo = ?", (codigo,))
+    previo = cursor.fetchone()
+    stock_previo, stock_kg_previo = (previo[0] or 0, previo[1] or 0.0) if previo else (0, 0.0)
+    
     print(f"  > Ejecutando INSERT OR REPLACE...")
     cursor.execute('''
         INSERT OR REPLACE INTO productos 
@@ -194,7 +133,12 @@ def agregar_producto(codigo, nombre, precio_compra, precio_normal, precio_mayore
          stock, tipo_venta, precio_por_kg, peso_unitario, stock_kg, stock_minimo, stock_minimo_kg, stock_maximo, stock_maximo_kg, categoria) 
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (codigo, nombre, precio_compra, precio_normal, precio_mayoreo_1, precio_mayoreo_2, precio_mayoreo_3, 
-          stock, tipo_venta, precio_por_kg, peso_unitario, stock_kg, stock_minimo, stock_minimo_kg, stock_maximo, stock_maximo_kg, categoria))
+          stock_previo, tipo_venta, precio_por_kg, peso_unitario, stock_kg_previo, stock_minimo, stock_minimo_kg, stock_maximo, stock_maximo_kg, categoria))
+    
+    ajustar_stock(cursor, codigo, stock, stock_kg,
+                  'AJUSTE' if previo else 'SALDO_INICIAL',
+                  usuario=st.session_state.get('usuario_actual'),
+                  notas="Edición de producto" if previo else "Alta de producto")
     
     print(f"  > Haciendo commit...")
     conn.commit()
@@ -213,9 +157,151 @@ def agregar_producto(codigo, nombre, precio_compra, precio_normal, precio_mayore
         print(f"  > 📴 Sin conexión - Producto guardado solo localmente")
 
 def eliminar_producto(codigo):
+    # Cerrar el saldo en el kardex antes de borrar el producto
+    ajustar_stock(cursor, codigo, 0, 0.0, 'AJUSTE', usuario=st.session_state.get('usuario_actual'),
+                  notas="Baja de producto")
     cursor.execute("DELETE FROM productos WHERE codigo = ?", (codigo,))
     conn.commit()
+    invalidar_tablas('productos', 'movimientos_inventario')
+
+# === EDICIÓN MASIVA ===
+
+# Columnas que se pueden editar en la tabla de edición masiva (el código es la llave)
+COLUMNAS_EDICION_MASIVA = [
+    'nombre', 'categoria', 'precio_compra', 'precio_normal',
+    'precio_mayoreo_1', 'precio_mayoreo_2', 'precio_mayoreo_3', 'precio_por_kg',
+    'stock', 'stock_kg', 'stock_minimo', 'stock_minimo_kg', 'stock_maximo', 'stock_maximo_kg',
+]
+COLUMNAS_STOCK = ('stock', 'stock_kg')
+
+def calcular_cambios(original_df, editado_df, columnas=COLUMNAS_EDICION_MASIVA):
+    """Celdas que cambiaron entre la tabla cargada y la editada
+
+    Devuelve un DataFrame (codigo, columna, antes, despues) con una fila por celda modificada.
+    """
+    original = original_df.set_index('codigo')[columnas]
+    editado = editado_df.set_index('codigo')[columnas].reindex(original.index)
+
+    cambios = []
+    for columna in columnas:
+        antes, despues = original[columna], editado[columna]
+        if pd.api.types.is_numeric_dtype(antes):
+            antes_num = pd.to_numeric(antes, errors='coerce')
+            despues_num = pd.to_numeric(despues, errors='coerce')
+            iguales = ((antes_num - despues_num).abs() < 1e-9) | (antes_num.isna() & despues_num.isna())
+        else:
+            iguales = antes.fillna('').astype(str) == despues.fillna('').astype(str)
+        distintos = ~iguales
+        if distintos.any():
+            cambios.append(pd.DataFrame({
+                'codigo': antes.index[distintos],
+                'columna': columna,
+                'antes': antes[distintos].to_numpy(),
+                'despues': despues[distintos].to_numpy(),
+            }))
+    if not cambios:
+        return pd.DataFrame(columns=['codigo', 'columna', 'antes', 'despues'])
+    return pd.concat(cambios, ignore_index=True)
+
+def _mismo_valor(antes, actual):
+    if pd.isna(antes) and pd.isna(actual):
+        return True
+    antes_num, actual_num = pd.to_numeric(antes, errors='coerce'), pd.to_numeric(actual, errors='coerce')
+    if not (pd.isna(antes_num) or pd.isna(actual_num)):
+        return abs(antes_num - actual_num) < 1e-9
+    return str('' if pd.isna(antes) else antes) == str('' if pd.isna(actual) else actual)
+
+def buscar_conflictos(cambios_df):
+    """Códigos cuyo valor en la base ya no es el `antes` de la tabla cargada (otra caja o sesión lo cambió)"""
+    codigos = cambios_df['codigo'].unique().tolist()
+    columnas = cambios_df['columna'].unique().tolist()
+    actuales = pd.read_sql_query(
+        f"SELECT codigo, {', '.join(columnas)} FROM productos WHERE codigo IN ({', '.join('?' * len(codigos))})",
+        conn, params=codigos
+    ).set_index('codigo')
+    conflictos = []
+    for fila in cambios_df.itertuples(index=False):
+        if fila.codigo in conflictos:
+            continue
+        if fila.codigo not in actuales.index or not _mismo_valor(fila.antes, actuales.at[fila.codigo, fila.columna]):
+            conflictos.append(fila.codigo)
+    return conflictos
+
+def validar_cambios(cambios_df):
+    """Lista de errores (texto) de los cambios que no se pueden guardar"""
+    errores = []
+    for fila in cambios_df.itertuples(index=False):
+        if fila.columna == 'nombre':
+            if not str(fila.despues or '').strip():
+                errores.append(f"{fila.codigo}: el nombre no puede quedar vacío")
+        elif fila.columna != 'categoria':
+            valor = pd.to_numeric(fila.despues, errors='coerce')
+            if pd.isna(valor) or valor < 0:
+                errores.append(f"{fila.codigo}: {fila.columna} debe ser un número mayor o igual a 0")
+    return errores
+
+def aplicar_cambios_productos(cambios_df, usuario=None):
+    """Guardar solo las celdas modificadas, en una transacción, y sincronizar en un lote
+
+    Cada columna modificada se escribe con un `executemany`; los cambios de stock pasan por
+    el kardex como AJUSTE. Si algún producto cambió en la base desde que se cargó la tabla
+    no se guarda nada. Devuelve (éxito, mensaje).
+    """
+    if cambios_df.empty:
+        return True, "Sin cambios"
+    errores = validar_cambios(cambios_df)
+    if errores:
+        return False, "; ".join(errores[:5]) + (f" (y {len(errores) - 5} más)" if len(errores) > 5 else "")
+
+    try:
+        # Reservar la escritura antes de comparar con la base: nadie cambia los productos en medio
+        if not conn.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+        conflictos = buscar_conflictos(cambios_df)
+        if conflictos:
+            conn.rollback()
+            return False, (f"{len(conflictos)} producto(s) cambiaron desde que se cargó la tabla "
+                           f"({', '.join(conflictos[:5])}{'…' if len(conflictos) > 5 else ''}); "
+                           "descarta los cambios para recargarla")
+
+        for columna, grupo in cambios_df.groupby('columna', sort=False):
+            if columna in COLUMNAS_STOCK:
+                continue
+            valores = grupo['despues'] if columna in ('nombre', 'categoria') else pd.to_numeric(grupo['despues'])
+            if columna == 'nombre':
+                valores = valores.astype(str).str.strip()
+            cursor.executemany(
+                f"UPDATE productos SET {columna} = ? WHERE codigo = ?",
+                zip(valores.tolist(), grupo['codigo'].tolist())
+            )
+
+        # El stock se ajusta con movimientos del kardex para que los saldos cuadren
+        stock_df = cambios_df[cambios_df['columna'].isin(COLUMNAS_STOCK)]
+        if not stock_df.empty:
+            nuevos = stock_df.pivot(index='codigo', columns='columna', values='despues')
+            for codigo, fila in nuevos.iterrows():
+                nuevo_stock = fila.get('stock')
+                nuevo_stock_kg = fila.get('stock_kg')
+                ajustar_stock(cursor, codigo,
+                              None if pd.isna(nuevo_stock) else int(nuevo_stock),
+                              None if pd.isna(nuevo_stock_kg) else float(nuevo_stock_kg),
+                              'AJUSTE', usuario=usuario, notas="Edición masiva de productos")
+
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error al guardar la edición masiva: {e}")
+        return False, str(e)
+
+    invalidar_tablas('productos')
+    codigos = cambios_df['codigo'].unique().tolist()
+    exito_sync, error_sync = sync.sync_productos_to_supabase(codigos)
+    mensaje = f"{len(cambios_df)} cambio(s) guardados en {len(codigos)} producto(s)"
+    if not exito_sync:
+        mensaje += f" (solo en local: {error_sync})"
+    return True, mensaje
 
+@cache_consulta(tablas=['productos'])
 def obtener_productos():
     df = pd.read_sql_query("SELECT * FROM productos", conn)
     if len(df) > 0:
@@ -285,6 +371,7 @@ def buscar_producto_por_codigo(codigo):
         print(f"Error al buscar producto: {e}")
         return None
 
+@cache_consulta(tablas=['productos'])
 def obtener_todos_los_productos():
     """Obtener lista de todos los productos para autocompletado"""
     try:
@@ -295,13 +382,8 @@ def obtener_todos_los_productos():
         return []
 
 def obtener_estructura_tabla():
-    """Obtener la estructura real de la tabla productos"""
-    try:
-        cursor.execute("PRAGMA table_info(productos)")
-        columnas = cursor.fetchall()
-        return [col[1] for col in columnas]  # Retornar solo los nombres
-    except Exception as e:
-        return []
+    """Columnas de productos en su orden físico (fijado por las migraciones)"""
+    return list(COLUMNAS_PRODUCTOS)
 
 def cargar_datos_producto_con_estructura(codigo_producto):
     """Cargar datos de producto usando la estructura real de la tabla"""
@@ -411,6 +493,118 @@ def cargar_datos_producto_con_estructura(codigo_producto):
         st.error(f"❌ Error al cargar producto: {e}")
         return False
 
+def mostrar_edicion_masiva(df_filtrado, filtros):
+    """Tabla editable de los productos filtrados; guarda solo las celdas que cambiaron"""
+    # Los cambios del editor se guardan por posición de fila: otra combinación de filtros es otro editor
+    clave_editor = f"editor_masivo_{abs(hash(filtros))}"
+    # Con cambios pendientes se edita una foto fija (ordenada por código) de los productos: si
+    # la tabla se recargara, una venta o un alta en otra caja movería las filas bajo los cambios
+    foto = st.session_state.get('foto_edicion_masiva')
+    pendientes = st.session_state.get(clave_editor, {}).get('edited_rows')
+    if foto is None or foto[0] != clave_editor or not pendientes:
+        original = df_filtrado[['codigo', 'tipo_venta'] + COLUMNAS_EDICION_MASIVA].sort_values('codigo', ignore_index=True)
+        st.session_state['foto_edicion_masiva'] = (clave_editor, original)
+    else:
+        original = foto[1]
+    
+    editado = st.data_editor(
+        original,
+        column_config={
+            "codigo": st.column_config.TextColumn("Código", width="small"),
+            "tipo_venta": st.column_config.TextColumn("Tipo", width="small"),
+            "nombre": st.column_config.TextColumn("Producto", width="medium", required=True),
+            "categoria": st.column_config.SelectboxColumn(
+                "🏪 Categoría", options=sorted({'cremeria', 'abarrotes', 'otros'} | set(original['categoria'].dropna()))
+            ),
+            "precio_compra": st.column_config.NumberColumn("💰 Compra", format="$%.2f", min_value=0.0),
+            "precio_normal": st.column_config.NumberColumn("💵 Venta", format="$%.2f", min_value=0.0),
+            "precio_mayoreo_1": st.column_config.NumberColumn("💼 May. 1", format="$%.2f", min_value=0.0),
+            "precio_mayoreo_2": st.column_config.NumberColumn("💼 May. 2", format="$%.2f", min_value=0.0),
+            "precio_mayoreo_3": st.column_config.NumberColumn("💼 May. 3", format="$%.2f", min_value=0.0),
+            "precio_por_kg": st.column_config.NumberColumn("⚖️ Precio/Kg", format="$%.2f", min_value=0.0),
+            "stock": st.column_config.NumberColumn("📦 Stock", min_value=0, step=1),
+            "stock_kg": st.column_config.NumberColumn("📦 Stock kg", format="%.3f", min_value=0.0),
+            "stock_minimo": st.column_config.NumberColumn("⚠️ Mín", min_value=0, step=1),
+            "stock_minimo_kg": st.column_config.NumberColumn("⚠️ Mín kg", format="%.3f", min_value=0.0),
+            "stock_maximo": st.column_config.NumberColumn("🎯 Máx", min_value=0, step=1),
+            "stock_maximo_kg": st.column_config.NumberColumn("🎯 Máx kg", format="%.3f", min_value=0.0),
+        },
+        disabled=['codigo', 'tipo_venta'],
+        hide_index=True,
+        width='stretch',
+        key=clave_editor
+    )
+    
+    cambios = calcular_cambios(original, editado)
+    if cambios.empty:
+        st.caption("Edita las celdas y guarda todos los cambios juntos. Los cambios de stock quedan en el kardex como ajuste.")
+        return
+    
+    st.warning(f"✏️ {len(cambios)} cambio(s) sin guardar en {cambios['codigo'].nunique()} producto(s)")
+    with st.expander("Ver cambios"):
+        st.dataframe(cambios.astype({'antes': str, 'despues': str}), hide_index=True, width='stretch')
+    
+    col_guardar, col_descartar = st.columns(2)
+    with col_guardar:
+        if st.button(f"💾 Guardar {len(cambios)} cambio(s)", type="primary", key="guardar_edicion_masiva"):
+            exito, mensaje = aplicar_cambios_productos(cambios, usuario=st.session_state.get('usuario_actual'))
+            if exito:
+                st.session_state.pop(clave_editor, None)
+                st.session_state.pop('foto_edicion_masiva', None)
+                st.success(f"✅ {mensaje}")
+                time.sleep(1)
+                st.rerun()
+            else:
+                st.error(f"❌ No se guardó ningún cambio: {mensaje}")
+    with col_descartar:
+        if st.button("↩️ Descartar cambios", key="descartar_edicion_masiva"):
+            st.session_state.pop(clave_editor, None)
+            st.session_state.pop('foto_edicion_masiva', None)
+            st.rerun()
+
+def mostrar_importacion():
+    """Subir una lista de productos, revisar los cambios (simulación) e importarla"""
+    st.caption("Columnas reconocidas: código, nombre/descripción, costo, precio, mayoreo 1-3, tipo (pieza/granel), "
+               "precio kg, existencia, mínimo, máximo, categoría. Las celdas vacías no cambian el producto.")
+    archivo = st.file_uploader("Archivo de la lista", type=['csv', 'xlsx'], key="archivo_importacion")
+    actualizar_stock = st.checkbox("Actualizar también el stock de los productos existentes (queda como ajuste en el kardex)",
+                                   key="importacion_actualizar_stock")
+    if archivo is None:
+        return
+
+    col_revisar, col_importar = st.columns(2)
+    with col_revisar:
+        revisar = st.button("🔎 Revisar cambios", key="revisar_importacion", width='stretch')
+    with col_importar:
+        importar = st.button("✅ Importar", key="aplicar_importacion", type="primary", width='stretch')
+    if not (revisar or importar):
+        return
+
+    try:
+        archivo.seek(0)
+        reporte = importar_productos(archivo, nombre=archivo.name, dry_run=revisar,
+                                     actualizar_stock=actualizar_stock,
+                                     usuario=st.session_state.get('usuario_actual'))
+    except Exception as e:
+        st.error(f"❌ No se pudo importar el archivo: {e}")
+        return
+
+    resumen = (f"{reporte['leidas']} renglones · {reporte['nuevos']} nuevos · {reporte['actualizados']} actualizados · "
+               f"{reporte['sin_cambios']} sin cambios · {len(reporte['errores'])} con errores ({reporte['duracion_s']}s)")
+    if reporte['aplicado']:
+        st.success(f"✅ Importación aplicada: {resumen}")
+        if reporte['sync'] not in (None, 'ok'):
+            st.warning(f"📴 Guardado solo en local: {reporte['sync']}")
+    else:
+        st.info(f"🔎 Simulación (no se guardó nada): {resumen}")
+    if reporte['columnas_ignoradas']:
+        st.warning(f"⚠️ Columnas ignoradas: {', '.join(map(str, reporte['columnas_ignoradas']))}")
+    if not reporte['detalle'].empty:
+        st.dataframe(reporte['detalle'], hide_index=True, width='stretch')
+    if not reporte['errores'].empty:
+        st.error("❌ Renglones rechazados (no se importan):")
+        st.dataframe(reporte['errores'], hide_index=True, width='stretch')
+
 def mostrar():
     st.title("🏪 Gestión de Productos")
     
@@ -1342,8 +1536,9 @@ def mostrar():
                         stock_kg, stock_minimo, stock_minimo_kg, stock_maximo, stock_maximo_kg, categoria, codigo_original
                     )
                     
-                    # IMPORTANTE: Limpiar TODOS los cachés de Streamlit para que otras páginas vean los cambios
+                    # IMPORTANTE: Limpiar los cachés para que otras páginas vean los cambios
                     st.cache_data.clear()
+                    invalidar_tablas('productos')
                     
                     # Mensaje de éxito
                     if st.session_state.form_data['modo_edicion']:
@@ -1363,6 +1558,11 @@ def mostrar():
                     import traceback
                     st.error(f"Detalles del error: {traceback.format_exc()}")
 
+    # IMPORTACIÓN DE LISTAS DE PRECIOS
+    if es_admin:
+        with st.expander("📥 Importar lista de productos (CSV / Excel)"):
+            mostrar_importacion()
+
     # SECCIÓN DE LISTADO DE PRODUCTOS
     st.markdown("---")
     
@@ -1376,6 +1576,7 @@ def mostrar():
         if st.button("🔄 Refrescar Lista", key="refresh_productos", help="Actualizar datos desde la base de datos"):
             # Limpiar caché y forzar recarga
             st.cache_data.clear()
+            invalidar_tablas('productos')
             st.rerun()
     
     df = obtener_productos()
@@ -1479,14 +1680,22 @@ def mostrar():
             if es_admin:
                 column_config["precio_compra"] = st.column_config.NumberColumn("💰 Precio Compra", format="$%.2f", width="small")
             
-            # Mostrar tabla
-            st.dataframe(
-                df_display,
-                width='stretch',
-                hide_index=True,
-                column_config=column_config
+            edicion_masiva = es_admin and st.checkbox(
+                "✏️ Edición masiva (editar precios y stock directamente en la tabla)",
+                key="edicion_masiva_productos"
             )
             
+            if edicion_masiva:
+                mostrar_edicion_masiva(df_filtrado, (filtro_nombre, filtro_tipo, filtro_categoria, filtro_stock_bajo))
+            else:
+                # Mostrar tabla
+                st.dataframe(
+                    df_display,
+                    width='stretch',
+                    hide_index=True,
+                    column_config=column_config
+                )
+            
             # Botones de acción (Solo admins pueden editar/eliminar)
             if es_admin:
                 st.subheader("🛠️ Acciones de Administrador")
@@ -0,0 +1,220 @@
+"""
+Sincronización programada desde Supabase
+Las páginas ya no descargan tablas completas cada vez que se muestran: un hilo en segundo
+plano trae cada tabla cuando le toca (intervalo propio por tabla) y deja en `sync_estado`
+el último intento, el último éxito y el resultado. Las páginas leen siempre de SQLite y
+muestran una insignia con qué tan frescos están los datos.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+import sync_manager
+from sync_manager import get_sync_manager
+
+DB_PATH = "pos_cremeria.db"
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+# tabla de Supabase → (método de SyncManager que la descarga, minutos por defecto entre descargas)
+TABLAS_PULL = {
+    'ordenes_compra': ('sync_ordenes_compra_from_supabase', 10),
+    'pedidos_reabastecimiento': ('sync_pedidos_from_supabase', 10),
+}
+
+def leer_estado(db_path=DB_PATH, tablas=None):
+    """{tabla: fila de sync_estado como dict}"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        filas = conn.execute("SELECT * FROM sync_estado").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+    return {fila['tabla']: dict(fila) for fila in filas if tablas is None or fila['tabla'] in tablas}
+
+def _guardar_estado(db_path, tabla, momento, resultado, duracion_ms):
+    exito = 'error' not in resultado
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute('''
+            INSERT INTO sync_estado (tabla, ultimo_intento, ultimo_exito, filas, fallidas, error, duracion_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(tabla) DO UPDATE SET
+                ultimo_intento = excluded.ultimo_intento,
+                ultimo_exito = COALESCE(excluded.ultimo_exito, sync_estado.ultimo_exito),
+                filas = excluded.filas,
+                fallidas = excluded.fallidas,
+                error = excluded.error,
+                duracion_ms = excluded.duracion_ms
+        ''', (tabla, momento, momento if exito else None, resultado.get('success', 0),
+              resultado.get('failed', 0), resultado.get('error'), round(duracion_ms, 1)))
+        conn.commit()
+    finally:
+        conn.close()
+
+def _hace(fecha_texto):
+    """'hace 3 min' a partir de una fecha guardada en sync_estado"""
+    segundos = (datetime.now() - datetime.strptime(fecha_texto, FORMATO_FECHA)).total_seconds()
+    if segundos < 60:
+        return "hace un momento"
+    if segundos < 3600:
+        return f"hace {int(segundos // 60)} min"
+    if segundos < 86400:
+        return f"hace {int(segundos // 3600)} h"
+    return f"hace {int(segundos // 86400)} días"
+
+
+class ProgramadorSync:
+    """Hilo que descarga cada tabla de TABLAS_PULL cuando vence su intervalo"""
+
+    def __init__(self, db_path=DB_PATH, intervalos=None, revision=30):
+        self.db_path = db_path
+        # {tabla: minutos}; 0 = esa tabla no se descarga
+        self.intervalos = intervalos or {tabla: minutos for tabla, (_, minutos) in TABLAS_PULL.items()}
+        self.revision = revision
+        self.ultimo_error = None
+
+        self._solicitadas = set()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def pendientes(self):
+        """Tablas a las que ya les toca descargarse (o que alguien pidió a mano)"""
+        ahora = datetime.now()
+        estado = leer_estado(self.db_path)
+        with self._lock:
+            solicitadas, self._solicitadas = self._solicitadas, set()
+
+        pendientes = []
+        for tabla, minutos in self.intervalos.items():
+            if tabla in solicitadas:
+                pendientes.append(tabla)
+                continue
+            if minutos <= 0:
+                continue
+            ultimo = estado.get(tabla, {}).get('ultimo_intento')
+            if not ultimo or ahora - datetime.strptime(ultimo, FORMATO_FECHA) >= timedelta(minutes=minutos):
+                pendientes.append(tabla)
+        return pendientes
+
+    def sincronizar(self, tabla):
+        """Descargar una tabla ahora y registrar el resultado en sync_estado"""
+        metodo = getattr(get_sync_manager(), TABLAS_PULL[tabla][0])
+        momento = datetime.now().strftime(FORMATO_FECHA)
+        inicio = time.perf_counter()
+        try:
+            resultado = metodo()
+        except Exception as e:
+            resultado = {'success': 0, 'failed': 0, 'error': str(e)}
+        _guardar_estado(self.db_path, tabla, momento, resultado, (time.perf_counter() - inicio) * 1000)
+        if resultado.get('success', 0) > 0:
+            print(f"🔄 {tabla}: {resultado['success']} filas descargadas de Supabase")
+        return resultado
+
+    def revisar(self):
+        """Un paso del ciclo: descargar las tablas pendientes"""
+        pendientes = self.pendientes()
+        if not pendientes:
+            return
+        if not get_sync_manager().is_online():
+            # Se registra el intento para no volver a probar la red en cada revisión
+            momento = datetime.now().strftime(FORMATO_FECHA)
+            for tabla in pendientes:
+                _guardar_estado(self.db_path, tabla, momento, {'error': 'Sin conexión'}, 0)
+            return
+        for tabla in pendientes:
+            self.sincronizar(tabla)
+
+    def solicitar(self, *tablas):
+        """Pedir una descarga en el siguiente ciclo, sin esperar el intervalo"""
+        with self._lock:
+            self._solicitadas.update(t for t in tablas if t in TABLAS_PULL)
+        self._despertar.set()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            try:
+                self.revisar()
+                self.ultimo_error = None
+            except Exception as e:
+                self.ultimo_error = str(e)
+                print(f"Error en la sincronización programada: {e}")
+            self._despertar.wait(self.revision)
+            self._despertar.clear()
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="sync-supabase", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._despertar.set()
+
+
+# Instancia global del programador de sincronización
+_programador = None
+_programador_lock = threading.Lock()
+
+def get_programador_sync() -> ProgramadorSync:
+    """Obtener (e iniciar) la instancia única del programador de sincronización
+
+    Sin Supabase configurado el programador no se inicia y las páginas trabajan solo con SQLite.
+    """
+    global _programador
+    if _programador is None:
+        with _programador_lock:
+            if _programador is None:
+                import config
+                _programador = ProgramadorSync(
+                    db_path=config.get_db_path(),
+                    intervalos={tabla: config.get_sync_pull_minutes(tabla, minutos)
+                                for tabla, (_, minutos) in TABLAS_PULL.items()},
+                )
+                if sync_manager.SUPABASE_AVAILABLE and get_sync_manager().supabase_db is not None:
+                    _programador.iniciar()
+    return _programador
+
+# === INSIGNIA DE FRESCURA ===
+
+def mostrar_estado_sync(tablas):
+    """Insignia con la antigüedad de los datos descargados y botón para sincronizar en segundo plano"""
+    programador = get_programador_sync()
+    if not programador.activo:
+        st.caption("⚪ Supabase no configurado: mostrando datos locales")
+        return
+
+    estado = leer_estado(programador.db_path, tablas)
+    partes = []
+    for tabla in tablas:
+        fila = estado.get(tabla)
+        nombre = tabla.replace('_', ' ')
+        minutos = programador.intervalos.get(tabla, 0)
+        if not fila or not fila['ultimo_intento']:
+            partes.append(f"⏳ {nombre}: pendiente")
+        elif fila['error']:
+            exito = f", último éxito {_hace(fila['ultimo_exito'])}" if fila['ultimo_exito'] else ""
+            partes.append(f"🔴 {nombre}: {fila['error']} ({_hace(fila['ultimo_intento'])}{exito})")
+        elif minutos and datetime.now() - datetime.strptime(fila['ultimo_exito'], FORMATO_FECHA) > timedelta(minutes=2 * minutos):
+            partes.append(f"🟡 {nombre}: {_hace(fila['ultimo_exito'])}")
+        else:
+            partes.append(f"🟢 {nombre}: {_hace(fila['ultimo_exito'])}")
+
+    col_estado, col_boton = st.columns([8, 1])
+    with col_estado:
+        st.caption("☁️ Supabase · " + " · ".join(partes))
+    with col_boton:
+        if st.button("🔄", key=f"sync_ahora_{'_'.join(tablas)}", help="Sincronizar ahora (en segundo plano)"):
+            programador.solicitar(*tablas)
+            st.toast("🔄 Sincronización solicitada; los datos se actualizarán en unos segundos")
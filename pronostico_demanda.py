@@ -0,0 +1,220 @@
+"""
+Pronóstico de demanda por producto
+A partir del historial de ventas calcula, para cada código, la venta diaria esperada
+(promedio móvil de las últimas semanas) y un factor por día de la semana (los sábados
+no se vende lo mismo que los martes). Las unidades se cuentan en piezas y los productos
+a granel en kg. El resultado se guarda en `pronostico_demanda`: el servicio de
+mantenimiento lo recalcula una vez al día, así que las páginas solo lo leen.
+
+Con el pronóstico, la cantidad sugerida para un pedido es la que alcanza para
+`dias_cobertura` días de venta más un colchón de seguridad, en lugar de "llenar hasta
+el stock máximo". Todo se calcula con operaciones sobre columnas, sin recorrer fila por fila.
+
+Uso desde consola:
+    python pronostico_demanda.py               # recalcular y mostrar resumen
+    python pronostico_demanda.py --dias 10     # sugerencias para 10 días de cobertura
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from cache_manager import cache_consulta
+
+DB_PATH = "pos_cremeria.db"
+
+# Días de ventas que se leen (8 semanas: 8 muestras por día de la semana)
+DIAS_HISTORIA = 56
+# Ventana del promedio móvil de la venta diaria
+VENTANA_PROMEDIO = 28
+# Días con venta que "valen" lo mismo que el factor neutro al estimar la estacionalidad;
+# con pocas ventas el factor por día de la semana se acerca a 1
+DIAS_CONFIANZA_SEMANAL = 14
+# ~95% de los días no se agota (distribución normal de la venta diaria)
+Z_SEGURIDAD = 1.65
+
+COLUMNAS_FACTOR = [f"factor_{dia}" for dia in range(7)]  # 0 = lunes ... 6 = domingo
+
+def _hoy():
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def demanda_diaria_por_producto(conn, hasta=None, dias=DIAS_HISTORIA):
+    """Matriz producto × día con lo vendido (piezas o kg); los días sin venta valen 0
+
+    Solo cuenta días completos: `hasta` (por defecto hoy) queda fuera.
+    """
+    hasta = hasta or _hoy()
+    desde = hasta - timedelta(days=dias)
+    ventas = pd.read_sql_query('''
+        SELECT v.codigo, date(v.fecha) AS dia,
+               SUM(CASE WHEN p.tipo_venta = 'granel' THEN v.peso_vendido ELSE v.cantidad END) AS demanda
+        FROM ventas v
+        JOIN productos p ON p.codigo = v.codigo
+        WHERE v.fecha >= ? AND v.fecha < ?
+        GROUP BY v.codigo, dia
+    ''', conn, params=(desde.strftime("%Y-%m-%d"), hasta.strftime("%Y-%m-%d")))
+
+    dias_rango = pd.date_range(desde, hasta - timedelta(days=1), freq='D')
+    if ventas.empty:
+        return pd.DataFrame(columns=dias_rango, dtype=float)
+    ventas['dia'] = pd.to_datetime(ventas['dia'])
+    return (ventas.pivot_table(index='codigo', columns='dia', values='demanda', aggfunc='sum', fill_value=0.0)
+                  .reindex(columns=dias_rango, fill_value=0.0))
+
+def calcular_pronostico(conn, hasta=None):
+    """DataFrame con una fila por producto vendido en el periodo y sus parámetros de demanda"""
+    matriz = demanda_diaria_por_producto(conn, hasta)
+    if matriz.empty:
+        return pd.DataFrame(columns=['codigo', 'demanda_diaria', 'desviacion_diaria', 'dias_con_venta']
+                            + COLUMNAS_FACTOR)
+
+    valores = matriz.to_numpy(dtype=float)
+    recientes = valores[:, -VENTANA_PROMEDIO:]
+    demanda_diaria = recientes.mean(axis=1)
+    desviacion = recientes.std(axis=1)
+    dias_con_venta = (valores > 0).sum(axis=1)
+
+    # Estacionalidad semanal: promedio de cada día de la semana contra el promedio general
+    dia_semana = matriz.columns.dayofweek.to_numpy()
+    promedio_general = valores.mean(axis=1)
+    por_dia = np.column_stack([valores[:, dia_semana == dia].mean(axis=1) for dia in range(7)])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factores = np.where(promedio_general[:, None] > 0, por_dia / promedio_general[:, None], 1.0)
+    peso = (dias_con_venta / (dias_con_venta + DIAS_CONFIANZA_SEMANAL))[:, None]
+    factores = 1.0 + (factores - 1.0) * peso
+
+    pronostico = pd.DataFrame(factores.round(4), columns=COLUMNAS_FACTOR)
+    pronostico.insert(0, 'codigo', matriz.index.to_numpy())
+    pronostico.insert(1, 'demanda_diaria', demanda_diaria.round(4))
+    pronostico.insert(2, 'desviacion_diaria', desviacion.round(4))
+    pronostico.insert(3, 'dias_con_venta', dias_con_venta)
+    return pronostico
+
+def actualizar_pronostico(db_path=DB_PATH, hasta=None):
+    """Recalcular y guardar `pronostico_demanda` (reemplaza todo); devuelve el número de productos"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        pronostico = calcular_pronostico(conn, hasta)
+        pronostico['calculado'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        columnas = list(pronostico.columns)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM pronostico_demanda")
+        cursor.executemany(
+            f"INSERT INTO pronostico_demanda ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+            pronostico.itertuples(index=False, name=None)
+        )
+        conn.commit()
+        return len(pronostico)
+    finally:
+        conn.close()
+
+def ultimo_calculo(db_path=DB_PATH):
+    """Fecha (datetime) del último cálculo guardado, o None"""
+    conn = sqlite3.connect(db_path)
+    try:
+        fila = conn.execute("SELECT MAX(calculado) FROM pronostico_demanda").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    return datetime.strptime(fila[0], "%Y-%m-%d %H:%M:%S") if fila and fila[0] else None
+
+@cache_consulta(tablas=['pronostico_demanda'])
+def obtener_pronostico():
+    """Pronóstico guardado; si nunca se ha calculado, se calcula en este momento"""
+    if ultimo_calculo(DB_PATH) is None:
+        actualizar_pronostico(DB_PATH)
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return pd.read_sql_query(
+            f"SELECT codigo, demanda_diaria, desviacion_diaria, {', '.join(COLUMNAS_FACTOR)} FROM pronostico_demanda",
+            conn
+        )
+    finally:
+        conn.close()
+
+def dias_semana_en_periodo(dias, desde=None):
+    """Cuántas veces cae cada día de la semana (lunes..domingo) en los próximos `dias` días"""
+    inicio = (desde or _hoy()).weekday()
+    conteo = np.zeros(7)
+    np.add.at(conteo, (inicio + np.arange(int(dias))) % 7, 1)
+    return conteo
+
+def sugerir_cantidades(productos_df, dias_cobertura=None, pronostico_df=None, desde=None):
+    """Agregar a `productos_df` la cantidad sugerida según el pronóstico
+
+    `productos_df` necesita codigo, tipo_venta, stock, stock_kg, stock_minimo, stock_minimo_kg
+    y cantidad_necesaria (la sugerencia fija, que se conserva para productos sin ventas).
+    Agrega `demanda_diaria`, `dias_cobertura` (días que alcanza el stock actual) y
+    `origen_sugerencia`, y reemplaza `cantidad_necesaria` donde hay pronóstico.
+    """
+    if productos_df.empty:
+        return productos_df
+    if dias_cobertura is None:
+        import config
+        dias_cobertura = config.get_reorder_cover_days()
+    if pronostico_df is None:
+        pronostico_df = obtener_pronostico()
+
+    df = productos_df.merge(pronostico_df, on='codigo', how='left')
+    demanda = df['demanda_diaria'].fillna(0.0).to_numpy(dtype=float)
+    desviacion = df['desviacion_diaria'].fillna(0.0).to_numpy(dtype=float)
+    factores = df[COLUMNAS_FACTOR].fillna(1.0).to_numpy(dtype=float)
+
+    granel = (df['tipo_venta'] == 'granel').to_numpy()
+    stock_actual = np.where(granel, df['stock_kg'].fillna(0), df['stock'].fillna(0)).astype(float)
+    stock_minimo = np.where(granel, df['stock_minimo_kg'].fillna(0), df['stock_minimo'].fillna(0)).astype(float)
+
+    # Venta esperada en el periodo (con su día de la semana) + colchón por la variación diaria
+    venta_periodo = demanda * (factores @ dias_semana_en_periodo(dias_cobertura, desde))
+    seguridad = Z_SEGURIDAD * desviacion * np.sqrt(dias_cobertura)
+    objetivo = np.maximum(venta_periodo + seguridad, stock_minimo)
+    faltante = np.maximum(objetivo - stock_actual, 0.0)
+    # Piezas completas; a granel en décimas de kg
+    sugerida = np.where(granel, np.maximum(np.ceil(faltante * 10) / 10, 0.1), np.maximum(np.ceil(faltante), 1))
+
+    con_pronostico = demanda > 0
+    df['cantidad_necesaria'] = np.where(con_pronostico, sugerida, df['cantidad_necesaria'])
+    df['demanda_diaria'] = demanda.round(2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['dias_cobertura'] = np.where(con_pronostico, stock_actual / demanda, np.nan).round(1)
+    df['origen_sugerencia'] = np.where(con_pronostico, 'pronóstico', 'stock máximo')
+    return df.drop(columns=['desviacion_diaria'] + COLUMNAS_FACTOR)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recalcular el pronóstico de demanda por producto")
+    parser.add_argument('--db', default=DB_PATH, help="Ruta de la base de datos")
+    parser.add_argument('--dias', type=int, default=7, help="Días de cobertura para las sugerencias")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    total = actualizar_pronostico(args.db)
+    print(f"✅ Pronóstico de {total} productos calculado en {time.perf_counter() - inicio:.2f}s")
+
+    conn = sqlite3.connect(args.db)
+    try:
+        pronostico = pd.read_sql_query(
+            f"SELECT codigo, demanda_diaria, desviacion_diaria, {', '.join(COLUMNAS_FACTOR)} FROM pronostico_demanda",
+            conn
+        )
+        productos = pd.read_sql_query('''
+            SELECT codigo, nombre, tipo_venta, stock, stock_kg, stock_minimo, stock_minimo_kg,
+                   0 AS cantidad_necesaria
+            FROM productos
+        ''', conn)
+    finally:
+        conn.close()
+    sugerencias = sugerir_cantidades(productos, args.dias, pronostico)
+    sugerencias = sugerencias[sugerencias['origen_sugerencia'] == 'pronóstico'].sort_values('dias_cobertura')
+    print(f"📉 Productos que se acaban antes de {args.dias} días:")
+    print(sugerencias[sugerencias['dias_cobertura'] < args.dias]
+          [['codigo', 'nombre', 'tipo_venta', 'demanda_diaria', 'dias_cobertura', 'cantidad_necesaria']]
+          .head(20).to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Registro de consultas SQL
+Se apoya en las conexiones medidas de rendimiento.py:
+- `normalizar_sql()` quita literales y parámetros para agrupar la misma consulta aunque
+  se haya armado con f-strings (ej. el COUNT de depuración del resumen financiero).
+- El trace callback de SQLite cuenta las sentencias que realmente corren en cada rerun
+  (incluye los cuerpos de los triggers y cada sentencia de un executescript).
+- Una consulta normalizada que se repite muchas veces en un mismo rerun se marca N+1.
+- Las consultas lentas y los N+1 se escriben en logs/consultas_lentas.log (rotativo,
+  una línea JSON por evento) con el EXPLAIN QUERY PLAN adjunto.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+import pandas as pd
+
+DIRECTORIO_LOGS = "logs"
+ARCHIVO_LENTAS = os.path.join(DIRECTORIO_LOGS, "consultas_lentas.log")
+TAMANO_MAXIMO_LOG = 1024 * 1024
+ARCHIVOS_ROTADOS = 5
+
+# Solo estas sentencias aceptan EXPLAIN QUERY PLAN
+_EXPLICABLES = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAMETROS = re.compile(r"[?:@$]\w*")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+@lru_cache(maxsize=4096)
+def normalizar_sql(sql):
+    """Misma forma para la misma consulta: sin literales, sin espacios repetidos"""
+    sql = _CADENAS.sub("?", sql)
+    sql = _NUMEROS.sub("?", sql)
+    sql = _PARAMETROS.sub("?", sql)
+    sql = _LISTAS.sub("(...)", sql)
+    return _ESPACIOS.sub(" ", sql).strip().rstrip(';')
+
+def explicar(conn, sql, params=None):
+    """Filas de EXPLAIN QUERY PLAN (lista vacía si la sentencia no se puede explicar)"""
+    if not sql.lstrip().upper().startswith(_EXPLICABLES):
+        return []
+    try:
+        # Cursor sin medir: el EXPLAIN no debe contarse ni volver a registrarse
+        cursor = sqlite3.Connection.cursor(conn, sqlite3.Cursor)
+        filas = cursor.execute("EXPLAIN QUERY PLAN " + sql, params if params is not None else ()).fetchall()
+        return [fila[-1] for fila in filas]
+    except sqlite3.Error as e:
+        return [f"(sin plan: {e})"]
+
+
+class RegistroSQL:
+    """Umbrales y log rotativo de consultas lentas / N+1"""
+
+    def __init__(self, umbral_lenta_ms=200, umbral_n_mas_1=10, archivo=ARCHIVO_LENTAS):
+        self.umbral_lenta_ms = umbral_lenta_ms
+        self.umbral_n_mas_1 = umbral_n_mas_1
+        self.archivo = archivo
+        self._n_mas_1_registrados = set()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(archivo) or ".", exist_ok=True)
+        self._logger = logging.getLogger(f"registro_sql.{os.path.abspath(archivo)}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            manejador = RotatingFileHandler(archivo, maxBytes=TAMANO_MAXIMO_LOG,
+                                            backupCount=ARCHIVOS_ROTADOS, encoding='utf-8')
+            manejador.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(manejador)
+
+    def _escribir(self, evento):
+        evento['fecha'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._logger.info(json.dumps(evento, ensure_ascii=False, default=str))
+
+    def registrar_lenta(self, conn, consulta, params=None, pagina=None):
+        """Escribir una consulta lenta con su plan"""
+        self._escribir({
+            'tipo': 'lenta',
+            'pagina': pagina,
+            'ms': round(consulta['ms'], 1),
+            'filas': consulta['filas'],
+            'params': consulta['params'],
+            'sql': normalizar_sql(consulta['sql']),
+            'plan': explicar(conn, consulta['sql'], params),
+        })
+
+    def detectar_n_mas_1(self, consultas, pagina=None):
+        """{sql normalizado: veces} de las consultas repetidas de un rerun (y registrar las nuevas)"""
+        veces = Counter(normalizar_sql(c['sql']) for c in consultas)
+        repetidas = {sql: n for sql, n in veces.items() if n >= self.umbral_n_mas_1}
+        for sql, n in repetidas.items():
+            with self._lock:
+                if (pagina, sql) in self._n_mas_1_registrados:
+                    continue
+                self._n_mas_1_registrados.add((pagina, sql))
+            ms = sum(c['ms'] for c in consultas if normalizar_sql(c['sql']) == sql)
+            self._escribir({'tipo': 'n+1', 'pagina': pagina, 'veces': n, 'ms': round(ms, 1), 'sql': sql})
+        return repetidas
+
+    def leer_log(self, limite=200) -> pd.DataFrame:
+        """Últimos eventos del log (el archivo actual, sin los rotados)"""
+        columnas = ['fecha', 'tipo', 'pagina', 'ms', 'filas', 'veces', 'params', 'sql', 'plan']
+        if not os.path.exists(self.archivo):
+            return pd.DataFrame(columns=columnas)
+        with open(self.archivo, 'r', encoding='utf-8') as f:
+            lineas = f.readlines()[-limite:]
+        eventos = []
+        for linea in lineas:
+            try:
+                eventos.append(json.loads(linea))
+            except json.JSONDecodeError:
+                continue
+        return pd.DataFrame(eventos, columns=columnas).iloc[::-1].reset_index(drop=True)
+
+
+def agrupar_consultas(consultas, sentencias=(), umbral_n_mas_1=10, umbral_lenta_ms=200) -> pd.DataFrame:
+    """Consultas de un rerun agrupadas por forma normalizada"""
+    columnas = ['sql', 'llamadas', 'sentencias', 'ms_total', 'ms_max', 'filas', 'n_mas_1', 'lenta']
+    if not consultas and not sentencias:
+        return pd.DataFrame(columns=columnas)
+
+    df = pd.DataFrame(consultas, columns=['sql', 'params', 'filas', 'ms'])
+    df['sql'] = df['sql'].map(normalizar_sql)
+    grupos = df.groupby('sql').agg(
+        llamadas=('ms', 'size'), ms_total=('ms', 'sum'), ms_max=('ms', 'max'), filas=('filas', 'sum')
+    )
+    # Lo que SQLite ejecutó de verdad (triggers incluidos), contado por el trace callback
+    ejecutadas = pd.Series(Counter(normalizar_sql(s) for s in sentencias), name='sentencias', dtype='int64')
+    grupos = grupos.join(ejecutadas, how='outer').reset_index().rename(columns={'index': 'sql'})
+    grupos[['llamadas', 'sentencias']] = grupos[['llamadas', 'sentencias']].fillna(0).astype(int)
+    grupos['n_mas_1'] = grupos['llamadas'] >= umbral_n_mas_1
+    grupos['lenta'] = grupos['ms_max'] >= umbral_lenta_ms
+    grupos[['ms_total', 'ms_max']] = grupos[['ms_total', 'ms_max']].round(2)
+    return grupos[columnas].sort_values('ms_total', ascending=False, na_position='last').reset_index(drop=True)
+
+
+# Instancia global del registro
+_registro = None
+_registro_lock = threading.Lock()
+
+def get_registro_sql() -> RegistroSQL:
+    """Obtener instancia única del registro de consultas"""
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                import config
+                _registro = RegistroSQL(
+                    umbral_lenta_ms=config.get_profiling_slow_query_ms(),
+                    umbral_n_mas_1=config.get_profiling_n1_threshold(),
+                )
+    return _registro
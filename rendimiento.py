@@ -0,0 +1,383 @@
+"""
+Medición de rendimiento de la app
+- `instalar_instrumentacion()` hace que toda conexión abierta con `sqlite3.connect` mida
+  cada consulta (SQL, forma de los parámetros, filas, ms). Así se cubren todas las
+  páginas sin tocar sus cientos de `cursor.execute` / `pd.read_sql_query`.
+- `medir_pagina(nombre)` envuelve el despacho de la página en main.py: junta las consultas
+  del rerun y guarda su duración en un buffer circular por página (p50/p95).
+- Con `profiling.traces` activo cada rerun corre bajo pyinstrument (o cProfile si no está
+  instalado) y la traza se guarda en perfiles/ solo si el rerun fue lento.
+- El registro de consultas lentas y N+1 está en registro_sql.py.
+- `mostrar()` es la página de administración "Rendimiento".
+"""
+import cProfile
+import os
+import pstats
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from registro_sql import agrupar_consultas, get_registro_sql
+
+try:
+    from pyinstrument import Profiler
+    PYINSTRUMENT_DISPONIBLE = True
+except ImportError:
+    PYINSTRUMENT_DISPONIBLE = False
+
+DIRECTORIO_PERFILES = "perfiles"
+# Reruns guardados por página (buffer circular)
+RERUNS_POR_PAGINA = 200
+# Trazas guardadas en perfiles/ (las más viejas se borran)
+MAX_TRAZAS = 50
+
+_conectar_original = sqlite3.connect
+_estado = threading.local()
+
+def forma_parametros(params):
+    """Descripción corta de los parámetros sin guardar sus valores"""
+    if params is None:
+        return "-"
+    if isinstance(params, dict):
+        return f"dict({len(params)})"
+    try:
+        return f"{type(params).__name__}({len(params)})"
+    except TypeError:
+        return type(params).__name__
+
+def _registrar_consulta(sql, params, filas, ms):
+    """Crear el registro de una consulta y agregarlo al rerun en curso del hilo (si hay uno)"""
+    consulta = {'sql': sql, 'params': params, 'filas': filas, 'ms': ms, 'lenta': False}
+    medicion = getattr(_estado, 'actual', None)
+    if medicion is not None:
+        medicion['consultas'].append(consulta)
+    return consulta
+
+def _trazar_sentencia(sql):
+    """Trace callback de SQLite: cada sentencia ejecutada, triggers incluidos"""
+    medicion = getattr(_estado, 'actual', None)
+    if medicion is not None and not sql.startswith('EXPLAIN'):
+        medicion['sentencias'].append(sql)
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que mide execute/executemany y suma el tiempo y las filas de los fetch*"""
+
+    _consulta = None
+    _valores = None
+
+    def _medir(self, metodo, sql, params, forma):
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, params) if params is not None else metodo(sql)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            filas = self.rowcount if self.rowcount >= 0 else None
+            self._consulta = _registrar_consulta(sql, forma, filas, ms)
+            self._valores = params
+            self._revisar_lenta()
+
+    def _revisar_lenta(self):
+        """Mandar al log de consultas lentas (una vez por ejecución) si pasó el umbral"""
+        consulta = self._consulta
+        if consulta['lenta'] or consulta['ms'] < get_registro_sql().umbral_lenta_ms:
+            return
+        consulta['lenta'] = True
+        valores = self._valores
+        if consulta['params'].startswith('executemany'):
+            valores = valores[0] if valores else None
+        elif consulta['params'] == 'script':
+            return
+        medicion = getattr(_estado, 'actual', None)
+        try:
+            get_registro_sql().registrar_lenta(self.connection, consulta, valores,
+                                               medicion['pagina'] if medicion else None)
+        except Exception as e:
+            print(f"No se pudo registrar la consulta lenta: {e}")
+
+    def execute(self, sql, params=None):
+        self._medir(super().execute, sql, params, forma_parametros(params))
+        return self
+
+    def executemany(self, sql, seq_params):
+        seq_params = list(seq_params)
+        self._medir(super().executemany, sql, seq_params, f"executemany({len(seq_params)})")
+        return self
+
+    def executescript(self, script):
+        self._medir(super().executescript, script, None, "script")
+        return self
+
+    def _sumar_fetch(self, inicio, filas):
+        if self._consulta is not None:
+            self._consulta['ms'] += (time.perf_counter() - inicio) * 1000
+            self._consulta['filas'] = (self._consulta['filas'] or 0) + filas
+            self._revisar_lenta()
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        self._sumar_fetch(inicio, 0 if fila is None else 1)
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        self._sumar_fetch(inicio, len(filas))
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        self._sumar_fetch(inicio, len(filas))
+        return filas
+
+
+class ConexionMedida(sqlite3.Connection):
+    """Conexión cuyos cursores (también los de conn.execute) son CursorMedido"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_trazar_sentencia)
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=None):
+        cursor = self.cursor()
+        return cursor.execute(sql, params) if params is not None else cursor.execute(sql)
+
+    def executemany(self, sql, seq_params):
+        return self.cursor().executemany(sql, seq_params)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+def _conectar_medido(*args, **kwargs):
+    kwargs.setdefault('factory', ConexionMedida)
+    return _conectar_original(*args, **kwargs)
+
+def instalar_instrumentacion():
+    """Medir todas las conexiones que se abran desde ahora con sqlite3.connect"""
+    sqlite3.connect = _conectar_medido
+
+def desinstalar_instrumentacion():
+    sqlite3.connect = _conectar_original
+
+
+class Perfilador:
+    """Duración de los reruns por página y consultas del último rerun de cada una"""
+
+    def __init__(self, umbral_lento_ms=1500, guardar_trazas=False, directorio=DIRECTORIO_PERFILES):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.guardar_trazas = guardar_trazas
+        self.directorio = directorio
+        self._reruns = {}
+        self._ultimo_rerun = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, pagina, ms, consultas, sentencias=(), traza=None):
+        ms_sql = sum(c['ms'] for c in consultas)
+        repetidas = get_registro_sql().detectar_n_mas_1(consultas, pagina)
+        with self._lock:
+            if pagina not in self._reruns:
+                self._reruns[pagina] = deque(maxlen=RERUNS_POR_PAGINA)
+            self._reruns[pagina].append({
+                'fecha': datetime.now(),
+                'ms': ms,
+                'consultas': len(consultas),
+                'sentencias': len(sentencias),
+                'ms_sql': ms_sql,
+                'n_mas_1': len(repetidas),
+                'consultas_lentas': sum(1 for c in consultas if c['lenta']),
+                'traza': traza,
+            })
+            self._ultimo_rerun[pagina] = (consultas, list(sentencias))
+
+    def resumen(self) -> pd.DataFrame:
+        """p50/p95 por página a partir del buffer circular"""
+        with self._lock:
+            reruns = {pagina: list(datos) for pagina, datos in self._reruns.items()}
+
+        filas = []
+        for pagina, datos in reruns.items():
+            duraciones = np.array([r['ms'] for r in datos])
+            filas.append({
+                'pagina': pagina,
+                'reruns': len(datos),
+                'p50_ms': round(float(np.percentile(duraciones, 50)), 1),
+                'p95_ms': round(float(np.percentile(duraciones, 95)), 1),
+                'max_ms': round(float(duraciones.max()), 1),
+                'consultas_prom': round(float(np.mean([r['consultas'] for r in datos])), 1),
+                'sql_ms_prom': round(float(np.mean([r['ms_sql'] for r in datos])), 1),
+                'lentos': sum(1 for r in datos if r['ms'] >= self.umbral_lento_ms),
+                'n_mas_1': datos[-1]['n_mas_1'],
+                'consultas_lentas': sum(r['consultas_lentas'] for r in datos),
+            })
+        columnas = ['pagina', 'reruns', 'p50_ms', 'p95_ms', 'max_ms', 'consultas_prom', 'sql_ms_prom', 'lentos',
+                    'n_mas_1', 'consultas_lentas']
+        return pd.DataFrame(filas, columns=columnas).sort_values('p95_ms', ascending=False).reset_index(drop=True)
+
+    def reruns(self, pagina) -> pd.DataFrame:
+        with self._lock:
+            datos = list(self._reruns.get(pagina, ()))
+        return pd.DataFrame(datos, columns=['fecha', 'ms', 'consultas', 'sentencias', 'ms_sql', 'traza'])
+
+    def consultas_ultimo_rerun(self, pagina) -> pd.DataFrame:
+        """Consultas del último rerun agrupadas por forma normalizada (con marcas N+1 / lenta)"""
+        with self._lock:
+            consultas, sentencias = self._ultimo_rerun.get(pagina, ((), ()))
+        registro = get_registro_sql()
+        return agrupar_consultas(consultas, sentencias, registro.umbral_n_mas_1, registro.umbral_lenta_ms)
+
+    def limpiar(self):
+        with self._lock:
+            self._reruns.clear()
+            self._ultimo_rerun.clear()
+
+    def _guardar_traza(self, pagina, perfil, ms):
+        os.makedirs(self.directorio, exist_ok=True)
+        base = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{pagina.replace(' ', '_')}_{ms:.0f}ms"
+        if PYINSTRUMENT_DISPONIBLE:
+            archivo = os.path.join(self.directorio, base + ".html")
+            with open(archivo, 'w', encoding='utf-8') as f:
+                f.write(perfil.output_html())
+        else:
+            archivo = os.path.join(self.directorio, base + ".txt")
+            with open(archivo, 'w', encoding='utf-8') as f:
+                pstats.Stats(perfil, stream=f).sort_stats('cumulative').print_stats(60)
+
+        # Conservar solo las trazas más recientes
+        trazas = sorted(os.listdir(self.directorio))
+        for viejo in trazas[:-MAX_TRAZAS]:
+            try:
+                os.remove(os.path.join(self.directorio, viejo))
+            except OSError:
+                pass
+        return archivo
+
+    @contextmanager
+    def medir(self, pagina):
+        """Medir un rerun de `pagina` (tiempo total y consultas hechas desde este hilo)"""
+        anterior = getattr(_estado, 'actual', None)
+        medicion = {'pagina': pagina, 'consultas': [], 'sentencias': []}
+        _estado.actual = medicion
+
+        perfil = None
+        if self.guardar_trazas:
+            perfil = Profiler() if PYINSTRUMENT_DISPONIBLE else cProfile.Profile()
+            perfil.start() if PYINSTRUMENT_DISPONIBLE else perfil.enable()
+
+        inicio = time.perf_counter()
+        try:
+            yield medicion
+        finally:
+            # También se registra cuando la página sale con st.rerun()/st.stop()
+            ms = (time.perf_counter() - inicio) * 1000
+            _estado.actual = anterior
+            traza = None
+            if perfil is not None:
+                perfil.stop() if PYINSTRUMENT_DISPONIBLE else perfil.disable()
+                if ms >= self.umbral_lento_ms:
+                    try:
+                        traza = self._guardar_traza(pagina, perfil, ms)
+                    except Exception as e:
+                        print(f"No se pudo guardar la traza de {pagina}: {e}")
+            self.registrar(pagina, ms, medicion['consultas'], medicion['sentencias'], traza)
+
+
+# Instancia global del perfilador
+_perfilador = None
+_perfilador_lock = threading.Lock()
+
+def get_perfilador() -> Perfilador:
+    """Obtener instancia única del perfilador (e instalar la medición de conexiones)"""
+    global _perfilador
+    if _perfilador is None:
+        with _perfilador_lock:
+            if _perfilador is None:
+                import config
+                _perfilador = Perfilador(
+                    umbral_lento_ms=config.get_profiling_slow_ms(),
+                    guardar_trazas=config.get_profiling_traces(),
+                )
+                if config.get_profiling_enabled():
+                    instalar_instrumentacion()
+    return _perfilador
+
+def medir_pagina(pagina):
+    return get_perfilador().medir(pagina)
+
+# === PÁGINA DE ADMINISTRACIÓN ===
+
+def mostrar():
+    st.title("⏱️ Rendimiento")
+
+    if st.session_state.get('rol_usuario') != 'admin':
+        st.error("❌ No tiene permisos de administrador para acceder a este módulo")
+        return
+
+    perfilador = get_perfilador()
+    resumen = perfilador.resumen()
+    if resumen.empty:
+        st.info("Aún no hay reruns medidos en este proceso. Navega por las páginas y vuelve aquí.")
+        return
+
+    st.caption(f"Últimos {RERUNS_POR_PAGINA} reruns por página desde que arrancó el proceso · "
+               f"lento: ≥ {perfilador.umbral_lento_ms:.0f} ms · "
+               f"trazas: {'activas' if perfilador.guardar_trazas else 'desactivadas'}")
+    st.dataframe(resumen, width='stretch', hide_index=True)
+    st.plotly_chart(px.bar(resumen, x='pagina', y=['p50_ms', 'p95_ms'], barmode='group',
+                           title="Duración del rerun por página (ms)"), width='stretch')
+
+    pagina = st.selectbox("Página", resumen['pagina'].tolist(), key="rendimiento_pagina")
+
+    reruns = perfilador.reruns(pagina)
+    st.plotly_chart(px.line(reruns, x='fecha', y=['ms', 'ms_sql'], markers=True,
+                            title=f"Reruns de {pagina}"), width='stretch')
+
+    st.subheader("🗃️ Consultas del último rerun")
+    consultas = perfilador.consultas_ultimo_rerun(pagina)
+    if consultas.empty:
+        st.info("El último rerun no hizo consultas")
+    else:
+        st.caption(f"{consultas['llamadas'].sum()} llamadas · {consultas['sentencias'].sum()} sentencias "
+                   f"ejecutadas por SQLite · {consultas['ms_total'].sum():.1f} ms")
+        if consultas['n_mas_1'].any():
+            st.warning(f"⚠️ {consultas['n_mas_1'].sum()} consulta(s) repetidas en el mismo rerun (posible N+1)")
+        st.dataframe(consultas, width='stretch', hide_index=True)
+
+    st.subheader("🐢 Consultas lentas y N+1")
+    registro = get_registro_sql()
+    st.caption(f"Lenta: ≥ {registro.umbral_lenta_ms:.0f} ms · N+1: ≥ {registro.umbral_n_mas_1} repeticiones "
+               f"por rerun · {registro.archivo}")
+    eventos = registro.leer_log()
+    if eventos.empty:
+        st.info("Sin consultas lentas registradas")
+    else:
+        st.dataframe(eventos.drop(columns=['plan']), width='stretch', hide_index=True)
+        for evento in eventos[eventos['tipo'] == 'lenta'].head(10).itertuples(index=False):
+            with st.expander(f"{evento.fecha} · {evento.ms} ms · {evento.sql[:80]}"):
+                st.code(evento.sql, language='sql')
+                st.code("\n".join(evento.plan or []) or "(sin plan)")
+
+    trazas = [t for t in reruns['traza'].dropna().tolist() if os.path.exists(t)]
+    if trazas:
+        st.subheader("🔬 Trazas de reruns lentos")
+        for traza in reversed(trazas[-10:]):
+            with open(traza, 'rb') as f:
+                st.download_button(f"📥 {os.path.basename(traza)}", data=f.read(),
+                                   file_name=os.path.basename(traza), key=f"traza_{traza}")
+
+    if st.button("🧹 Limpiar mediciones"):
+        perfilador.limpiar()
+        st.rerun()
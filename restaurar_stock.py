@@ -1,10 +1,14 @@
+# Script de corrección puntual del producto 11111.
+# Para conciliar todo el inventario usa: python conciliar_stock.py [--aplicar]
 import sqlite3
+from kardex import ajustar_stock
 
 conn = sqlite3.connect('pos_cremeria.db')
 cursor = conn.cursor()
 
-# Restaurar a 0
-cursor.execute('UPDATE productos SET stock = 0 WHERE codigo = "11111"')
+# Restaurar a 0 (la diferencia queda registrada en el kardex)
+ajustar_stock(cursor, "11111", 0, tipo_movimiento='CORRECCION', usuario='restaurar_stock.py',
+              notas='Restaurar stock a 0 (3 ventas de 20 unidades ya registradas)')
 conn.commit()
 
 print('✅ Stock restaurado a 0 unidades (refleja las 3 ventas de 20 unidades ya registradas)')
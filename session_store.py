@@ -0,0 +1,245 @@
+"""
+Almacén de sesiones de login
+Las sesiones viven en un diccionario en memoria (validar un token es una búsqueda O(1)
+sin tocar disco) respaldado por la tabla `sesiones` de SQLite, que es la que sobrevive
+a reinicios. Un hilo en segundo plano borra las sesiones expiradas.
+
+Reemplaza a active_sessions.json: el archivo se importa una sola vez y se renombra.
+"""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from migraciones import asegurar_esquema
+
+DB_PATH = "pos_cremeria.db"
+
+# Archivo usado antes para las sesiones (se migra a la tabla al arrancar)
+SESSIONS_FILE_LEGADO = "active_sessions.json"
+
+DURACION_SESION = timedelta(hours=12)
+
+# Cuánto se recuerda que un token no existe (evita ir a la tabla en cada rerun de una
+# pestaña que conserva en la URL un token cerrado o expirado)
+TTL_TOKEN_INVALIDO = timedelta(seconds=60)
+
+def crear_tabla_sesiones(conn, commit=True):
+    """Crear la tabla de sesiones y su índice por expiración"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sesiones (
+            token TEXT PRIMARY KEY,
+            usuario TEXT NOT NULL,
+            nombre_completo TEXT,
+            rol TEXT,
+            creada TEXT NOT NULL,
+            expira TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_expira ON sesiones (expira)")
+    if commit:
+        conn.commit()
+
+
+class SessionStore:
+    """Mapa en memoria con TTL delante de la tabla `sesiones`"""
+
+    def __init__(self, db_path=DB_PATH, duracion=DURACION_SESION, intervalo_limpieza=300):
+        self.db_path = db_path
+        self.duracion = duracion
+        self.intervalo_limpieza = intervalo_limpieza
+
+        self._sesiones: Dict[str, dict] = {}
+        self._invalidos: Dict[str, datetime] = {}  # token -> hasta cuándo se considera inválido
+        self._lock = threading.RLock()
+        self._detener = threading.Event()
+
+        # La tabla la crean las migraciones (aquí solo se verifica la versión del esquema)
+        asegurar_esquema(db_path)
+
+        conn = self._conectar()
+        try:
+            self._importar_archivo_legado(conn)
+            self._cargar(conn)
+        finally:
+            conn.close()
+
+        self._hilo = threading.Thread(target=self._ciclo_limpieza, name="limpieza-sesiones", daemon=True)
+        self._hilo.start()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _importar_archivo_legado(self, conn):
+        """Pasar a la tabla las sesiones vigentes de active_sessions.json"""
+        if not os.path.exists(SESSIONS_FILE_LEGADO):
+            return
+        try:
+            with open(SESSIONS_FILE_LEGADO, 'r') as f:
+                sesiones = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"No se pudo leer {SESSIONS_FILE_LEGADO}: {e}")
+            return
+
+        ahora = datetime.now().isoformat()
+        filas = [
+            (token, data['usuario'], data.get('nombre_completo'), data.get('rol'), data['creada'], data['expira'])
+            for token, data in sesiones.items()
+            if data.get('expira', '') > ahora
+        ]
+        conn.executemany('''
+            INSERT OR IGNORE INTO sesiones (token, usuario, nombre_completo, rol, creada, expira)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', filas)
+        conn.commit()
+
+        # Renombrar para no resucitar sesiones cerradas en el próximo arranque
+        try:
+            os.replace(SESSIONS_FILE_LEGADO, SESSIONS_FILE_LEGADO + ".migrado")
+        except OSError as e:
+            print(f"No se pudo renombrar {SESSIONS_FILE_LEGADO}: {e}")
+
+    def _cargar(self, conn):
+        filas = conn.execute(
+            "SELECT * FROM sesiones WHERE expira > ?", (datetime.now().isoformat(),)
+        ).fetchall()
+        with self._lock:
+            self._sesiones = {fila['token']: self._a_dict(fila) for fila in filas}
+
+    @staticmethod
+    def _a_dict(fila) -> dict:
+        data = dict(fila)
+        data['_expira_dt'] = datetime.fromisoformat(data['expira'])
+        return data
+
+    def crear(self, usuario, nombre_completo, rol) -> str:
+        """Crear una sesión nueva y devolver su token"""
+        ahora = datetime.now()
+        data = {
+            'token': str(uuid.uuid4()),
+            'usuario': usuario,
+            'nombre_completo': nombre_completo,
+            'rol': rol,
+            'creada': ahora.isoformat(),
+            'expira': (ahora + self.duracion).isoformat(),
+        }
+
+        # Primero a disco (durable), luego a memoria
+        conn = self._conectar()
+        try:
+            conn.execute('''
+                INSERT INTO sesiones (token, usuario, nombre_completo, rol, creada, expira)
+                VALUES (:token, :usuario, :nombre_completo, :rol, :creada, :expira)
+            ''', data)
+            conn.commit()
+        finally:
+            conn.close()
+
+        data['_expira_dt'] = ahora + self.duracion
+        with self._lock:
+            self._sesiones[data['token']] = data
+        return data['token']
+
+    def validar(self, token) -> Optional[dict]:
+        """Datos de la sesión si el token es válido y no ha expirado"""
+        if not token:
+            return None
+
+        ahora = datetime.now()
+        with self._lock:
+            data = self._sesiones.get(token)
+            if data is None and self._invalidos.get(token, ahora) > ahora:
+                return None
+
+        if data is None:
+            # Puede haberla creado otro proceso: una búsqueda por clave primaria
+            data = self._buscar_en_tabla(token)
+            if data is None:
+                self._marcar_invalido(token)
+                return None
+
+        if data['_expira_dt'] <= datetime.now():
+            self.eliminar(token)
+            return None
+
+        return {k: v for k, v in data.items() if not k.startswith('_')}
+
+    def _marcar_invalido(self, token):
+        with self._lock:
+            self._invalidos[token] = datetime.now() + TTL_TOKEN_INVALIDO
+
+    def _buscar_en_tabla(self, token) -> Optional[dict]:
+        conn = self._conectar()
+        try:
+            fila = conn.execute("SELECT * FROM sesiones WHERE token = ?", (token,)).fetchone()
+        finally:
+            conn.close()
+        if fila is None:
+            return None
+
+        data = self._a_dict(fila)
+        with self._lock:
+            self._sesiones[token] = data
+        return data
+
+    def eliminar(self, token):
+        """Cerrar una sesión"""
+        if not token:
+            return
+        with self._lock:
+            self._sesiones.pop(token, None)
+        self._marcar_invalido(token)
+
+        conn = self._conectar()
+        try:
+            conn.execute("DELETE FROM sesiones WHERE token = ?", (token,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def limpiar_expiradas(self) -> int:
+        """Borrar de memoria y de la tabla las sesiones expiradas"""
+        ahora = datetime.now()
+        with self._lock:
+            expiradas = [token for token, data in self._sesiones.items() if data['_expira_dt'] <= ahora]
+            for token in expiradas:
+                del self._sesiones[token]
+            self._invalidos = {token: hasta for token, hasta in self._invalidos.items() if hasta > ahora}
+
+        conn = self._conectar()
+        try:
+            cursor = conn.execute("DELETE FROM sesiones WHERE expira <= ?", (ahora.isoformat(),))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _ciclo_limpieza(self):
+        while not self._detener.wait(self.intervalo_limpieza):
+            try:
+                self.limpiar_expiradas()
+            except Exception as e:
+                print(f"Error al limpiar sesiones expiradas: {e}")
+
+    def detener(self):
+        self._detener.set()
+
+
+# Instancia global del almacén de sesiones
+_session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store() -> SessionStore:
+    """Obtener instancia única del almacén de sesiones"""
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                _session_store = SessionStore()
+    return _session_store
@@ -8,6 +8,9 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import socket
 
+from archivo_historico import fecha_corte
+from kardex import ajustar_stock
+
 try:
     from supabase_client import get_db as get_supabase_db
     SUPABASE_AVAILABLE = True
@@ -102,6 +105,80 @@ class SyncManager:
         
         return {'success': success, 'failed': failed}
     
+    def sync_productos_to_supabase(self, codigos: List[str], lote: int = 500) -> tuple[bool, str]:
+        """Sincronizar varios productos de SQLite a Supabase con upserts masivos (una petición por lote)
+        
+        Returns:
+            tuple[bool, str]: (éxito, mensaje_error)
+        """
+        codigos = list(dict.fromkeys(codigos))
+        if not codigos:
+            return True, ""
+        if not self.is_online():
+            return False, "Sin conexión a internet"
+        
+        try:
+            conn = sqlite3.connect(self.sqlite_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                for inicio in range(0, len(codigos), lote):
+                    parte = codigos[inicio:inicio + lote]
+                    marcadores = ", ".join("?" * len(parte))
+                    productos = [dict(fila) for fila in conn.execute(
+                        f"SELECT * FROM productos WHERE codigo IN ({marcadores})", parte
+                    )]
+                    if not productos:
+                        continue
+                    result = self.supabase_db.client.table('productos').upsert(productos, on_conflict='codigo').execute()
+                    if not result.data:
+                        return False, "Supabase no retornó datos"
+            finally:
+                conn.close()
+            return True, ""
+            
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Error al sincronizar productos a Supabase: {error_msg}")
+            return False, error_msg
+    
+    def _guardar_producto_local(self, cursor, producto: Dict):
+        """Guardar en SQLite un producto descargado de Supabase sin saltarse el kardex
+
+        Los datos del producto se actualizan directamente; el stock de Supabase se aplica
+        como diferencia con kardex.ajustar_stock (SALDO_INICIAL si el producto es nuevo),
+        así el saldo local sigue cuadrando con sus movimientos. No hace commit.
+        """
+        cursor.execute("SELECT 1 FROM productos WHERE codigo = ?", (producto['codigo'],))
+        existe = cursor.fetchone() is not None
+
+        cursor.execute('''
+            INSERT INTO productos 
+            (codigo, nombre, precio_compra, precio_normal, precio_mayoreo_1, precio_mayoreo_2, precio_mayoreo_3, 
+             stock, tipo_venta, precio_por_kg, peso_unitario, stock_kg, stock_minimo, stock_minimo_kg, 
+             stock_maximo, stock_maximo_kg, categoria) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, 0, ?, ?, ?, ?, ?)
+            ON CONFLICT(codigo) DO UPDATE SET
+                nombre = excluded.nombre, precio_compra = excluded.precio_compra,
+                precio_normal = excluded.precio_normal, precio_mayoreo_1 = excluded.precio_mayoreo_1,
+                precio_mayoreo_2 = excluded.precio_mayoreo_2, precio_mayoreo_3 = excluded.precio_mayoreo_3,
+                tipo_venta = excluded.tipo_venta, precio_por_kg = excluded.precio_por_kg,
+                peso_unitario = excluded.peso_unitario, stock_minimo = excluded.stock_minimo,
+                stock_minimo_kg = excluded.stock_minimo_kg, stock_maximo = excluded.stock_maximo,
+                stock_maximo_kg = excluded.stock_maximo_kg, categoria = excluded.categoria
+        ''', (
+            producto['codigo'], producto['nombre'], producto['precio_compra'], 
+            producto['precio_normal'], producto['precio_mayoreo_1'], producto['precio_mayoreo_2'], 
+            producto['precio_mayoreo_3'], producto['tipo_venta'], 
+            producto.get('precio_por_kg', 0), producto.get('peso_unitario', 0), 
+            producto.get('stock_minimo', 10), producto.get('stock_minimo_kg', 0), 
+            producto.get('stock_maximo', 0), producto.get('stock_maximo_kg', 0), 
+            producto.get('categoria', 'cremeria')
+        ))
+
+        ajustar_stock(cursor, producto['codigo'], producto.get('stock') or 0, producto.get('stock_kg') or 0.0,
+                      'AJUSTE' if existe else 'SALDO_INICIAL', usuario='sync',
+                      notas='Sync Supabase', referencia_tipo='supabase')
+
     def sync_producto_from_supabase(self, codigo: str) -> bool:
         """Sincronizar un producto de Supabase a SQLite"""
         if not self.is_online():
@@ -116,25 +193,10 @@ class SyncManager:
             
             producto = result.data[0]
             
-            # Actualizar en SQLite
+            # Actualizar en SQLite (el stock entra como movimiento del kardex)
             conn = sqlite3.connect(self.sqlite_path)
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO productos 
-                (codigo, nombre, precio_compra, precio_normal, precio_mayoreo_1, precio_mayoreo_2, precio_mayoreo_3, 
-                 stock, tipo_venta, precio_por_kg, peso_unitario, stock_kg, stock_minimo, stock_minimo_kg, 
-                 stock_maximo, stock_maximo_kg, categoria) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                producto['codigo'], producto['nombre'], producto['precio_compra'], 
-                producto['precio_normal'], producto['precio_mayoreo_1'], producto['precio_mayoreo_2'], 
-                producto['precio_mayoreo_3'], producto['stock'], producto['tipo_venta'], 
-                producto.get('precio_por_kg', 0), producto.get('peso_unitario', 0), 
-                producto.get('stock_kg', 0), producto.get('stock_minimo', 10), 
-                producto.get('stock_minimo_kg', 0), producto.get('stock_maximo', 0),
-                producto.get('stock_maximo_kg', 0), producto.get('categoria', 'cremeria')
-            ))
+            self._guardar_producto_local(cursor, producto)
             
             conn.commit()
             conn.close()
@@ -161,25 +223,18 @@ class SyncManager:
             success = 0
             failed = 0
             
+            # Una sola transacción para toda la descarga
+            cursor.execute("BEGIN")
             for producto in productos:
                 try:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO productos 
-                        (codigo, nombre, precio_compra, precio_normal, precio_mayoreo_1, precio_mayoreo_2, precio_mayoreo_3, 
-                         stock, tipo_venta, precio_por_kg, peso_unitario, stock_kg, stock_minimo, stock_minimo_kg, 
-                         stock_maximo, stock_maximo_kg, categoria) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        producto['codigo'], producto['nombre'], producto['precio_compra'], 
-                        producto['precio_normal'], producto['precio_mayoreo_1'], producto['precio_mayoreo_2'], 
-                        producto['precio_mayoreo_3'], producto['stock'], producto['tipo_venta'], 
-                        producto.get('precio_por_kg', 0), producto.get('peso_unitario', 0), 
-                        producto.get('stock_kg', 0), producto.get('stock_minimo', 10), 
-                        producto.get('stock_minimo_kg', 0), producto.get('stock_maximo', 0),
-                        producto.get('stock_maximo_kg', 0), producto.get('categoria', 'cremeria')
-                    ))
+                    # Cada producto en su savepoint: si falla no deja el stock sin su movimiento
+                    cursor.execute("SAVEPOINT producto_supabase")
+                    self._guardar_producto_local(cursor, producto)
+                    cursor.execute("RELEASE producto_supabase")
                     success += 1
                 except Exception as e:
+                    cursor.execute("ROLLBACK TO producto_supabase")
+                    cursor.execute("RELEASE producto_supabase")
                     print(f"Error al sincronizar producto {producto['codigo']}: {e}")
                     failed += 1
             
@@ -378,6 +433,38 @@ class SyncManager:
             print(f"Error al sincronizar pedido a Supabase: {error_msg}")
             return False, error_msg
     
+    def sync_pedidos_to_supabase(self, pedido_ids: List[int], lote: int = 500) -> tuple[bool, str]:
+        """Sincronizar varios pedidos de SQLite a Supabase con upserts masivos (una petición por lote)"""
+        pedido_ids = list(dict.fromkeys(pedido_ids))
+        if not pedido_ids:
+            return True, ""
+        if not self.is_online():
+            return False, "Sin conexión a internet"
+
+        try:
+            conn = sqlite3.connect(self.sqlite_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                for inicio in range(0, len(pedido_ids), lote):
+                    parte = pedido_ids[inicio:inicio + lote]
+                    marcadores = ", ".join("?" * len(parte))
+                    pedidos = [dict(fila) for fila in conn.execute(
+                        f"SELECT * FROM pedidos WHERE id IN ({marcadores})", parte
+                    )]
+                    if not pedidos:
+                        continue
+                    result = self.supabase_db.client.table('pedidos_reabastecimiento').upsert(pedidos, on_conflict='id').execute()
+                    if not result.data:
+                        return False, "Supabase no retornó datos"
+            finally:
+                conn.close()
+            return True, ""
+
+        except Exception as e:
+            error_msg = str(e)
+            print(f"Error al sincronizar pedidos a Supabase: {error_msg}")
+            return False, error_msg
+
     def sync_all_pedidos_to_supabase(self) -> Dict[str, int]:
         """Sincronizar todos los pedidos de reabastecimiento a Supabase"""
         if not self.is_online():
@@ -528,10 +615,18 @@ class SyncManager:
             conn = sqlite3.connect(self.sqlite_path)
             cursor = conn.cursor()
             
+            # Las ventas anteriores al corte ya están en historico_AAAA.db: no traerlas de vuelta
+            corte = fecha_corte(conn, 'ventas')
+            ids_vivos = set()
+            if corte:
+                ids_vivos = {fila[0] for fila in cursor.execute("SELECT id FROM ventas WHERE fecha < ?", (corte,))}
+            
             success = 0
             failed = 0
             
             for venta in ventas:
+                if corte and str(venta.get('fecha') or '') < corte and venta.get('id') not in ids_vivos:
+                    continue
                 try:
                     cursor.execute('''
                         INSERT OR REPLACE INTO ventas 
@@ -2,25 +2,20 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 from datetime import datetime
+from cache_manager import cache_consulta
 
 conn = sqlite3.connect("pos_cremeria.db", check_same_thread=False)
 cursor = conn.cursor()
 
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS turnos (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    empleado TEXT NOT NULL,
-    turno INTEGER NOT NULL,
-    timestamp TEXT NOT NULL
-)
-''')
-conn.commit()
-
 def obtener_siguiente_turno():
     cursor.execute("SELECT MAX(turno) FROM turnos")
     resultado = cursor.fetchone()[0]
     return 1 if resultado is None else resultado + 1
 
+@cache_consulta(tablas=['turnos'])
+def obtener_ultimos_turnos(limite=10):
+    return pd.read_sql_query("SELECT * FROM turnos ORDER BY id DESC LIMIT ?", conn, params=(limite,))
+
 def mostrar():
     st.title("👩‍💼 Panel de Turnos - Atención al Cliente")
 
@@ -35,7 +30,7 @@ def mostrar():
         st.success(f"Su turno es el número {turno}. Espere a ser llamado por {empleado}.")
 
     st.subheader("📋 Últimos turnos generados")
-    turnos = pd.read_sql_query("SELECT * FROM turnos ORDER BY id DESC LIMIT 10", conn)
+    turnos = obtener_ultimos_turnos()
     st.dataframe(turnos)
 
     if st.checkbox("Modo Display"):
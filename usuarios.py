@@ -3,6 +3,8 @@ import sqlite3
 import pandas as pd
 import hashlib
 from datetime import datetime
+from cache_manager import cache_consulta
+from migraciones import asegurar_esquema
 
 # Ruta de la base de datos
 DB_PATH = "pos_cremeria.db"
@@ -12,76 +14,8 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def crear_tabla_usuarios():
-    """Crear tabla de usuarios si no existe"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    try:
-        # Verificar si la tabla existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='usuarios_admin'")
-        tabla_existe = cursor.fetchone() is not None
-        
-        if tabla_existe:
-            # Verificar si tiene todas las columnas necesarias
-            cursor.execute("PRAGMA table_info(usuarios_admin)")
-            columnas = [col[1] for col in cursor.fetchall()]
-            
-            # Migrar la tabla si faltan columnas
-            if 'nombre_completo' not in columnas:
-                print("Migrando tabla usuarios_admin...")
-                # Agregar columnas faltantes
-                if 'nombre_completo' not in columnas:
-                    cursor.execute("ALTER TABLE usuarios_admin ADD COLUMN nombre_completo TEXT DEFAULT 'Usuario'")
-                if 'rol' not in columnas:
-                    cursor.execute("ALTER TABLE usuarios_admin ADD COLUMN rol TEXT DEFAULT 'usuario'")
-                if 'activo' not in columnas:
-                    cursor.execute("ALTER TABLE usuarios_admin ADD COLUMN activo INTEGER DEFAULT 1")
-                if 'fecha_creacion' not in columnas:
-                    cursor.execute("ALTER TABLE usuarios_admin ADD COLUMN fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-                if 'ultimo_acceso' not in columnas:
-                    cursor.execute("ALTER TABLE usuarios_admin ADD COLUMN ultimo_acceso TIMESTAMP")
-                if 'creado_por' not in columnas:
-                    cursor.execute("ALTER TABLE usuarios_admin ADD COLUMN creado_por TEXT DEFAULT 'Sistema'")
-                
-                # Actualizar usuarios existentes con nombre_completo
-                cursor.execute("UPDATE usuarios_admin SET nombre_completo = 'Administrador Principal' WHERE usuario = 'admin' AND nombre_completo = 'Usuario'")
-                
-                print("Migración completada")
-        else:
-            # Crear tabla nueva
-            cursor.execute('''
-                CREATE TABLE usuarios_admin (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    usuario TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    nombre_completo TEXT NOT NULL,
-                    rol TEXT DEFAULT 'usuario',
-                    activo INTEGER DEFAULT 1,
-                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    ultimo_acceso TIMESTAMP,
-                    creado_por TEXT DEFAULT 'Sistema'
-                )
-            ''')
-        
-        # Verificar si existe el usuario admin por defecto
-        cursor.execute("SELECT COUNT(*) FROM usuarios_admin WHERE usuario = 'admin'")
-        if cursor.fetchone()[0] == 0:
-            # Crear usuario admin por defecto
-            password_hash = hash_password('admin123')
-            cursor.execute('''
-                INSERT INTO usuarios_admin (usuario, password, nombre_completo, rol, creado_por)
-                VALUES (?, ?, ?, ?, ?)
-            ''', ('admin', password_hash, 'Administrador Principal', 'admin', 'Sistema'))
-        else:
-            # Asegurar que el admin tenga rol de admin
-            cursor.execute("UPDATE usuarios_admin SET rol = 'admin' WHERE usuario = 'admin'")
-            
-        conn.commit()
-    except Exception as e:
-        print(f"Error al crear tabla de usuarios: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+    """Crear tabla de usuarios si no existe (ahora en migraciones.py)"""
+    asegurar_esquema()
 
 def verificar_es_admin(usuario):
     """Verificar si un usuario tiene rol de administrador"""
@@ -94,6 +28,7 @@ def verificar_es_admin(usuario):
     finally:
         conn.close()
 
+@cache_consulta(tablas=['usuarios_admin'])
 def obtener_todos_usuarios():
     """Obtener lista de todos los usuarios"""
     conn = sqlite3.connect(DB_PATH)
@@ -218,9 +153,6 @@ def mostrar():
     """Función principal del módulo de usuarios"""
     st.title("👥 Gestión de Usuarios")
     
-    # Crear tabla si no existe
-    crear_tabla_usuarios()
-    
     # Verificar que el usuario actual sea administrador
     if 'usuario_actual' not in st.session_state:
         st.error("❌ Debe iniciar sesión para acceder a este módulo")
@@ -7,6 +7,9 @@ import time
 
 # Importar sistema de autenticación centralizado
 from auth_manager import verificar_sesion_admin, cerrar_sesion_admin, obtener_tiempo_restante, mostrar_formulario_login
+from kardex import registrar_movimiento, StockInsuficiente
+from migraciones import COLUMNAS_PRODUCTOS
+from change_notifier import datos_de_pagina
 
 # Importar gestor de sincronización
 try:
@@ -16,7 +19,9 @@ except ImportError:
     SYNC_AVAILABLE = False
     print("sync_manager no disponible")
 
-conn = sqlite3.connect("pos_cremeria.db", check_same_thread=False)
+DB_PATH = "pos_cremeria.db"
+
+conn = sqlite3.connect(DB_PATH, check_same_thread=False)
 cursor = conn.cursor()
 
 # Helper para reiniciar la ejecución de Streamlit de forma compatible con varias versiones
@@ -502,88 +507,6 @@ def mostrar_metrica_mejorada(titulo, valor, icono="💰", es_moneda=True):
     </div>
     """, unsafe_allow_html=True)
 
-# Crear tabla de ventas actualizada
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS ventas (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    fecha TEXT,
-    codigo TEXT,
-    nombre TEXT,
-    cantidad INTEGER,
-    precio_unitario REAL,
-    total REAL,
-    tipo_cliente TEXT,
-    tipos_pago TEXT,
-    monto_efectivo REAL DEFAULT 0,
-    monto_tarjeta REAL DEFAULT 0,
-    monto_transferencia REAL DEFAULT 0,
-    monto_credito REAL DEFAULT 0,
-    fecha_vencimiento_credito TEXT,
-    hora_vencimiento_credito TEXT DEFAULT '15:00',
-    cliente_credito TEXT,
-    pagado INTEGER DEFAULT 1,
-    alerta_mostrada INTEGER DEFAULT 0,
-    peso_vendido REAL DEFAULT 0,
-    tipo_venta TEXT DEFAULT 'unidad'
-)
-''')
-
-# Agregar nuevas columnas si no existen
-cursor.execute("PRAGMA table_info(ventas)")
-columns = [column[1] for column in cursor.fetchall()]
-
-# Migrar columnas existentes y agregar nuevas
-if 'tipos_pago' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN tipos_pago TEXT DEFAULT 'Efectivo'")
-if 'monto_efectivo' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN monto_efectivo REAL DEFAULT 0")
-if 'monto_tarjeta' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN monto_tarjeta REAL DEFAULT 0")
-if 'monto_transferencia' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN monto_transferencia REAL DEFAULT 0")
-if 'monto_credito' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN monto_credito REAL DEFAULT 0")
-if 'fecha_vencimiento_credito' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN fecha_vencimiento_credito TEXT")
-if 'hora_vencimiento_credito' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN hora_vencimiento_credito TEXT DEFAULT '15:00'")
-if 'cliente_credito' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN cliente_credito TEXT")
-if 'pagado' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN pagado INTEGER DEFAULT 1")
-if 'alerta_mostrada' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN alerta_mostrada INTEGER DEFAULT 0")
-if 'peso_vendido' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN peso_vendido REAL DEFAULT 0")
-if 'tipo_venta' not in columns:
-    cursor.execute("ALTER TABLE ventas ADD COLUMN tipo_venta TEXT DEFAULT 'unidad'")
-
-# Crear tabla de alertas de crédito actualizada
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS creditos_pendientes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    cliente TEXT NOT NULL,
-    monto REAL NOT NULL,
-    fecha_venta TEXT NOT NULL,
-    fecha_vencimiento TEXT NOT NULL,
-    hora_vencimiento TEXT DEFAULT '15:00',
-    venta_id INTEGER,
-    pagado INTEGER DEFAULT 0,
-    alerta_mostrada INTEGER DEFAULT 0,
-    FOREIGN KEY (venta_id) REFERENCES ventas (id)
-)
-''')
-
-# Agregar columna hora_vencimiento y alerta_mostrada si no existe
-cursor.execute("PRAGMA table_info(creditos_pendientes)")
-credito_columns = [column[1] for column in cursor.fetchall()]
-if 'hora_vencimiento' not in credito_columns:
-    cursor.execute("ALTER TABLE creditos_pendientes ADD COLUMN hora_vencimiento TEXT DEFAULT '15:00'")
-if 'alerta_mostrada' not in credito_columns:
-    cursor.execute("ALTER TABLE creditos_pendientes ADD COLUMN alerta_mostrada INTEGER DEFAULT 0")
-
-conn.commit()
-
 def parsear_codigo_bascula(codigo_completo):
     """
     Parsear tickets con múltiples productos.
@@ -632,8 +555,7 @@ def obtener_producto_por_codigo(codigo):
 def obtener_precio_por_tipo(producto, tipo_cliente):
     """Obtiene el precio según el tipo de cliente para productos por unidad"""
     # Normalizar usando nombres de columna (más robusto que índices)
-    cursor.execute("PRAGMA table_info(productos)")
-    columnas = [col[1] for col in cursor.fetchall()]
+    columnas = COLUMNAS_PRODUCTOS
 
     producto_dict = {}
     for i, valor in enumerate(producto):
@@ -668,8 +590,7 @@ def obtener_precio_por_tipo(producto, tipo_cliente):
 
 def obtener_precio_granel_por_tipo(producto, tipo_cliente):
     """Obtiene el precio por Kg según el tipo de cliente para productos a granel"""
-    cursor.execute("PRAGMA table_info(productos)")
-    columnas = [col[1] for col in cursor.fetchall()]
+    columnas = COLUMNAS_PRODUCTOS
     
     producto_dict = {}
     for i, valor in enumerate(producto):
@@ -691,8 +612,7 @@ def obtener_precio_granel_por_tipo(producto, tipo_cliente):
 
 def obtener_informacion_producto(producto):
     """Obtener información del producto usando mapeo por nombres de columnas"""
-    cursor.execute("PRAGMA table_info(productos)")
-    columnas = [col[1] for col in cursor.fetchall()]
+    columnas = COLUMNAS_PRODUCTOS
     
     producto_dict = {}
     for i, valor in enumerate(producto):
@@ -710,13 +630,164 @@ def obtener_informacion_producto(producto):
         'precio_normal': float(producto_dict.get('precio_normal', 0.0)) if producto_dict.get('precio_normal') else 0.0
     }
 
-def agregar_credito(cliente, monto, fecha_venta, fecha_vencimiento, hora_vencimiento, venta_id):
-    """Agregar un crédito pendiente con hora específica"""
-    cursor.execute('''
+def agregar_credito(cliente, monto, fecha_venta, fecha_vencimiento, hora_vencimiento, venta_id, db_cursor=None):
+    """Agregar un crédito pendiente con hora específica
+
+    Con `db_cursor` se agrega a la transacción de ese cursor sin hacer commit.
+    """
+    (db_cursor or cursor).execute('''
         INSERT INTO creditos_pendientes (cliente, monto, fecha_venta, fecha_vencimiento, hora_vencimiento, venta_id)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (cliente, monto, fecha_venta, fecha_vencimiento, hora_vencimiento, venta_id))
-    conn.commit()
+    if db_cursor is None:
+        conn.commit()
+
+def registrar_venta(carrito, tipo_cliente, tipos_pago, monto_efectivo, monto_tarjeta, monto_transferencia,
+                    monto_credito, total_general, fecha_vencimiento_credito=None, hora_vencimiento_credito=None,
+                    cliente_credito="", usuario=None, fecha=None, db_cursor=None, validar_stock=False):
+    """Insertar las líneas del carrito, descontar stock en el kardex y registrar el crédito.
+    No confirma la transacción (el llamador hace conn.commit()). Devuelve (venta_id, productos_vendidos).
+
+    Con `validar_stock=True` ninguna línea puede dejar el stock en negativo: si alguna no
+    alcanza se lanza StockInsuficiente con todas las líneas que faltan (el llamador deshace).
+    """
+    db_cursor = db_cursor or cursor
+    fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    venta_id = None
+    productos_vendidos = []
+
+    # Preparar fechas y horas de crédito de forma segura
+    fecha_credito_str = ""
+    hora_credito_str = "15:00"
+
+    if fecha_vencimiento_credito:
+        if isinstance(fecha_vencimiento_credito, str):
+            fecha_credito_str = fecha_vencimiento_credito
+        else:
+            fecha_credito_str = fecha_vencimiento_credito.strftime("%Y-%m-%d")
+
+    if hora_vencimiento_credito:
+        if isinstance(hora_vencimiento_credito, str):
+            hora_credito_str = hora_vencimiento_credito
+        else:
+            hora_credito_str = hora_vencimiento_credito.strftime("%H:%M")
+
+    pagado = 0 if monto_credito == total_general else 1
+    faltantes = {}
+    descontado = {}  # lo que este ticket ya descontó por producto
+
+    for item in carrito:
+        peso_vendido = item.get('peso', 0)
+        tipo_venta = item.get('tipo_venta', 'unidad')
+
+        db_cursor.execute('''
+            INSERT INTO ventas (fecha, codigo, nombre, cantidad, precio_unitario, total, tipo_cliente, tipos_pago, 
+                              monto_efectivo, monto_tarjeta, monto_transferencia, monto_credito,
+                              fecha_vencimiento_credito, hora_vencimiento_credito, cliente_credito, pagado,
+                              peso_vendido, tipo_venta)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (fecha, item['codigo'], item['nombre'], item['cantidad'], item['precio_unitario'], item['total'], 
+              tipo_cliente, tipos_pago, monto_efectivo, monto_tarjeta, monto_transferencia, monto_credito,
+              fecha_credito_str, hora_credito_str, 
+              cliente_credito or "", pagado, peso_vendido, tipo_venta))
+
+        venta_item_id = db_cursor.lastrowid
+        if venta_id is None:
+            venta_id = venta_item_id
+
+        # Actualizar stock según tipo de venta (queda registrado en el kardex)
+        try:
+            if tipo_venta == 'granel':
+                # Para productos a granel, solo restar del stock_kg
+                registrar_movimiento(db_cursor, item['codigo'], 'VENTA', cantidad_kg=-peso_vendido,
+                                     referencia_tipo='venta', referencia_id=venta_item_id, usuario=usuario,
+                                     validar_stock=validar_stock)
+            else:
+                # Para productos por unidad, solo restar del stock
+                registrar_movimiento(db_cursor, item['codigo'], 'VENTA', cantidad=-item['cantidad'],
+                                     referencia_tipo='venta', referencia_id=venta_item_id, usuario=usuario,
+                                     validar_stock=validar_stock)
+        except StockInsuficiente:
+            # Seguir revisando el resto del carrito para avisar de todas las líneas a la vez
+            if item['codigo'] not in faltantes:
+                faltantes[item['codigo']] = {'codigo': item['codigo'], 'nombre': item['nombre'],
+                                             'unidad': 'kg' if tipo_venta == 'granel' else 'pzas'}
+            continue
+
+        descontado[item['codigo']] = descontado.get(item['codigo'], 0) + (
+            peso_vendido if tipo_venta == 'granel' else item['cantidad'])
+        productos_vendidos.append(item)
+
+    if faltantes:
+        # Por producto, lo que pide todo el ticket contra lo que había antes de cobrarlo
+        # (el stock actual más lo que otras líneas del mismo ticket ya descontaron)
+        for codigo, faltante in faltantes.items():
+            granel = faltante['unidad'] == 'kg'
+            db_cursor.execute("SELECT stock, stock_kg FROM productos WHERE codigo = ?", (codigo,))
+            stock, stock_kg = db_cursor.fetchone()
+            faltante['disponible'] = ((stock_kg or 0.0) if granel else (stock or 0)) + descontado.get(codigo, 0)
+            faltante['solicitado'] = sum(item.get('peso', 0) if granel else item['cantidad']
+                                         for item in carrito if item['codigo'] == codigo)
+        raise StockInsuficiente(list(faltantes.values()))
+
+    # Si hay crédito, agregarlo a la tabla
+    if monto_credito > 0 and cliente_credito:
+        fecha_credito_para_tabla = fecha_credito_str if fecha_credito_str else (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        agregar_credito(cliente_credito, monto_credito, fecha, fecha_credito_para_tabla, hora_credito_str, venta_id,
+                        db_cursor=None if db_cursor is cursor else db_cursor)
+
+    return venta_id, productos_vendidos
+
+def cobrar_venta(carrito, tipo_cliente, tipos_pago, monto_efectivo, monto_tarjeta, monto_transferencia,
+                 monto_credito, total_general, fecha_vencimiento_credito=None, hora_vencimiento_credito=None,
+                 cliente_credito="", usuario=None, fecha=None, db_path=DB_PATH):
+    """Registrar y confirmar una venta en su propia conexión y transacción
+
+    Varias terminales cobran contra la misma base: cada cobro abre su transacción con
+    BEGIN IMMEDIATE (espera su turno de escritura con busy_timeout, unos milisegundos por
+    ticket) y descuenta el stock con UPDATE condicional, así dos cajas no pueden vender
+    las mismas últimas piezas. Si alguna línea ya no alcanza, se deshace todo el ticket y
+    se lanza StockInsuficiente para que la caja corrija el carrito y vuelva a cobrar.
+    """
+    conexion = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        db_cursor = conexion.cursor()
+        db_cursor.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = registrar_venta(
+                carrito, tipo_cliente, tipos_pago, monto_efectivo, monto_tarjeta, monto_transferencia,
+                monto_credito, total_general, fecha_vencimiento_credito, hora_vencimiento_credito,
+                cliente_credito, usuario=usuario, fecha=fecha, db_cursor=db_cursor, validar_stock=True
+            )
+            db_cursor.execute("COMMIT")
+        except Exception:
+            if conexion.in_transaction:
+                db_cursor.execute("ROLLBACK")
+            raise
+    finally:
+        conexion.close()
+    return resultado
+
+def ajustar_carrito_a_stock(carrito, faltantes):
+    """Reducir las líneas del carrito al stock disponible; quita las que se quedaron sin stock"""
+    disponible = {f['codigo']: f['disponible'] for f in faltantes}
+    ajustado = []
+    for item in carrito:
+        if item['codigo'] not in disponible:
+            ajustado.append(item)
+            continue
+        restante = max(disponible[item['codigo']], 0)
+        if item.get('tipo_venta') == 'granel':
+            vendido = min(item.get('peso', 0), restante)
+            if vendido > 0:
+                ajustado.append(dict(item, peso=round(vendido, 3), total=round(vendido * item['precio_unitario'], 2)))
+        else:
+            vendido = min(item['cantidad'], int(restante))
+            if vendido > 0:
+                ajustado.append(dict(item, cantidad=vendido, total=vendido * item['precio_unitario']))
+        # Si el mismo producto aparece en varias líneas, las siguientes usan lo que sobra
+        disponible[item['codigo']] = restante - vendido
+    return ajustado
 
 def obtener_creditos_vencidos_con_hora():
     """Obtener créditos que vencen hoy considerando la hora"""
@@ -748,6 +819,24 @@ def obtener_alertas_pendientes():
     ''', (fecha_hoy, fecha_hoy, hora_actual))
     return cursor.fetchall()
 
+def obtener_creditos_pendientes():
+    """Créditos sin pagar (para gestionarlos) y el resumen de deuda por cliente"""
+    cursor.execute('''
+        SELECT id, cliente, monto, fecha_vencimiento, hora_vencimiento, fecha_venta
+        FROM creditos_pendientes 
+        WHERE pagado = 0 
+        ORDER BY fecha_vencimiento, hora_vencimiento
+    ''')
+    creditos_detallados = cursor.fetchall()
+    cursor.execute('''
+        SELECT cliente, SUM(monto) as total_deuda, COUNT(*) as num_creditos
+        FROM creditos_pendientes 
+        WHERE pagado = 0 
+        GROUP BY cliente
+        ORDER BY total_deuda DESC
+    ''')
+    return creditos_detallados, cursor.fetchall()
+
 def marcar_alerta_mostrada(credito_id):
     """Marcar que la alerta ya fue mostrada"""
     cursor.execute("UPDATE creditos_pendientes SET alerta_mostrada = 1 WHERE id = ?", (credito_id,))
@@ -1902,6 +1991,7 @@ def mostrar():
         with col_btn1:
             if st.button("🗑️ LIMPIAR CARRITO", type="secondary"):
                 st.session_state.carrito = []
+                st.session_state.pop('conflicto_stock', None)
                 keys_to_remove = [key for key in st.session_state.keys() if key.startswith('editando_')]
                 for key in keys_to_remove:
                     del st.session_state[key]
@@ -1952,72 +2042,15 @@ def mostrar():
                         if hora_vencimiento_credito is None:
                             hora_vencimiento_credito = datetime.strptime("15:00", "%H:%M").time()
                     
-                    # Procesar venta
+                    # Procesar venta (en su propia transacción, con el stock validado al cobrar)
                     try:
-                        venta_id = None
-                        productos_vendidos = []
-                        
-                        for item in st.session_state.carrito:
-                            pagado = 1
-                            if monto_credito == total_general:
-                                pagado = 0
-                        
-                            peso_vendido = item.get('peso', 0)
-                            tipo_venta = item.get('tipo_venta', 'unidad')
-                            
-                            # Preparar fechas y horas de crédito de forma segura
-                            fecha_credito_str = ""
-                            hora_credito_str = "15:00"
-                            
-                            if fecha_vencimiento_credito:
-                                if isinstance(fecha_vencimiento_credito, str):
-                                    fecha_credito_str = fecha_vencimiento_credito
-                                else:
-                                    fecha_credito_str = fecha_vencimiento_credito.strftime("%Y-%m-%d")
-                            
-                            if hora_vencimiento_credito:
-                                if isinstance(hora_vencimiento_credito, str):
-                                    hora_credito_str = hora_vencimiento_credito
-                                else:
-                                    hora_credito_str = hora_vencimiento_credito.strftime("%H:%M")
-                        
-                            cursor.execute('''
-                                INSERT INTO ventas (fecha, codigo, nombre, cantidad, precio_unitario, total, tipo_cliente, tipos_pago, 
-                                                  monto_efectivo, monto_tarjeta, monto_transferencia, monto_credito,
-                                                  fecha_vencimiento_credito, hora_vencimiento_credito, cliente_credito, pagado,
-                                                  peso_vendido, tipo_venta)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (fecha, item['codigo'], item['nombre'], item['cantidad'], item['precio_unitario'], item['total'], 
-                                  cliente_tipo, tipos_pago_str, monto_efectivo, monto_tarjeta, monto_transferencia, monto_credito,
-                                  fecha_credito_str, hora_credito_str, 
-                                  cliente_credito or "", pagado, peso_vendido, tipo_venta))
-                        
-                            if venta_id is None:
-                                venta_id = cursor.lastrowid
-                        
-                            # Actualizar stock según tipo de venta
-                            if tipo_venta == 'granel':
-                                # Para productos a granel, solo restar del stock_kg
-                                cursor.execute("UPDATE productos SET stock_kg = stock_kg - ? WHERE codigo = ?", 
-                                             (peso_vendido, item['codigo']))
-                            else:
-                                # Para productos por unidad, solo restar del stock
-                                cursor.execute("UPDATE productos SET stock = stock - ? WHERE codigo = ?", 
-                                             (item['cantidad'], item['codigo']))
-                        
-                            productos_vendidos.append(item)
-                        
-                        # Si hay crédito, agregarlo a la tabla (DENTRO del try)
-                        if monto_credito > 0 and cliente_credito:
-                            # Preparar fechas para agregar crédito de forma segura
-                            fecha_credito_para_tabla = fecha_credito_str if fecha_credito_str else (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-                            hora_credito_para_tabla = hora_credito_str if hora_credito_str else "15:00"
-                            
-                            agregar_credito(cliente_credito, monto_credito, fecha, 
-                                          fecha_credito_para_tabla, 
-                                          hora_credito_para_tabla, venta_id)
-                    
-                        conn.commit()
+                        venta_id, productos_vendidos = cobrar_venta(
+                            st.session_state.carrito, cliente_tipo, tipos_pago_str,
+                            monto_efectivo, monto_tarjeta, monto_transferencia, monto_credito, total_general,
+                            fecha_vencimiento_credito, hora_vencimiento_credito, cliente_credito,
+                            usuario=st.session_state.get('usuario_actual'), fecha=fecha
+                        )
+                        st.session_state.pop('conflicto_stock', None)
                         
                         # Sincronizar con Supabase automáticamente
                         if SYNC_AVAILABLE:
@@ -2097,6 +2130,10 @@ def mostrar():
                         # Rerun inmediato para que el autofocus funcione correctamente
                         st.rerun()
                         
+                    except StockInsuficiente as e:
+                        # Otra terminal vendió antes: no se cobró nada, la caja decide cómo seguir
+                        st.session_state['conflicto_stock'] = e.faltantes
+                        st.rerun()
                     except Exception as e:
                         st.markdown(f"""
                         <div style="background: linear-gradient(135deg, #e17055 0%, #d63031 100%); padding: 1.5rem; border-radius: 15px; text-align: center; color: white; font-size: 1.2rem; font-weight: bold;">
@@ -2106,6 +2143,17 @@ def mostrar():
                         conn.rollback()
                 
                 st.markdown("</div>", unsafe_allow_html=True)
+
+            conflicto_stock = st.session_state.get('conflicto_stock')
+            if conflicto_stock:
+                st.error("❌ **Stock insuficiente al cobrar** (otra caja vendió estas piezas). No se registró la venta:")
+                for faltante in conflicto_stock:
+                    st.markdown(f"- **{faltante['nombre']}**: pide {faltante['solicitado']:g} {faltante['unidad']}, "
+                                f"quedan {max(faltante['disponible'], 0):g} {faltante['unidad']}")
+                if st.button("✂️ Ajustar carrito al stock disponible", key="ajustar_carrito_stock"):
+                    st.session_state.carrito = ajustar_carrito_a_stock(st.session_state.carrito, conflicto_stock)
+                    del st.session_state['conflicto_stock']
+                    st.rerun()
         
         with col_btn3:
             with st.expander("📊 **VISTA PREVIA DE LA VENTA**", expanded=False):
@@ -2126,14 +2174,10 @@ def mostrar():
     # Sección de créditos pendientes con diseño mejorado
     st.markdown("---")
     with st.expander("📋 **VER TODOS LOS CRÉDITOS PENDIENTES**"):
-        # Obtener créditos detallados para gestión
-        cursor.execute('''
-            SELECT id, cliente, monto, fecha_vencimiento, hora_vencimiento, fecha_venta
-            FROM creditos_pendientes 
-            WHERE pagado = 0 
-            ORDER BY fecha_vencimiento, hora_vencimiento
-        ''')
-        creditos_detallados = cursor.fetchall()
+        # Obtener créditos detallados para gestión (se reconsultan solo si cambiaron)
+        creditos_detallados, resumen_por_cliente = datos_de_pagina(
+            'creditos_pendientes', ['creditos_pendientes'], obtener_creditos_pendientes
+        )
         
         if creditos_detallados:
             st.markdown("""
@@ -2187,15 +2231,6 @@ def mostrar():
                 st.markdown("---")
             
             # Resumen total
-            cursor.execute('''
-                SELECT cliente, SUM(monto) as total_deuda, COUNT(*) as num_creditos
-                FROM creditos_pendientes 
-                WHERE pagado = 0 
-                GROUP BY cliente
-                ORDER BY total_deuda DESC
-            ''')
-            resumen_por_cliente = cursor.fetchall()
-            
             st.markdown("""
             <div style="background: linear-gradient(135deg, #2d3436 0%, #636e72 100%); padding: 1rem; border-radius: 12px; text-align: center; color: white; font-size: 1.2rem; font-weight: bold; margin: 1rem 0;">
                 📊 RESUMEN POR CLIENTE
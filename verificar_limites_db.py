@@ -1,5 +1,6 @@
 """
 Script para verificar límites y estado de la base de datos SQLite
+(el historial de tamaños y el mantenimiento automático están en mantenimiento_db.py)
 """
 import sqlite3
 import os
@@ -188,19 +189,17 @@ def optimizar_base_datos():
     
     conn = sqlite3.connect(db_path)
     try:
-        # Backup antes de optimizar
-        backup_path = db_path.replace('.db', '_before_vacuum.db')
-        print(f"   Creando backup: {backup_path}")
-        
-        import shutil
-        shutil.copy2(db_path, backup_path)
+        # Backup en caliente (API de backup de SQLite) antes de optimizar
+        from backup_manager import crear_backup
+        backup = crear_backup(db_path)
+        print(f"   Backup creado: {backup['archivo']} (integrity_check ok)")
+        old_size = os.path.getsize(db_path)
         
         # Ejecutar VACUUM
         conn.execute("VACUUM")
         print("   ✅ Optimización completada")
         
         # Mostrar diferencia de tamaño
-        old_size = os.path.getsize(backup_path)
         new_size = os.path.getsize(db_path)
         saved = old_size - new_size
         